@@ -0,0 +1,33 @@
+"""add keyset pagination indexes
+
+Revision ID: 3c7e1f0a9b42
+Revises: 9a1b2c3d4e5f
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7e1f0a9b42'
+down_revision = '9a1b2c3d4e5f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Composite (user_id, id) indexes serve ORDER BY id within a user and the id > cursor seek;
+    # they also cover every lookup the single-column user_id indexes did.
+    op.create_index('ix_cat_user_id_id', 'cat', ['user_id', 'id'], unique=False)
+    op.create_index('ix_slideshow_user_id_id', 'slideshow', ['user_id', 'id'], unique=False)
+    op.create_index('ix_slideshow_user_id_cat_id_id', 'slideshow', ['user_id', 'cat_id', 'id'], unique=False)
+    op.drop_index('ix_cat_user_id', table_name='cat')
+    op.drop_index('ix_slideshow_user_id', table_name='slideshow')
+
+
+def downgrade() -> None:
+    op.create_index('ix_slideshow_user_id', 'slideshow', ['user_id'], unique=False)
+    op.create_index('ix_cat_user_id', 'cat', ['user_id'], unique=False)
+    op.drop_index('ix_slideshow_user_id_cat_id_id', table_name='slideshow')
+    op.drop_index('ix_slideshow_user_id_id', table_name='slideshow')
+    op.drop_index('ix_cat_user_id_id', table_name='cat')
@@ -0,0 +1,39 @@
+"""add cat image table
+
+Revision ID: 4f8a2c6e1b37
+Revises: e1f5a7c3d920
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '4f8a2c6e1b37'
+down_revision = 'e1f5a7c3d920'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Measured image metadata keyed by S3 key; maintained by the image metadata worker.
+    op.create_table('cat_image',
+    sa.Column('key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('etag', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=False),
+    sa.Column('height', sa.Integer(), nullable=False),
+    sa.Column('byte_size', sa.Integer(), nullable=False),
+    sa.Column('content_type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('dominant_color', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('blurhash', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('cat_image')
@@ -0,0 +1,27 @@
+"""add updated_at validator indexes
+
+Revision ID: 8c3e5d7a2f14
+Revises: 4f8a2c6e1b37
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3e5d7a2f14'
+down_revision = '4f8a2c6e1b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Conditional GETs read count(*) and max(updated_at) of a user's rows on every
+    # list/detail request; these make that an index-only scan.
+    op.create_index('ix_cat_user_id_updated_at', 'cat', ['user_id', 'updated_at'], unique=False)
+    op.create_index('ix_slideshow_user_id_updated_at', 'slideshow', ['user_id', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_slideshow_user_id_updated_at', table_name='slideshow')
+    op.drop_index('ix_cat_user_id_updated_at', table_name='cat')
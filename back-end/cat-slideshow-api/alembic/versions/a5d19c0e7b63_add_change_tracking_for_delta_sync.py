@@ -0,0 +1,50 @@
+"""add change tracking for delta sync
+
+Revision ID: a5d19c0e7b63
+Revises: 8c3e5d7a2f14
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d19c0e7b63'
+down_revision = '8c3e5d7a2f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # change_seq is set by the app on every INSERT/UPDATE (the writing transaction's ID).
+    # Existing rows get 0: they predate every sync token, and full syncs return them anyway.
+    for table in ('cat', 'slideshow'):
+        op.add_column(table, sa.Column('change_seq', sa.BigInteger(), nullable=True))
+        op.execute(f'UPDATE "{table}" SET change_seq = 0')
+        op.alter_column(table, 'change_seq', nullable=False)
+        op.create_index(f'ix_{table}_user_id_change_seq', table, ['user_id', 'change_seq'], unique=False)
+
+    # Deletes, so delta sync can report them; pruned after the retention period.
+    op.create_table('tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tombstone_user_id_change_seq', 'tombstone', ['user_id', 'change_seq'], unique=False)
+    op.create_index('ix_tombstone_deleted_at', 'tombstone', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tombstone_deleted_at', table_name='tombstone')
+    op.drop_index('ix_tombstone_user_id_change_seq', table_name='tombstone')
+    op.drop_table('tombstone')
+    for table in ('slideshow', 'cat'):
+        op.drop_index(f'ix_{table}_user_id_change_seq', table_name=table)
+        op.drop_column(table, 'change_seq')
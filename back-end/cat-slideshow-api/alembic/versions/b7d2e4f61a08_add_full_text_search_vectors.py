@@ -0,0 +1,47 @@
+"""add full-text search vectors
+
+Revision ID: b7d2e4f61a08
+Revises: 3c7e1f0a9b42
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e4f61a08'
+down_revision = '3c7e1f0a9b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Generated columns keep the vectors in sync on every write; the text search config
+    # must match SEARCH_CONFIG in app/crud/search.py. Weights rank title/name hits first.
+    op.execute(
+        """
+        ALTER TABLE cat ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(breed, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(color, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'C')
+        ) STORED
+        """
+    )
+    op.execute(
+        """
+        ALTER TABLE slideshow ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+        """
+    )
+    op.create_index('ix_cat_search_vector', 'cat', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_slideshow_search_vector', 'slideshow', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_slideshow_search_vector', table_name='slideshow')
+    op.drop_index('ix_cat_search_vector', table_name='cat')
+    op.drop_column('slideshow', 'search_vector')
+    op.drop_column('cat', 'search_vector')
@@ -0,0 +1,29 @@
+"""add cat filter indexes
+
+Revision ID: e1f5a7c3d920
+Revises: b7d2e4f61a08
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f5a7c3d920'
+down_revision = 'b7d2e4f61a08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Equality filters (breed, color) keep id as the trailing column so filtered keyset
+    # pages are a single range scan; the age index serves min_age/max_age ranges.
+    op.create_index('ix_cat_user_id_breed_id', 'cat', ['user_id', 'breed', 'id'], unique=False)
+    op.create_index('ix_cat_user_id_color_id', 'cat', ['user_id', 'color', 'id'], unique=False)
+    op.create_index('ix_cat_user_id_age', 'cat', ['user_id', 'age'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cat_user_id_age', table_name='cat')
+    op.drop_index('ix_cat_user_id_color_id', table_name='cat')
+    op.drop_index('ix_cat_user_id_breed_id', table_name='cat')
@@ -0,0 +1,77 @@
+"""
+Serialization time per 1000-row page: FastAPI's response_model path vs. the fast JSON path.
+
+Run from the project root with the app's environment configured, e.g.:
+
+    RUNTIME_DB_URL=sqlite:// ... uv run --extra speedups python benchmarks/serialization.py
+
+Rows are built in memory, so only serialization is measured (no database or HTTP).
+"""
+
+import asyncio
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import APIRoute, serialize_response  # noqa: E402
+
+from app import serialization  # noqa: E402
+from app.models.cat import Cat, CatRead  # noqa: E402
+from app.models.slideshow import Slideshow, SlideshowRead  # noqa: E402
+
+ROWS = 1000
+REPEAT = 20
+
+
+def make_rows():
+    now = datetime.utcnow()
+    cats = [
+        Cat(id=i, name=f"Cat {i}", breed="Tabby", age=i % 20, color="orange", description="Likes naps", user_id=1, created_at=now, updated_at=now)
+        for i in range(ROWS)
+    ]
+    slideshows = [
+        Slideshow(id=i, title=f"Slideshow {i}", description="Naps", cat_id=i, user_id=1, created_at=now, updated_at=now,
+                  image_urls=[f"https://bucket.s3.amazonaws.com/cats/{i}-{n}.jpg" for n in range(20)])
+        for i in range(ROWS)
+    ]
+    return cats, slideshows
+
+
+def response_model_path(model):
+    """What FastAPI does for `response_model=List[model]`: validate, serialize, then json.dumps."""
+    field = APIRoute("/", endpoint=lambda: None, response_model=List[model]).response_field
+
+    def run(rows):
+        content = asyncio.run(serialize_response(field=field, response_content=rows))
+        return JSONResponse(content).body
+
+    return run
+
+
+def fast_path(model):
+    return lambda rows: serialization.encode_rows(rows, model)
+
+
+def measure(run, rows) -> float:
+    """Best milliseconds per call over REPEAT runs."""
+    return min(timeit.repeat(lambda: run(rows), number=1, repeat=REPEAT)) * 1000
+
+
+def main() -> None:
+    cats, slideshows = make_rows()
+    encoder = "orjson" if serialization.orjson is not None else "pydantic-core"
+    print(f"ms per {ROWS} rows (best of {REPEAT}); fast path encoder: {encoder}")
+    print(f"{'model':<16}{'response_model':>16}{'fast path':>12}{'speedup':>10}")
+    for model, rows in [(CatRead, cats), (SlideshowRead, slideshows)]:
+        regular = measure(response_model_path(model), rows)
+        fast = measure(fast_path(model), rows)
+        print(f"{model.__name__:<16}{regular:>16.2f}{fast:>12.2f}{regular / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
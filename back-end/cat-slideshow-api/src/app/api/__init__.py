@@ -4,11 +4,13 @@ from .cats import router as cats_router
 from .slideshows import router as slideshows_router
 from .cat_images import router as cat_images_router
 from .auth import router as auth_router
+from .sync import router as sync_router
 
 __all__ = [
     "cats_router", 
     "slideshows_router",
     "cat_images_router",
     "auth_router",
+    "sync_router",
 ]
 
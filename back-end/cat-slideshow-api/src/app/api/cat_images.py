@@ -1,69 +1,118 @@
 """Cat Images API - S3 bucket image listing."""
 
-from typing import List
-import boto3
-from botocore.exceptions import ClientError, BotoCoreError
-from fastapi import APIRouter, HTTPException, Depends
-from ..settings import settings
+import asyncio
+import json
+from itertools import islice
+from typing import Iterator, List, Optional, Union
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
 from ..auth import get_current_user
+from ..crud.cat_image import cat_image_async as cat_image_crud
+from ..db import DBSession, get_db
+from ..image_index import cat_image_index
+from ..models.cat_image import CatImageRead, CatImageUpload, CatImageUploadAbort, CatImageUploadComplete, CatImageUploadCreate
+from ..pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from ..renditions import rendition_pipeline
+from ..uploads import abort_upload, complete_upload, start_upload
 
 router = APIRouter(
     prefix="/cat-images",
     tags=["cat-images"],
 )
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
-@router.get("/", response_model=List[str])
-def list_cat_images(
+# URLs per chunk written to a streamed response
+STREAM_CHUNK_SIZE = 1000
+
+
+@router.get(
+    "/",
+    response_model=Union[List[str], List[CatImageRead]],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}}}}},
+)
+async def list_cat_images(
+    response: Response,
+    prefix: str = Query("", description="Only list keys starting with this prefix"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Maximum number of URLs to return (default: all)"),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from a previous page's {NEXT_CURSOR_HEADER} header"),
+    detail: bool = Query(False, description="Return each image with its resized renditions, srcset and metadata"),
+    accept: Optional[str] = Header(None),
+    db: DBSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
-) -> List[str]:
+):
     """
-    List all cat image URLs from the S3 bucket.
-    
+    List cat image URLs from the S3 bucket, in key order.
+
     Requires valid AWS Cognito access token in Authorization header.
-    
+    Served from the in-memory image index, which re-lists the bucket in the background.
+    With `limit`, follow `X-Next-Cursor` for the next page. Send
+    `Accept: application/x-ndjson` to stream one JSON-encoded URL per line
+    instead of building a single array.
+
     Returns:
-        List of object URLs in the format: https://{bucket}.s3.amazonaws.com/{key}
+        List of object URLs in the format: https://{bucket}.s3.amazonaws.com/{key},
+        or with `detail=true`, `CatImageRead` objects listing each image's renditions
+        and measured metadata (dimensions, dominant color, blurhash)
+    """
+    await cat_image_index.ensure_fresh()
+    after_key = decode_cursor(cursor, key="key", value_type=str) if cursor else None
+
+    stream = accept is not None and NDJSON_MEDIA_TYPE in accept and not detail
+    if stream and limit is None:
+        urls = cat_image_index.iter_urls(prefix=prefix, after_key=after_key)
+        return StreamingResponse(_ndjson_chunks(urls), media_type=NDJSON_MEDIA_TYPE)
+
+    page = cat_image_index.page(prefix=prefix, after_key=after_key, limit=limit)
+    headers = {NEXT_CURSOR_HEADER: encode_cursor(page.last_key, key="key")} if page.last_key is not None else {}
+    if stream:
+        return StreamingResponse(_ndjson_chunks(iter(page.urls)), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+    response.headers.update(headers)
+    if detail:
+        infos = await cat_image_crud.get_many(db=db, keys=page.keys)
+        return [rendition_pipeline.describe(key, infos.get(key)) for key in page.keys]
+    return page.urls
+
+
+@router.post("/uploads/", response_model=CatImageUpload, status_code=201)
+async def create_cat_image_upload(
+    upload_in: CatImageUploadCreate,
+    current_user: dict = Depends(get_current_user)
+) -> CatImageUpload:
     """
-    try:
-        # Initialize S3 client with credentials from settings
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.cat_images_aws_access_key_id,
-            aws_secret_access_key=settings.cat_images_aws_secret_access_key,
-        )
-        
-        # List all objects in the bucket
-        response = s3_client.list_objects_v2(Bucket=settings.cat_images_bucket_name)
-        
-        # Check if bucket has any contents
-        if 'Contents' not in response:
-            return []
-        
-        # Build list of object URLs
-        image_urls = []
-        for obj in response['Contents']:
-            key = obj['Key']
-            url = f"https://{settings.cat_images_bucket_name}.s3.amazonaws.com/{key}"
-            image_urls.append(url)
-        
-        return image_urls
-        
-    except ClientError as e:
-        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
-        error_message = e.response.get('Error', {}).get('Message', str(e))
-        raise HTTPException(
-            status_code=500,
-            detail=f"S3 error ({error_code}): {error_message}"
-        )
-    except BotoCoreError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"AWS connection error: {str(e)}"
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Unexpected error: {str(e)}"
-        )
+    Start a direct-to-S3 upload of a new cat image.
+    
+    Returns a presigned POST (URL and form fields), or presigned part URLs for
+    large files; image bytes go straight to S3. Call `POST /cat-images/uploads/complete/`
+    afterwards, or `POST /cat-images/uploads/abort/` to give up.
+    """
+    return await asyncio.to_thread(start_upload, current_user["sub"], upload_in)
+
+
+@router.post("/uploads/complete/", response_model=CatImageRead)
+async def complete_cat_image_upload(
+    completion: CatImageUploadComplete,
+    current_user: dict = Depends(get_current_user)
+) -> CatImageRead:
+    """
+    Finish an upload and add the image to the index, without waiting for the next bucket listing.
+    
+    The image is moved out of the upload prefix, so the returned `key` differs from the upload's.
+    """
+    image = await asyncio.to_thread(complete_upload, current_user["sub"], completion)
+    cat_image_index.register(image)
+    return rendition_pipeline.describe(image.key)
+
+
+@router.post("/uploads/abort/", status_code=204)
+async def abort_cat_image_upload(
+    abort: CatImageUploadAbort,
+    current_user: dict = Depends(get_current_user)
+):
+    """Discard an upload that will not be completed, freeing its stored parts."""
+    await asyncio.to_thread(abort_upload, current_user["sub"], abort)
+
 
+def _ndjson_chunks(urls: Iterator[str]) -> Iterator[str]:
+    while chunk := list(islice(urls, STREAM_CHUNK_SIZE)):
+        yield "".join(json.dumps(url) + "\n" for url in chunk)
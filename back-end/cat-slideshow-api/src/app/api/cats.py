@@ -1,90 +1,114 @@
 """Cat API endpoints."""
 
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session
-from ..db import get_session
-from ..models.cat import Cat, CatCreate, CatUpdate, CatRead
-from ..crud.cat import cat
-from ..crud.user import user as user_crud
-from ..auth import get_current_user
+from typing import FrozenSet, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from ..db import DBSession, get_db
+from ..models.bulk import BulkDelete, BulkDeleteResult
+from ..models.cat import Cat, CatCreate, CatUpdate, CatRead, CatBulkCreate, CatBulkUpdate, CatBulkResult
+from ..crud.cat import cat_async as cat_crud
+from ..auth import get_current_user_id
+from ..conditional import ConditionalGet
+from ..pagination import PageCursor, cursor_param, paginate
+from ..response_cache import CachedRoute
+from ..serialization import JSONRenderer, fields_param
 
 router = APIRouter(prefix="/cats", tags=["cats"])
 
+cat_fields_param = fields_param(CatRead)
+
 
 @router.post("/", response_model=CatRead, status_code=201)
-def create_cat(cat_data: CatCreate, db: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
+async def create_cat(cat_data: CatCreate, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     """Create a new cat."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return cat.create_for_user(db=db, obj_in=cat_data, user_id=db_user.id)
+    return await cat_crud.create_for_user(db=db, obj_in=cat_data, user_id=user_id)
 
 
 @router.get("/", response_model=List[CatRead])
-def list_cats(
+async def list_cats(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     breed: Optional[str] = Query(None, description="Filter by cat breed"),
+    color: Optional[str] = Query(None, description="Filter by cat color"),
     min_age: Optional[int] = Query(None, ge=0, description="Minimum age filter"),
     max_age: Optional[int] = Query(None, ge=0, description="Maximum age filter"),
-    search: Optional[str] = Query(None, description="Search term for cat description"),
-    db: Session = Depends(get_session),
-    current_user: dict = Depends(get_current_user)
+    search: Optional[str] = Query(None, description="Full-text search over name, breed, color and description"),
+    cursor: PageCursor = Depends(cursor_param),
+    fields: Optional[FrozenSet[str]] = Depends(cat_fields_param),
+    conditional: ConditionalGet = Depends(),
+    cached: CachedRoute = Depends(),
+    db: DBSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
 ):
-    """List cats with optional filtering."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    # If breed filter is provided
-    if breed:
-        return cat.get_by_breed(db=db, breed=breed, user_id=db_user.id, skip=skip, limit=limit)
-    
-    # If age range filter is provided
-    if min_age is not None and max_age is not None:
-        return cat.get_by_age_range(db=db, min_age=min_age, max_age=max_age, user_id=db_user.id, skip=skip, limit=limit)
+    """
+    List cats matching all given filters, ordered by ID (by relevance when searching).
     
-    # If search term is provided
+    Follow `X-Next-Cursor` for the next page. Card lists can ask for just the
+    columns they show with `fields`, e.g. `fields=id,name,breed`. Send back the
+    `ETag` as `If-None-Match` to get a 304 when none of your cats changed.
+    Pages are served from the response cache until you next change a cat or slideshow.
+    """
+    if hit := await cached.lookup(user_id):
+        return hit
+    conditional(*await cat_crud.validators_for_user(db=db, user_id=user_id))
+    filters = dict(breed=breed, color=color, min_age=min_age, max_age=max_age, search=search)
     if search:
-        return cat.search_by_description(db=db, search_term=search, user_id=db_user.id, skip=skip, limit=limit)
+        offset = skip + cursor.ranked()
+        cats = await cat_crud.filter_for_user(db=db, user_id=user_id, **filters, skip=offset, limit=limit + 1, fields=fields)
+        return await cached.store(paginate(response, cats, limit, offset=offset), CatRead, fields)
     
-    # Default: return all cats for user
-    return cat.get_multi_for_user(db=db, user_id=db_user.id, skip=skip, limit=limit)
+    cats = await cat_crud.filter_for_user(db=db, user_id=user_id, **filters, skip=skip, limit=limit + 1, after_id=cursor.keyset(), fields=fields)
+    return await cached.store(paginate(response, cats, limit), CatRead, fields)
+
+
+# Bulk routes are declared before /{cat_id}/ so "bulk" is not parsed as an ID
+@router.post("/bulk/", response_model=CatBulkResult, status_code=201)
+async def bulk_create_cats(bulk_data: CatBulkCreate, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Create many cats in one transaction; rejected items are listed in `errors`."""
+    items, errors = await cat_crud.bulk_create_for_user(db=db, objs_in=bulk_data.items, user_id=user_id)
+    return CatBulkResult(items=items, errors=errors)
+
+
+@router.patch("/bulk/", response_model=CatBulkResult)
+async def bulk_update_cats(bulk_data: CatBulkUpdate, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Update many cats in one transaction; unknown IDs are listed in `errors`."""
+    items, errors = await cat_crud.bulk_update_for_user(db=db, objs_in=bulk_data.items, user_id=user_id)
+    return CatBulkResult(items=items, errors=errors)
+
+
+@router.delete("/bulk/", response_model=BulkDeleteResult)
+async def bulk_delete_cats(bulk_data: BulkDelete, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Delete many cats in one statement; unknown IDs are listed in `errors`."""
+    deleted, errors = await cat_crud.bulk_delete_for_user(db=db, ids=bulk_data.ids, user_id=user_id)
+    return BulkDeleteResult(deleted=deleted, errors=errors)
 
 
 @router.get("/{cat_id}/", response_model=CatRead)
-def get_cat(cat_id: int, db: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    """Get a specific cat."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    cat_obj = cat.get_for_user(db=db, id=cat_id, user_id=db_user.id)
+async def get_cat(cat_id: int, fields: Optional[FrozenSet[str]] = Depends(cat_fields_param), conditional: ConditionalGet = Depends(), render: JSONRenderer = Depends(), db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Get a specific cat (only `fields` of it, when given); 304 if unchanged since the `If-None-Match` ETag."""
+    count, last_modified = await cat_crud.validators_for_user(db=db, user_id=user_id, id=cat_id)
+    if not count:
+        raise HTTPException(status_code=404, detail="Cat not found")
+    conditional(count, last_modified)
+    cat_obj = await cat_crud.read_for_user(db=db, id=cat_id, user_id=user_id, fields=fields)
     if not cat_obj:
         raise HTTPException(status_code=404, detail="Cat not found")
-    return cat_obj
+    return render(cat_obj, CatRead, fields)
 
 
 @router.patch("/{cat_id}/", response_model=CatRead)
-def update_cat(cat_id: int, cat_data: CatUpdate, db: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
+async def update_cat(cat_id: int, cat_data: CatUpdate, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     """Update a cat."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    cat_obj = cat.get_for_user(db=db, id=cat_id, user_id=db_user.id)
+    cat_obj = await cat_crud.update_for_user(db=db, id=cat_id, user_id=user_id, obj_in=cat_data)
     if not cat_obj:
         raise HTTPException(status_code=404, detail="Cat not found")
-    return cat.update(db=db, db_obj=cat_obj, obj_in=cat_data)
+    return cat_obj
 
 
 @router.delete("/{cat_id}/", status_code=204)
-def delete_cat(cat_id: int, db: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
+async def delete_cat(cat_id: int, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     """Delete a cat."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    cat_obj = cat.get_for_user(db=db, id=cat_id, user_id=db_user.id)
-    if not cat_obj:
+    if not await cat_crud.delete_for_user(db=db, id=cat_id, user_id=user_id):
         raise HTTPException(status_code=404, detail="Cat not found")
-    cat.remove(db=db, id=cat_id)
 
 
@@ -1,86 +1,221 @@
 """Slideshow API endpoints."""
 
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import Session
-from ..db import get_session
-from ..models.slideshow import Slideshow, SlideshowCreate, SlideshowUpdate, SlideshowRead
-from ..crud.slideshow import slideshow
-from ..crud.user import user as user_crud
-from ..auth import get_current_user
+from typing import FrozenSet, List, NamedTuple, Optional, Sequence, Union
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from ..db import DBSession, get_db
+from ..models.bulk import BulkDelete, BulkDeleteResult
+from ..models.cat_image import SlideshowImage
+from ..models.slideshow import Slideshow, SlideshowCreate, SlideshowUpdate, SlideshowRead, SlideshowSummary, SlideshowManifest, SlideshowBulkCreate, SlideshowBulkUpdate, SlideshowBulkResult
+from ..crud.cat_image import cat_image_async as cat_image_crud
+from ..crud.slideshow import slideshow_async as slideshow_crud
+from ..auth import get_current_user_id
+from ..conditional import ConditionalGet
+from ..pagination import PageCursor, cursor_param, paginate
+from ..preload import preload_link, send_early_hints
+from ..renditions import rendition_pipeline
+from ..response_cache import CachedRoute
+from ..s3 import key_from_url, object_url
+from ..serialization import JSONRenderer, fields_param
+from ..settings import settings
 
 router = APIRouter(prefix="/slideshows", tags=["slideshows"])
 
+IMAGE_INFO_DESCRIPTION = "Also return `images`: each image URL with its dimensions, dominant color and blurhash"
+INCLUDE_IMAGES_DESCRIPTION = "Return full slideshows with every image URL instead of summaries (image count and cover image)"
 
-@router.post("/", response_model=SlideshowRead, status_code=201)
-def create_slideshow(slideshow_data: SlideshowCreate, db: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    """Create a new slideshow."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return slideshow.create_for_user(db=db, obj_in=slideshow_data, user_id=db_user.id)
+# Sparse fieldsets: listings may be summaries or full slideshows, so either model's fields are accepted
+slideshow_fields_param = fields_param(SlideshowSummary, SlideshowRead)
+
+# Largest image window a single request can ask for
+MAX_IMAGE_LIMIT = 1000
+
+
+class ImageWindow(NamedTuple):
+    """Which of a slideshow's images to return: `limit` images from `offset`, optionally shuffled."""
+    offset: int
+    limit: Optional[int]
+    shuffle_seed: Optional[int]
+
+
+def image_window_param(
+    image_offset: int = Query(0, ge=0, description="Skip this many images"),
+    image_limit: Optional[int] = Query(None, ge=1, le=MAX_IMAGE_LIMIT, description="Return at most this many images (default: all)"),
+    shuffle_seed: Optional[int] = Query(None, description="Shuffle the images; the same seed gives the same order, so windows can be paged"),
+) -> ImageWindow:
+    """Dependency reading the image window of a slideshow request."""
+    return ImageWindow(image_offset, image_limit, shuffle_seed)
+
+
+def _reject_fields_with_image_info(fields: Optional[FrozenSet[str]], image_info: bool) -> None:
+    if fields is not None and image_info:
+        raise HTTPException(status_code=400, detail="fields cannot be combined with image_info")
 
 
-@router.get("/", response_model=List[SlideshowRead])
-def list_slideshows(skip: int = 0, limit: int = 100, db: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    """List all slideshows for current user."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return slideshow.get_multi_for_user(db=db, user_id=db_user.id, skip=skip, limit=limit)
+async def _with_image_info(db, slideshows: Sequence[Slideshow]) -> List[SlideshowRead]:
+    """Attach image metadata to `slideshows`, fetched for all of their images in one query."""
+    keys = {key for slideshow in slideshows for url in slideshow.image_urls if (key := key_from_url(url))}
+    infos = await cat_image_crud.get_many(db=db, keys=list(keys))
+    return [
+        SlideshowRead.model_validate(slideshow, update={
+            "images": [
+                rendition_pipeline.with_renditions(SlideshowImage(url=url, info=infos.get(key_from_url(url))))
+                for url in slideshow.image_urls
+            ],
+        })
+        for slideshow in slideshows
+    ]
+
+
+@router.post("/", response_model=SlideshowRead, status_code=201)
+async def create_slideshow(slideshow_data: SlideshowCreate, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Create a new slideshow."""
+    return await slideshow_crud.create_for_user(db=db, obj_in=slideshow_data, user_id=user_id)
+
+
+@router.get("/", response_model=Union[List[SlideshowSummary], List[SlideshowRead]])
+async def list_slideshows(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=1000), cursor: PageCursor = Depends(cursor_param), include_images: bool = Query(False, description=INCLUDE_IMAGES_DESCRIPTION), image_info: bool = Query(False, description=IMAGE_INFO_DESCRIPTION), fields: Optional[FrozenSet[str]] = Depends(slideshow_fields_param), conditional: ConditionalGet = Depends(), cached: CachedRoute = Depends(), render: JSONRenderer = Depends(), db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """
+    List all slideshows for current user, as summaries unless `include_images` (implied by `image_info`) is set.
+    
+    With `fields`, only those fields of each summary (or slideshow) are selected and returned.
+    Conditional requests (`If-None-Match`) get a 304 when none of your slideshows changed,
+    and pages are served from the response cache until you next change a cat or slideshow.
+    """
+    _reject_fields_with_image_info(fields, image_info)
+    if not image_info:
+        # Image metadata has its own lifecycle, so image_info responses are neither validated nor cached
+        if hit := await cached.lookup(user_id):
+            return hit
+        conditional(*await slideshow_crud.validators_for_user(db=db, user_id=user_id))
+    summary = not (include_images or image_info)
+    slideshows = await slideshow_crud.get_multi_for_user(db=db, user_id=user_id, skip=skip, limit=limit + 1, after_id=cursor.keyset(), summary=summary, fields=fields)
+    page = paginate(response, slideshows, limit)
+    if image_info:
+        return render(await _with_image_info(db, page), SlideshowRead)
+    return await cached.store(page, SlideshowSummary if summary else SlideshowRead, fields)
+
+
+# Bulk routes are declared before /{slideshow_id}/ so "bulk" is not parsed as an ID
+@router.post("/bulk/", response_model=SlideshowBulkResult, status_code=201)
+async def bulk_create_slideshows(bulk_data: SlideshowBulkCreate, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Create many slideshows in one transaction; rejected items are listed in `errors`."""
+    items, errors = await slideshow_crud.bulk_create_for_user(db=db, objs_in=bulk_data.items, user_id=user_id)
+    return SlideshowBulkResult(items=items, errors=errors)
+
+
+@router.patch("/bulk/", response_model=SlideshowBulkResult)
+async def bulk_update_slideshows(bulk_data: SlideshowBulkUpdate, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Update many slideshows in one transaction; unknown IDs are listed in `errors`."""
+    items, errors = await slideshow_crud.bulk_update_for_user(db=db, objs_in=bulk_data.items, user_id=user_id)
+    return SlideshowBulkResult(items=items, errors=errors)
+
+
+@router.delete("/bulk/", response_model=BulkDeleteResult)
+async def bulk_delete_slideshows(bulk_data: BulkDelete, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Delete many slideshows in one statement; unknown IDs are listed in `errors`."""
+    deleted, errors = await slideshow_crud.bulk_delete_for_user(db=db, ids=bulk_data.ids, user_id=user_id)
+    return BulkDeleteResult(deleted=deleted, errors=errors)
 
 
 @router.get("/{slideshow_id}/", response_model=SlideshowRead)
-def get_slideshow(slideshow_id: int, db: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    """Get a specific slideshow."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    slideshow_obj = slideshow.get_for_user(db=db, id=slideshow_id, user_id=db_user.id)
+async def get_slideshow(slideshow_id: int, window: ImageWindow = Depends(image_window_param), image_info: bool = Query(False, description=IMAGE_INFO_DESCRIPTION), fields: Optional[FrozenSet[str]] = Depends(slideshow_fields_param), conditional: ConditionalGet = Depends(), render: JSONRenderer = Depends(), db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """
+    Get a specific slideshow.
+    
+    `image_urls` holds the requested window of images, sliced in the database;
+    `image_count` is the slideshow's total. With `fields`, only those are returned
+    (the image window is not even computed unless `image_urls` is among them).
+    Conditional requests (`If-None-Match`) get a 304 while the slideshow is unchanged.
+    """
+    _reject_fields_with_image_info(fields, image_info)
+    count, last_modified = await slideshow_crud.validators_for_user(db=db, user_id=user_id, id=slideshow_id)
+    if not count:
+        raise HTTPException(status_code=404, detail="Slideshow not found")
+    if not image_info:
+        conditional(count, last_modified)
+    slideshow_obj = await slideshow_crud.get_window_for_user(
+        db=db, id=slideshow_id, user_id=user_id,
+        image_offset=window.offset, image_limit=window.limit, shuffle_seed=window.shuffle_seed,
+        fields=fields,
+    )
     if not slideshow_obj:
         raise HTTPException(status_code=404, detail="Slideshow not found")
-    return slideshow_obj
+    if image_info:
+        return render((await _with_image_info(db, [slideshow_obj]))[0], SlideshowRead)
+    return render(slideshow_obj, SlideshowRead, fields)
+
+
+@router.get("/{slideshow_id}/manifest/", response_model=SlideshowManifest)
+async def get_slideshow_manifest(
+    slideshow_id: int,
+    request: Request,
+    response: Response,
+    window: ImageWindow = Depends(image_window_param),
+    preload: int = Query(settings.manifest_preload_images, ge=0, le=20, description="Leading images to announce as preload links"),
+    db: DBSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Get everything needed to play a slideshow in one round trip.
+    
+    Returns the slideshow, its cat and the requested window of its images (with
+    metadata, when measured, and resized renditions) in playback order, loaded in a single query; players
+    can page through large slideshows window by window. The first `preload` images
+    are listed in a `Link: rel=preload` header, and sent ahead as 103 Early Hints
+    when enabled.
+    """
+    manifest = await slideshow_crud.get_manifest_for_user(
+        db=db, id=slideshow_id, user_id=user_id, url_prefix=object_url(""),
+        image_offset=window.offset, image_limit=window.limit, shuffle_seed=window.shuffle_seed,
+    )
+    if not manifest:
+        raise HTTPException(status_code=404, detail="Slideshow not found")
+    slideshow_obj, images, image_count = manifest
+    images = [rendition_pipeline.with_renditions(image) for image in images]
+    links = [preload_link(image.url) for image in images[:preload]]
+    if links:
+        await send_early_hints(request, links)
+        response.headers["Link"] = ", ".join(links)
+    return SlideshowManifest.model_validate(slideshow_obj, update={
+        "cat": slideshow_obj.cat,
+        "images": images,
+        "image_urls": [image.url for image in images],
+        "image_count": image_count,
+    })
 
 
 @router.patch("/{slideshow_id}/", response_model=SlideshowRead)
-def update_slideshow(slideshow_id: int, slideshow_data: SlideshowUpdate, db: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
+async def update_slideshow(slideshow_id: int, slideshow_data: SlideshowUpdate, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     """Update a slideshow."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    slideshow_obj = slideshow.get_for_user(db=db, id=slideshow_id, user_id=db_user.id)
+    slideshow_obj = await slideshow_crud.update_for_user(db=db, id=slideshow_id, user_id=user_id, obj_in=slideshow_data)
     if not slideshow_obj:
         raise HTTPException(status_code=404, detail="Slideshow not found")
-    return slideshow.update(db=db, db_obj=slideshow_obj, obj_in=slideshow_data)
+    return slideshow_obj
 
 
 @router.delete("/{slideshow_id}/", status_code=204)
-def delete_slideshow(slideshow_id: int, db: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
+async def delete_slideshow(slideshow_id: int, db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     """Delete a slideshow."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    slideshow_obj = slideshow.get_for_user(db=db, id=slideshow_id, user_id=db_user.id)
-    if not slideshow_obj:
+    if not await slideshow_crud.delete_for_user(db=db, id=slideshow_id, user_id=user_id):
         raise HTTPException(status_code=404, detail="Slideshow not found")
-    slideshow.remove(db=db, id=slideshow_id)
 
 
-@router.get("/cat/{cat_id}/", response_model=List[SlideshowRead])
-def get_slideshows_by_cat(cat_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    """Get slideshows by cat ID."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return slideshow.get_by_cat(db=db, cat_id=cat_id, user_id=db_user.id, skip=skip, limit=limit)
+@router.get("/cat/{cat_id}/", response_model=Union[List[SlideshowSummary], List[SlideshowRead]])
+async def get_slideshows_by_cat(cat_id: int, response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=1000), cursor: PageCursor = Depends(cursor_param), include_images: bool = Query(False, description=INCLUDE_IMAGES_DESCRIPTION), fields: Optional[FrozenSet[str]] = Depends(slideshow_fields_param), conditional: ConditionalGet = Depends(), cached: CachedRoute = Depends(), db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Get slideshows by cat ID, as summaries unless `include_images` is set (304 when none of your slideshows changed; cached)."""
+    if hit := await cached.lookup(user_id):
+        return hit
+    conditional(*await slideshow_crud.validators_for_user(db=db, user_id=user_id))
+    slideshows = await slideshow_crud.get_by_cat(db=db, cat_id=cat_id, user_id=user_id, skip=skip, limit=limit + 1, after_id=cursor.keyset(), summary=not include_images, fields=fields)
+    return await cached.store(paginate(response, slideshows, limit), SlideshowRead if include_images else SlideshowSummary, fields)
 
 
 
 
-@router.get("/search/{search_term}/", response_model=List[SlideshowRead])
-def search_slideshows(search_term: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    """Search slideshows by title."""
-    db_user = user_crud.get_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return slideshow.search_by_title(db=db, search_term=search_term, user_id=db_user.id, skip=skip, limit=limit)
+@router.get("/search/{search_term}/", response_model=Union[List[SlideshowSummary], List[SlideshowRead]])
+async def search_slideshows(search_term: str, response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=1000), cursor: PageCursor = Depends(cursor_param), include_images: bool = Query(False, description=INCLUDE_IMAGES_DESCRIPTION), fields: Optional[FrozenSet[str]] = Depends(slideshow_fields_param), conditional: ConditionalGet = Depends(), render: JSONRenderer = Depends(), db: DBSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Search slideshow titles and descriptions, best matches first (as summaries unless `include_images` is set)."""
+    conditional(*await slideshow_crud.validators_for_user(db=db, user_id=user_id))
+    offset = skip + cursor.ranked()
+    slideshows = await slideshow_crud.search(db=db, search_term=search_term, user_id=user_id, skip=offset, limit=limit + 1, summary=not include_images, fields=fields)
+    return render(paginate(response, slideshows, limit, offset=offset), SlideshowRead if include_images else SlideshowSummary, fields)
@@ -0,0 +1,66 @@
+"""Delta sync API endpoint."""
+
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from ..auth import get_current_user_id
+from ..crud.cat import cat_async as cat_crud
+from ..crud.slideshow import slideshow_async as slideshow_crud
+from ..crud.tombstone import tombstone_async as tombstone_crud
+from ..db import DBSession, get_db
+from ..models.sync import SyncChanges, SyncDeleted
+from ..sync import SyncPage, decode_sync_token, encode_sync_token
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("/", response_model=SyncChanges)
+async def sync(
+    since: Optional[str] = Query(None, description="`sync_token` of the previous sync (or page); omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of cats, and of slideshows, per page"),
+    db: DBSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Get the cats and slideshows created, updated or deleted since a sync token.
+    
+    Apply `cats` and `slideshows` as upserts and drop the `deleted` IDs, then keep
+    `sync_token` for the next call. While `has_more` is set, call again right away
+    with that token for the next page. Without `since`, or with a token older than
+    the tombstone retention period, every cat and slideshow is returned over the
+    pages with `full: true`, and the client should replace its local state.
+    Changes can be reported twice around a token; applying them is idempotent.
+    """
+    token = decode_sync_token(since) if since else None
+    if token is not None and token.expired:
+        token = None
+    if token is not None and token.page is not None:
+        # Next page of an unfinished sync: keep its horizon, so the next sync starts where it began
+        horizon, issued_at = token.horizon, token.issued_at
+        since_seq, after_cat_id, after_slideshow_id = token.page
+    else:
+        since_seq = token.horizon if token is not None else None
+        # Read the horizon first: every change not yet visible to the reads below lands at or after it
+        horizon, issued_at = await tombstone_crud.horizon(db=db), None
+        after_cat_id = after_slideshow_id = 0
+    cats = await cat_crud.changed_since(db=db, user_id=user_id, since=since_seq, after_id=after_cat_id, limit=limit + 1)
+    slideshows = await slideshow_crud.changed_since(db=db, user_id=user_id, since=since_seq, after_id=after_slideshow_id, limit=limit + 1)
+    has_more = len(cats) > limit or len(slideshows) > limit
+    cats, slideshows = cats[:limit], slideshows[:limit]
+    # Deletes are few (one row each, pruned after the retention period): all of them come with the first page
+    first_page = token is None or token.page is None
+    deleted = await tombstone_crud.deleted_since(db=db, user_id=user_id, since=since_seq) if since_seq is not None and first_page else {}
+    page = None
+    if has_more:
+        page = SyncPage(
+            since_seq,
+            cats[-1].id if cats else after_cat_id,
+            slideshows[-1].id if slideshows else after_slideshow_id,
+        )
+    return {
+        "cats": cats,
+        "slideshows": slideshows,
+        "deleted": SyncDeleted(cats=deleted.get("cat", []), slideshows=deleted.get("slideshow", [])),
+        "sync_token": encode_sync_token(horizon, issued_at, page),
+        "full": since_seq is None,
+        "has_more": has_more,
+    }
@@ -1,53 +1,28 @@
 """Authentication module for AWS Cognito JWT validation."""
 
-import time
+import hashlib
 from typing import Optional, Dict, Any
-import requests
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWSError, ExpiredSignatureError
+from jose.backends.base import Key
 from boto3 import client
 from botocore.exceptions import ClientError
+from .cache import LRUCache
+from .crud.user import user_async as user_crud
+from .db import DBSession, get_db
+from .jwks import jwks_store
 from .settings import settings
 
 # HTTPBearer scheme for extracting Bearer tokens
 security = HTTPBearer()
 
-# JWKs cache with TTL
-_jwks_cache: Optional[Dict[str, Any]] = None
-_jwks_cache_timestamp: float = 0
+# Claims of already-verified access tokens, keyed by token digest and expiring at the token's exp
+verified_token_cache: LRUCache[bytes, Dict[str, Any]] = LRUCache(settings.token_cache_max_entries)
+jwks_store.on_rotation(verified_token_cache.clear)
 
 
-def get_jwks_url() -> str:
-    """Construct the JWKs URL from Cognito settings."""
-    return f"https://cognito-idp.{settings.aws_region}.amazonaws.com/{settings.user_pool_id}/.well-known/jwks.json"
-
-
-def fetch_jwks() -> Dict[str, Any]:
-    """Fetch and cache JWKs from Cognito with TTL."""
-    global _jwks_cache, _jwks_cache_timestamp
-    
-    current_time = time.time()
-    
-    # Return cached JWKs if still valid
-    if _jwks_cache is not None and (current_time - _jwks_cache_timestamp) < settings.jwks_cache_ttl:
-        return _jwks_cache
-    
-    # Fetch fresh JWKs
-    try:
-        response = requests.get(get_jwks_url(), timeout=10)
-        response.raise_for_status()
-        _jwks_cache = response.json()
-        _jwks_cache_timestamp = current_time
-        return _jwks_cache
-    except requests.RequestException as e:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Failed to fetch JWKs: {str(e)}"
-        )
-
-
-def get_rsa_key(token: str) -> Dict[str, Any]:
+async def get_rsa_key(token: str) -> Key:
     """Get the RSA public key for the token's kid."""
     unverified_header = jwt.get_unverified_header(token)
     kid = unverified_header.get("kid")
@@ -58,19 +33,7 @@ def get_rsa_key(token: str) -> Dict[str, Any]:
             detail="Token missing kid in header"
         )
     
-    jwks = fetch_jwks()
-    rsa_key = None
-    
-    for key in jwks.get("keys", []):
-        if key.get("kid") == kid:
-            rsa_key = {
-                "kty": key["kty"],
-                "kid": key["kid"],
-                "use": key.get("use"),
-                "n": key["n"],
-                "e": key["e"]
-            }
-            break
+    rsa_key = await jwks_store.get_key(kid)
     
     if rsa_key is None:
         raise HTTPException(
@@ -81,11 +44,16 @@ def get_rsa_key(token: str) -> Dict[str, Any]:
     return rsa_key
 
 
-def verify_token(token: str) -> Dict[str, Any]:
+async def verify_token(token: str) -> Dict[str, Any]:
     """Verify JWT access token against Cognito JWKs."""
+    digest = hashlib.sha256(token.encode()).digest()
+    cached_payload = verified_token_cache.get(digest)
+    if cached_payload is not None:
+        return cached_payload
+    
     try:
         # Get RSA key
-        rsa_key = get_rsa_key(token)
+        rsa_key = await get_rsa_key(token)
         
         # Verify and decode token
         payload = jwt.decode(
@@ -104,8 +72,11 @@ def verify_token(token: str) -> Dict[str, Any]:
             }
         )
         
+        verified_token_cache.set(digest, payload, expires_at=payload.get("exp"))
         return payload
         
+    except HTTPException:
+        raise
     except ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -135,7 +106,25 @@ async def get_current_user(
     Raises 401 HTTPException for invalid/missing tokens.
     """
     token = credentials.credentials
-    return verify_token(token)
+    return await verify_token(token)
+
+
+async def get_current_user_id(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: DBSession = Depends(get_db),
+) -> int:
+    """
+    FastAPI dependency to get the database ID of the current authenticated user.
+    
+    Resolves the token's Cognito sub through a short-lived in-process cache, so
+    most requests skip the user lookup query entirely.
+    
+    Raises 401 HTTPException if the user has no database row.
+    """
+    user_id = await user_crud.get_id_by_cognito_sub(db, cognito_sub=current_user.get("sub"))
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user_id
 
 
 async def get_current_user_optional(
@@ -154,7 +143,7 @@ async def get_current_user_optional(
     
     try:
         token = credentials.credentials
-        return verify_token(token)
+        return await verify_token(token)
     except HTTPException:
         return None
 
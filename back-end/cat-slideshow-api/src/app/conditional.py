@@ -0,0 +1,86 @@
+"""Conditional GETs: weak ETags and Last-Modified from cheap per-user validators."""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+
+# Browsers may keep these responses but must revalidate them on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(count: int, last_modified: Optional[datetime], variant: str = "") -> str:
+    """
+    Weak ETag for a set of `count` rows last modified at `last_modified`.
+
+    Every write sets `updated_at` (from the database clock), and deletes change the
+    count and, for collections, `last_modified` (see `CRUDBase.validators_for_user`),
+    so the pair changes whenever the rows do. `variant` (the path and query) separates representations
+    built from the same rows, e.g. different filters or fieldsets.
+    """
+    stamp = last_modified.isoformat() if last_modified is not None else ""
+    digest = hashlib.blake2b(f"{count}:{stamp}:{variant}".encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    """Format a naive UTC datetime as an HTTP date (second precision)."""
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison against an `If-None-Match` list (or `*`)."""
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether `request`'s `If-None-Match` (or, without one, `If-Modified-Since`) says its copy is current."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    return (
+        if_modified_since is not None
+        and last_modified is not None
+        and _not_modified_since(if_modified_since, last_modified)
+    )
+
+
+class ConditionalGet:
+    """
+    Dependency answering conditional GETs before any rows are loaded.
+
+    Call it with the validators of the rows a response is built from (see
+    `CRUDBase.validators_for_user`): a matching `If-None-Match` (or, without one,
+    an `If-Modified-Since` no older than `last_modified`) raises a bodyless 304;
+    otherwise `ETag`, `Last-Modified` and `Cache-Control` are set on the injected
+    `Response` (and carried over by `JSONRenderer`).
+    """
+
+    def __init__(self, request: Request, response: Response):
+        self.request = request
+        self.response = response
+
+    def __call__(self, count: int, last_modified: Optional[datetime]) -> None:
+        url = self.request.url
+        etag = weak_etag(count, last_modified, f"{url.path}?{url.query}")
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if last_modified is not None:
+            headers["Last-Modified"] = http_date(last_modified)
+
+        if is_not_modified(self.request, etag, last_modified):
+            raise HTTPException(status_code=304, headers=headers)
+        self.response.headers.update(headers)
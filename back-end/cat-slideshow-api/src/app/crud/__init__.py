@@ -1,14 +1,19 @@
 """CRUD operations package."""
 
-from .base import CRUDBase
+from .base import AsyncCRUD, CRUDBase
 from .cat import CatCRUD
+from .cat_image import CatImageCRUD
 from .slideshow import SlideshowCRUD
+from .tombstone import TombstoneCRUD
 from .user import UserCRUD
 
 __all__ = [
+    "AsyncCRUD",
     "CRUDBase",
     "CatCRUD",
+    "CatImageCRUD",
     "SlideshowCRUD",
+    "TombstoneCRUD",
     "UserCRUD",
 ]
 
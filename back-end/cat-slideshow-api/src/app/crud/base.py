@@ -1,47 +1,191 @@
 """Base CRUD operations."""
 
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
-from fastapi.encoders import jsonable_encoder
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Collection, Coroutine, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from sqlmodel import Session, select
+from sqlalchemy import Row, func, select as core_select
+from sqlmodel import Session, delete, insert, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..models.base import utcnow
+from ..models.bulk import BulkItemError
+from ..models.sync import Tombstone
 
 ModelType = TypeVar("ModelType")
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
+CRUDType = TypeVar("CRUDType", bound="CRUDBase")
+
+# Session.info key of the (on_write, user_id) pairs a CRUD call wrote and AsyncCRUD has yet to report
+PENDING_WRITES = "pending_writes"
+
+
+def project(columns: Sequence[Any], fields: Optional[Collection[str]] = None) -> list:
+    """The `columns` named in `fields` (a sparse fieldset; `id` is always kept), or all of them."""
+    if fields is None:
+        return list(columns)
+    return [column for column in columns if column.name == "id" or column.name in fields]
+
+
+def select_rows(columns: Sequence[Any]):
+    """`SELECT` of `columns` that yields `Row`s even for one column (sqlmodel's `select` would yield scalars)."""
+    return core_select(*columns)
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """Base CRUD operations class."""
     
-    def __init__(self, model: Type[ModelType]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        read_model: Optional[Type[BaseModel]] = None,
+        on_write: Optional[Callable[[int], Awaitable[None]]] = None,
+        tombstones: bool = False,
+    ):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
         
         **Parameters**
         * `model`: A SQLModel model class
+        * `read_model`: The model responses are built from, for column-projected reads
+        * `on_write`: Awaited with the owner's user ID after a call through `AsyncCRUD`
+          committed writes of user-owned records (e.g. to invalidate that user's
+          cached responses)
+        * `tombstones`: Record deletes in the tombstone table, for delta sync
         """
         self.model = model
+        self.read_model = read_model
+        self.on_write = on_write
+        self.tombstones = tombstones
+
+    def _bury(self, db: Session, ids: Sequence[int], *, user_id: int) -> None:
+        """Record tombstones for the deleted `ids`, in the deleting transaction (stamped by the database clock)."""
+        if not self.tombstones or not ids:
+            return
+        rows = [{"entity": self.model.__tablename__, "entity_id": id, "user_id": user_id} for id in ids]
+        db.exec(insert(Tombstone), params=rows)
+
+    def _written(self, db: Session, user_id: Optional[int]) -> None:
+        """
+        Note a committed write of records owned by `user_id` on the session.
+        
+        The write methods run synchronously, on the event loop under `run_sync`, so
+        `on_write` is not called here: `AsyncCRUD` awaits it once the call returns.
+        """
+        if self.on_write is not None and user_id is not None:
+            db.info.setdefault(PENDING_WRITES, set()).add((self.on_write, user_id))
+
+    def read_columns(self, fields: Optional[Collection[str]] = None) -> list:
+        """
+        Table columns backing `read_model` (restricted to `fields` when given).
+        
+        Read-only listings select these instead of the entity, so rows come back as
+        plain `Row`s without ORM identity-map bookkeeping, and columns the response
+        never shows (search vectors, or whatever a sparse fieldset leaves out) are
+        not fetched at all.
+        """
+        names = self.read_model.model_fields if self.read_model is not None else None
+        columns = [column for column in self.model.__table__.c if names is None or column.name in names]
+        return project(columns, fields)
+
+    def select_read(self, fields: Optional[Collection[str]] = None):
+        """`SELECT` of `read_columns(fields)`, yielding `Row`s."""
+        return select_rows(self.read_columns(fields))
 
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
         """Get a single record by ID."""
         return db.get(self.model, id)
 
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self, db: Session, *, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
     ) -> List[ModelType]:
         """Get multiple records with pagination."""
-        statement = select(self.model).offset(skip).limit(limit)
+        statement = self._paginate(select(self.model), skip=skip, limit=limit, after_id=after_id)
         return db.exec(statement).all()
 
+    def changed_since(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        since: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Row]:
+        """
+        The user's records (as `read_columns` rows, by ID) written at or after change sequence `since`.
+        
+        All of them without `since`. Pages by ID like the list methods (`after_id`, `limit`).
+        Needs a model with `ChangeTrackingMixin`.
+        """
+        statement = self.select_read().where(self.model.user_id == user_id)
+        if since is not None:
+            statement = statement.where(self.model.change_seq >= since)
+        if after_id is not None:
+            statement = statement.where(self.model.id > after_id)
+        return db.exec(statement.order_by(self.model.id).limit(limit)).all()
+
+    def validators_for_user(self, db: Session, *, user_id: int, id: Optional[int] = None) -> Tuple[int, Optional[datetime]]:
+        """
+        Count and last modification time of the user's records (or of record `id`), for conditional GETs.
+        
+        Served from the `(user_id, updated_at)` index without reading any rows. For the
+        whole collection of a model with tombstones, the latest delete counts as a
+        modification too, so `Last-Modified` moves when a record is deleted.
+        """
+        columns = [func.count(), func.max(self.model.updated_at)]
+        if id is None and self.tombstones:
+            columns.append(
+                select(func.max(Tombstone.deleted_at))
+                .where(Tombstone.user_id == user_id, Tombstone.entity == self.model.__tablename__)
+                .scalar_subquery()
+            )
+        statement = select(*columns).where(self.model.user_id == user_id)
+        if id is not None:
+            statement = statement.where(self.model.id == id)
+        count, *stamps = db.exec(statement).one()
+        return count, max((stamp for stamp in stamps if stamp is not None), default=None)
+
+    def _paginate(self, statement, *, skip: int, limit: int, after_id: Optional[int]):
+        """
+        Order by ID and apply keyset (`after_id`) and offset (`skip`) pagination.
+        
+        Per-user queries already filter on `user_id`, so ordering by ID walks the
+        `(user_id, id)` indexes and `after_id` seeks straight to the next page.
+        """
+        if after_id is not None:
+            statement = statement.where(self.model.id > after_id)
+        return statement.order_by(self.model.id).offset(skip).limit(limit)
+
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        """Create a new record."""
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data)
-        db.add(db_obj)
+        """Create a new record in one INSERT ... RETURNING."""
+        return self._insert(db, obj_in.model_dump())
+
+    def create_for_user(self, db: Session, *, obj_in: CreateSchemaType, user_id: int) -> ModelType:
+        """Create a new record owned by the user in one INSERT ... RETURNING."""
+        return self._insert(db, {**obj_in.model_dump(), "user_id": user_id})
+
+    def _insert(self, db: Session, data: Dict[str, Any]) -> ModelType:
+        row = self._insert_values(self.model(**data))
+        db_obj = db.exec(insert(self.model).values(**row).returning(self.model)).scalars().one()
         db.commit()
-        db.refresh(db_obj)
+        self._written(db, row.get("user_id"))
         return db_obj
 
+    def _insert_values(self, db_obj: ModelType) -> Dict[str, Any]:
+        """
+        Column values for inserting `db_obj`.
+        
+        Instantiating the model applied the field defaults (timestamps, empty lists);
+        unset columns with a column default (e.g. `change_seq`) are left to the database.
+        """
+        columns = self.model.__table__.c
+        return {
+            name: value
+            for name, value in db_obj.model_dump(exclude={"id"}).items()
+            if value is not None or name not in columns or columns[name].default is None
+        }
+
     def update(
         self,
         db: Session,
@@ -49,26 +193,161 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        """Update a record."""
-        obj_data = jsonable_encoder(db_obj)
+        """
+        Update a record in one UPDATE ... RETURNING.
+        
+        Only columns whose value actually changes are written, and `updated_at` is set
+        by the database; when nothing changes no statement is issued.
+        """
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
-            update_data = obj_in.dict(exclude_unset=True)
-        
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        
-        db.add(db_obj)
+            update_data = obj_in.model_dump(exclude_unset=True)
+        changes = {
+            field: value
+            for field, value in update_data.items()
+            if field in self.model.model_fields and getattr(db_obj, field) != value
+        }
+        if not changes:
+            return db_obj
+        statement = (
+            update(self.model)
+            .where(self.model.id == db_obj.id)
+            .values(**changes, updated_at=utcnow())
+            .returning(self.model)
+        )
+        db_obj = db.exec(statement).scalars().one()
         db.commit()
-        db.refresh(db_obj)
+        self._written(db, getattr(db_obj, "user_id", None))
         return db_obj
 
     def remove(self, db: Session, *, id: int) -> ModelType:
         """Delete a record."""
         obj = db.get(self.model, id)
         db.delete(obj)
+        if getattr(obj, "user_id", None) is not None:
+            self._bury(db, [id], user_id=obj.user_id)
         db.commit()
+        self._written(db, getattr(obj, "user_id", None))
         return obj
 
+    def bulk_create_for_user(
+        self, db: Session, *, objs_in: Sequence[CreateSchemaType], user_id: int
+    ) -> Tuple[List[ModelType], List[BulkItemError]]:
+        """
+        Create many records owned by the user in one multi-row INSERT ... RETURNING.
+        
+        Items rejected by `_bulk_row_errors` are reported instead of inserted;
+        the created records come back in request order.
+        """
+        rows = [
+            self._insert_values(self.model(**obj_in.model_dump(), user_id=user_id))
+            for obj_in in objs_in
+        ]
+        rejected = self._bulk_row_errors(db, rows, user_id=user_id)
+        errors = [BulkItemError(index=index, detail=detail) for index, detail in rejected.items()]
+        valid_rows = [row for index, row in enumerate(rows) if index not in rejected]
+        if not valid_rows:
+            return [], errors
+        statement = insert(self.model).returning(self.model, sort_by_parameter_order=True)
+        created = db.exec(statement, params=valid_rows).scalars().all()
+        db.commit()
+        self._written(db, user_id)
+        return created, errors
+
+    def bulk_update_for_user(
+        self, db: Session, *, objs_in: Sequence[UpdateSchemaType], user_id: int
+    ) -> Tuple[List[ModelType], List[BulkItemError]]:
+        """
+        Apply many partial updates to records owned by the user in one transaction.
+        
+        Ownership is checked with one SELECT, the updates go out as a single
+        executemany, and the updated records are read back ordered by ID. Each
+        `obj_in` carries the `id` of the record it updates.
+        """
+        ids = [obj_in.id for obj_in in objs_in]
+        owned = set(db.exec(select(self.model.id).where(self.model.id.in_(ids), self.model.user_id == user_id)).all())
+        errors: List[BulkItemError] = []
+        indexed_rows: List[Tuple[int, Dict[str, Any]]] = []
+        for index, obj_in in enumerate(objs_in):
+            if obj_in.id not in owned:
+                errors.append(BulkItemError(index=index, id=obj_in.id, detail=f"{self.model.__name__} not found"))
+            else:
+                indexed_rows.append((index, obj_in.model_dump(exclude_unset=True)))
+        rejected = self._bulk_row_errors(db, [row for _, row in indexed_rows], user_id=user_id)
+        rows = []
+        for position, (index, row) in enumerate(indexed_rows):
+            if position in rejected:
+                errors.append(BulkItemError(index=index, id=row["id"], detail=rejected[position]))
+            else:
+                rows.append(row)
+        if not rows:
+            return [], sorted(errors, key=lambda error: error.index)
+        db.exec(update(self.model).values(updated_at=utcnow()), params=rows)
+        statement = (
+            select(self.model)
+            .where(self.model.id.in_({row["id"] for row in rows}))
+            .order_by(self.model.id)
+            .execution_options(populate_existing=True)
+        )
+        updated = db.exec(statement).all()
+        db.commit()
+        self._written(db, user_id)
+        return updated, sorted(errors, key=lambda error: error.index)
+
+    def bulk_delete_for_user(
+        self, db: Session, *, ids: Sequence[int], user_id: int
+    ) -> Tuple[List[int], List[BulkItemError]]:
+        """Delete many records owned by the user in one DELETE ... RETURNING; unknown IDs are reported."""
+        statement = (
+            delete(self.model)
+            .where(self.model.id.in_(ids), self.model.user_id == user_id)
+            .returning(self.model.id)
+        )
+        deleted = db.exec(statement).scalars().all()
+        self._bury(db, deleted, user_id=user_id)
+        db.commit()
+        if deleted:
+            self._written(db, user_id)
+        deleted_ids = set(deleted)
+        errors = [
+            BulkItemError(index=index, id=id, detail=f"{self.model.__name__} not found")
+            for index, id in enumerate(ids)
+            if id not in deleted_ids
+        ]
+        return sorted(deleted), errors
+
+    def _bulk_row_errors(self, db: Session, rows: List[Dict[str, Any]], *, user_id: int) -> Dict[int, str]:
+        """Hook for model-specific checks on bulk rows; returns error details keyed by row position."""
+        return {}
+
+
+class AsyncCRUD(Generic[CRUDType]):
+    """
+    Awaitable variant of a CRUD object.
+    
+    Exposes every method of the wrapped CRUD object as a coroutine taking the session
+    as its first argument. With an `AsyncSession` the sync method runs through
+    `AsyncSession.run_sync`, i.e. on the async driver without occupying a worker
+    thread; with a sync `Session` it runs in the threadpool, which keeps the sync
+    engine available as an A/B baseline. Writes the call committed are then reported
+    to the CRUD object's `on_write`.
+    """
+    
+    def __init__(self, crud: CRUDType):
+        self.crud = crud
+
+    def __getattr__(self, name: str) -> Callable[..., Coroutine[Any, Any, Any]]:
+        method = getattr(self.crud, name)
+
+        async def call(db: Union[Session, AsyncSession], *args: Any, **kwargs: Any) -> Any:
+            try:
+                if isinstance(db, AsyncSession):
+                    return await db.run_sync(lambda session: method(session, *args, **kwargs))
+                return await run_in_threadpool(method, db, *args, **kwargs)
+            finally:
+                for on_write, user_id in db.info.pop(PENDING_WRITES, ()):
+                    await on_write(user_id)
+
+        call.__name__ = name
+        return call
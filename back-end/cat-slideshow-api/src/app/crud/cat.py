@@ -1,9 +1,13 @@
 """Cat CRUD operations."""
 
-from typing import List, Optional
-from sqlmodel import Session, select
-from ..models.cat import Cat, CatCreate, CatUpdate
-from .base import CRUDBase
+from typing import Collection, List, Optional
+from sqlalchemy import Row
+from sqlmodel import Session, delete, select, update
+from ..models.base import utcnow
+from ..models.cat import Cat, CatCreate, CatRead, CatUpdate
+from ..response_cache import response_cache
+from .base import AsyncCRUD, CRUDBase
+from .search import apply_search
 
 
 class CatCRUD(CRUDBase[Cat, CatCreate, CatUpdate]):
@@ -12,36 +16,91 @@ class CatCRUD(CRUDBase[Cat, CatCreate, CatUpdate]):
         statement = select(Cat).where(Cat.id == id, Cat.user_id == user_id)
         return db.exec(statement).first()
 
-    def get_multi_for_user(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100) -> List[Cat]:
-        statement = select(Cat).where(Cat.user_id == user_id).offset(skip).limit(limit)
+    def read_for_user(self, db: Session, *, id: int, user_id: int, fields: Optional[Collection[str]] = None) -> Optional[Row]:
+        """Read-only variant of `get_for_user`: the cat's `CatRead` columns (or `fields` of them) as a row."""
+        statement = self.select_read(fields).where(Cat.id == id, Cat.user_id == user_id)
+        return db.exec(statement).first()
+
+    def get_multi_for_user(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, fields: Optional[Collection[str]] = None) -> List[Row]:
+        statement = self.select_read(fields).where(Cat.user_id == user_id)
+        statement = self._paginate(statement, skip=skip, limit=limit, after_id=after_id)
         return db.exec(statement).all()
 
-    def create_for_user(self, db: Session, *, obj_in: CatCreate, user_id: int) -> Cat:
-        obj_in_data = obj_in.model_dump()
-        obj_in_data["user_id"] = user_id
-        db_obj = Cat(**obj_in_data)
-        db.add(db_obj)
+    def update_for_user(self, db: Session, *, id: int, user_id: int, obj_in: CatUpdate) -> Optional[Cat]:
+        """Update a cat owned by the user in one statement; returns None if no such cat."""
+        update_data = obj_in.model_dump(exclude_unset=True)
+        if not update_data:
+            return self.get_for_user(db, id=id, user_id=user_id)
+        statement = (
+            update(Cat)
+            .where(Cat.id == id, Cat.user_id == user_id)
+            .values(**update_data, updated_at=utcnow())
+            .returning(Cat)
+        )
+        db_obj = db.exec(statement).scalars().first()
         db.commit()
-        db.refresh(db_obj)
+        if db_obj is not None:
+            self._written(db, user_id)
         return db_obj
 
+    def delete_for_user(self, db: Session, *, id: int, user_id: int) -> bool:
+        """Delete a cat owned by the user in one statement; returns False if no such cat."""
+        statement = delete(Cat).where(Cat.id == id, Cat.user_id == user_id).returning(Cat.id)
+        deleted = db.exec(statement).scalars().first() is not None
+        if deleted:
+            self._bury(db, [id], user_id=user_id)
+        db.commit()
+        if deleted:
+            self._written(db, user_id)
+        return deleted
+
     def get_by_name(self, db: Session, *, name: str, user_id: int) -> Optional[Cat]:
         statement = select(Cat).where(Cat.name == name, Cat.user_id == user_id)
         return db.exec(statement).first()
     
-    def get_by_breed(self, db: Session, *, breed: str, user_id: int, skip: int = 0, limit: int = 100) -> List[Cat]:
-        statement = select(Cat).where(Cat.breed == breed, Cat.user_id == user_id).offset(skip).limit(limit)
-        return db.exec(statement).all()
-    
-    def get_by_age_range(self, db: Session, *, min_age: int, max_age: int, user_id: int, skip: int = 0, limit: int = 100) -> List[Cat]:
-        statement = select(Cat).where(Cat.age >= min_age, Cat.age <= max_age, Cat.user_id == user_id).offset(skip).limit(limit)
-        return db.exec(statement).all()
-    
-    def search_by_description(self, db: Session, *, search_term: str, user_id: int, skip: int = 0, limit: int = 100) -> List[Cat]:
-        statement = select(Cat).where(Cat.description.contains(search_term), Cat.user_id == user_id).offset(skip).limit(limit)
+    def filter_for_user(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        breed: Optional[str] = None,
+        color: Optional[str] = None,
+        min_age: Optional[int] = None,
+        max_age: Optional[int] = None,
+        search: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        fields: Optional[Collection[str]] = None,
+    ) -> List[Row]:
+        """
+        List the user's cats matching every given filter in one query.
+        
+        Results are ordered by ID and keyset-paginated, or ranked by relevance and
+        offset-paginated when `search` is given (`after_id` is then ignored). Rows
+        hold the `CatRead` columns, or only `fields` of them.
+        """
+        statement = self.select_read(fields).where(Cat.user_id == user_id)
+        if breed is not None:
+            statement = statement.where(Cat.breed == breed)
+        if color is not None:
+            statement = statement.where(Cat.color == color)
+        if min_age is not None:
+            statement = statement.where(Cat.age >= min_age)
+        if max_age is not None:
+            statement = statement.where(Cat.age <= max_age)
+        if search:
+            statement = apply_search(statement, Cat, search).offset(skip).limit(limit)
+        else:
+            statement = self._paginate(statement, skip=skip, limit=limit, after_id=after_id)
         return db.exec(statement).all()
 
+    def search(self, db: Session, *, search_term: str, user_id: int, skip: int = 0, limit: int = 100, fields: Optional[Collection[str]] = None) -> List[Row]:
+        """Full-text search over name, breed, color and description, ranked by relevance."""
+        return self.filter_for_user(db, user_id=user_id, search=search_term, skip=skip, limit=limit, fields=fields)
+
 
-# Create instance
-cat = CatCRUD(Cat)
+# Create instances
+cat = CatCRUD(Cat, read_model=CatRead, on_write=response_cache.invalidate_user, tombstones=True)
+cat_async = AsyncCRUD(cat)
 
@@ -0,0 +1,57 @@
+"""Cat image metadata CRUD operations."""
+
+from typing import Any, Dict, Sequence
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, delete, select
+from ..models.base import utcnow
+from ..models.cat_image import CatImage, CatImageMetadata
+from .base import AsyncCRUD, CRUDBase
+
+
+class CatImageCRUD(CRUDBase[CatImage, CatImageMetadata, CatImageMetadata]):
+    """Cat image metadata CRUD operations."""
+    def get_many(self, db: Session, *, keys: Sequence[str]) -> Dict[str, CatImage]:
+        """Metadata rows for `keys` in one query, by key (unmeasured keys are absent)."""
+        if not keys:
+            return {}
+        statement = select(CatImage).where(CatImage.key.in_(set(keys)))
+        return {image.key: image for image in db.exec(statement).all()}
+
+    def get_etags(self, db: Session, *, keys: Sequence[str]) -> Dict[str, str]:
+        """ETag each of `keys` was last measured at, by key."""
+        if not keys:
+            return {}
+        statement = select(CatImage.key, CatImage.etag).where(CatImage.key.in_(set(keys)))
+        return dict(db.exec(statement).all())
+
+    def save(self, db: Session, *, key: str, etag: str, metadata: Dict[str, Any]) -> CatImage:
+        """
+        Insert or replace the metadata of `key` (keeping its `created_at`).
+        
+        One INSERT ... ON CONFLICT (key) DO UPDATE, so workers measuring the same
+        key concurrently overwrite each other instead of failing on the primary key.
+        """
+        values = self._insert_values(CatImage(key=key, etag=etag, **metadata))
+        dialect = db.get_bind().dialect.name
+        insert_stmt = (pg_insert if dialect == "postgresql" else sqlite_insert)(CatImage).values(**values)
+        excluded = insert_stmt.excluded
+        upsert = insert_stmt.on_conflict_do_update(
+            index_elements=[CatImage.key],
+            set_={**{name: excluded[name] for name in ["etag", *metadata]}, "updated_at": utcnow()},
+        )
+        statement = upsert.returning(CatImage).execution_options(populate_existing=True)
+        db_obj = db.exec(statement).scalars().one()
+        db.commit()
+        return db_obj
+
+    def delete_keys(self, db: Session, *, keys: Sequence[str]) -> int:
+        """Delete the metadata of `keys`; returns how many rows were removed."""
+        deleted = db.exec(delete(CatImage).where(CatImage.key.in_(set(keys)))).rowcount
+        db.commit()
+        return deleted
+
+
+# Create instances
+cat_image = CatImageCRUD(CatImage)
+cat_image_async = AsyncCRUD(cat_image)
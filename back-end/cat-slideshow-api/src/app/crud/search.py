@@ -0,0 +1,41 @@
+"""Full-text search helpers backed by Postgres tsvector columns."""
+
+import re
+from typing import Any, Optional
+from sqlalchemy import false, func, literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+# Text search configuration; must match the one used by the search_vector columns in the migration
+SEARCH_CONFIG = "english"
+
+_WORD = re.compile(r"\w+")
+
+
+def prefix_tsquery(search_term: str) -> Optional[str]:
+    """
+    Turn free-form user input into a tsquery that matches every word as a prefix.
+
+    "fluffy whi" becomes "fluffy:* & whi:*", so results narrow as the user types.
+    Returns None when the input has no searchable words.
+    """
+    words = _WORD.findall(search_term.lower())
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def search_vector(model: Any):
+    """The generated `search_vector` column of `model`'s table (maintained by Postgres, not mapped)."""
+    return literal_column(f'"{model.__tablename__}".search_vector', type_=TSVECTOR)
+
+
+def apply_search(statement, model: Any, search_term: str):
+    """Filter `statement` to rows matching `search_term`, best matches first (GIN-indexed)."""
+    tsquery = prefix_tsquery(search_term)
+    if tsquery is None:
+        return statement.where(false())
+    query = func.to_tsquery(SEARCH_CONFIG, tsquery)
+    vector = search_vector(model)
+    return statement.where(vector.op("@@")(query)).order_by(
+        func.ts_rank_cd(vector, query).desc(), model.id
+    )
@@ -1,9 +1,63 @@
 """Slideshow CRUD operations."""
 
-from typing import List, Optional
-from sqlmodel import Session, select
-from ..models.slideshow import Slideshow, SlideshowCreate, SlideshowUpdate
-from .base import CRUDBase
+from typing import Any, Collection, Dict, List, Optional, Tuple
+from sqlalchemy import Row, cast, func, literal, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import contains_eager, defer
+from sqlmodel import Session, delete, select, update
+from ..models.base import utcnow
+from ..models.cat import Cat
+from ..models.cat_image import CatImage, SlideshowImage
+from ..models.slideshow import Slideshow, SlideshowCreate, SlideshowRead, SlideshowUpdate
+from ..response_cache import response_cache
+from .base import AsyncCRUD, CRUDBase, project, select_rows
+from .search import apply_search
+
+
+def image_count():
+    """Number of images of a slideshow (`array_length` is NULL for an empty array)."""
+    return func.coalesce(func.array_length(Slideshow.image_urls, 1), 0)
+
+
+def scalar_columns() -> list:
+    """Every slideshow column except the (possibly very large) image array."""
+    return [column for column in Slideshow.__table__.c if column.name != "image_urls"]
+
+
+def summary_columns() -> list:
+    """Slideshow columns for listings: the image array reduced to its count and first (cover) image."""
+    return [*scalar_columns(), image_count().label("image_count"), Slideshow.image_urls[1].label("cover_image_url")]
+
+
+def image_window(image_offset: int = 0, image_limit: Optional[int] = None, shuffle_seed: Optional[int] = None):
+    """
+    Correlated select of (url, sort_key, position) rows for a window of `Slideshow.image_urls`.
+    
+    Rows are in array order, or with `shuffle_seed` in an order that is random per
+    seed but stable across requests, so consecutive windows never repeat an image.
+    """
+    images = func.unnest(Slideshow.image_urls).table_valued("url", with_ordinality="position").render_derived("u")
+    if shuffle_seed is None:
+        sort_key = images.c.position
+    else:
+        sort_key = func.md5(func.concat(str(shuffle_seed), ":", images.c.position))
+    return (
+        select(images.c.url, sort_key.label("sort_key"), images.c.position)
+        .order_by(sort_key, images.c.position)
+        .offset(image_offset)
+        .limit(image_limit)
+    )
+
+
+def windowed_image_urls(image_offset: int = 0, image_limit: Optional[int] = None, shuffle_seed: Optional[int] = None):
+    """A window of `Slideshow.image_urls` as an array expression, so only the window leaves the database."""
+    if shuffle_seed is None:
+        upper = image_count() if image_limit is None else image_offset + image_limit
+        urls = Slideshow.image_urls[image_offset + 1:upper]
+    else:
+        window = image_window(image_offset, image_limit, shuffle_seed).subquery("picked")
+        urls = select(func.array_agg(aggregate_order_by(window.c.url, window.c.sort_key, window.c.position))).scalar_subquery()
+    return func.coalesce(urls, cast(literal("{}"), Slideshow.image_urls.type))
 
 
 class SlideshowCRUD(CRUDBase[Slideshow, SlideshowCreate, SlideshowUpdate]):
@@ -12,27 +66,146 @@ class SlideshowCRUD(CRUDBase[Slideshow, SlideshowCreate, SlideshowUpdate]):
         statement = select(Slideshow).where(Slideshow.id == id, Slideshow.user_id == user_id)
         return db.exec(statement).first()
 
-    def get_multi_for_user(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100) -> List[Slideshow]:
-        statement = select(Slideshow).where(Slideshow.user_id == user_id).offset(skip).limit(limit)
+    def get_window_for_user(
+        self,
+        db: Session,
+        *,
+        id: int,
+        user_id: int,
+        image_offset: int = 0,
+        image_limit: Optional[int] = None,
+        shuffle_seed: Optional[int] = None,
+        fields: Optional[Collection[str]] = None,
+    ) -> Optional[Row]:
+        """
+        Load a slideshow row with only a window of its `image_urls` (see `image_window`) and its `image_count`.
+        
+        With `fields`, only those columns are selected; the window and the count are
+        not computed unless asked for.
+        """
+        columns = project(scalar_columns(), fields)
+        if fields is None or "image_urls" in fields:
+            columns.append(windowed_image_urls(image_offset, image_limit, shuffle_seed).label("image_urls"))
+        if fields is None or "image_count" in fields:
+            columns.append(image_count().label("image_count"))
+        statement = select_rows(columns).where(Slideshow.id == id, Slideshow.user_id == user_id)
+        return db.exec(statement).first()
+
+    def get_multi_for_user(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, summary: bool = False, fields: Optional[Collection[str]] = None) -> List[Row]:
+        """List the user's slideshows as rows of `summary_columns`, or of the `SlideshowRead` columns unless `summary`."""
+        statement = self._select(summary, fields).where(Slideshow.user_id == user_id)
+        statement = self._paginate(statement, skip=skip, limit=limit, after_id=after_id)
         return db.exec(statement).all()
 
-    def create_for_user(self, db: Session, *, obj_in: SlideshowCreate, user_id: int) -> Slideshow:
-        obj_in_data = obj_in.model_dump()
-        obj_in_data["user_id"] = user_id
-        db_obj = Slideshow(**obj_in_data)
-        db.add(db_obj)
+    def update_for_user(self, db: Session, *, id: int, user_id: int, obj_in: SlideshowUpdate) -> Optional[Slideshow]:
+        """Update a slideshow owned by the user in one statement; returns None if no such slideshow."""
+        update_data = obj_in.model_dump(exclude_unset=True)
+        if not update_data:
+            return self.get_for_user(db, id=id, user_id=user_id)
+        statement = (
+            update(Slideshow)
+            .where(Slideshow.id == id, Slideshow.user_id == user_id)
+            .values(**update_data, updated_at=utcnow())
+            .returning(Slideshow)
+        )
+        db_obj = db.exec(statement).scalars().first()
         db.commit()
-        db.refresh(db_obj)
+        if db_obj is not None:
+            self._written(db, user_id)
         return db_obj
 
-    def get_by_cat(self, db: Session, *, cat_id: int, user_id: int, skip: int = 0, limit: int = 100) -> List[Slideshow]:
-        statement = select(Slideshow).where(Slideshow.cat_id == cat_id, Slideshow.user_id == user_id).offset(skip).limit(limit)
+    def delete_for_user(self, db: Session, *, id: int, user_id: int) -> bool:
+        """Delete a slideshow owned by the user in one statement; returns False if no such slideshow."""
+        statement = delete(Slideshow).where(Slideshow.id == id, Slideshow.user_id == user_id).returning(Slideshow.id)
+        deleted = db.exec(statement).scalars().first() is not None
+        if deleted:
+            self._bury(db, [id], user_id=user_id)
+        db.commit()
+        if deleted:
+            self._written(db, user_id)
+        return deleted
+
+    def get_manifest_for_user(
+        self,
+        db: Session,
+        *,
+        id: int,
+        user_id: int,
+        url_prefix: str,
+        image_offset: int = 0,
+        image_limit: Optional[int] = None,
+        shuffle_seed: Optional[int] = None,
+    ) -> Optional[Tuple[Slideshow, List[SlideshowImage], int]]:
+        """
+        Load a slideshow, its cat and a window of its images with their metadata in one query.
+        
+        The window of `image_urls` (see `image_window`) is unnested in playback order and
+        each URL under `url_prefix` (the images bucket) is joined to its `cat_image` row
+        by key. The cat is loaded into `Slideshow.cat`; `image_urls` itself is not loaded.
+        Returns the slideshow, the window's images and the total image count, or None
+        if the user has no such slideshow.
+        """
+        statement = self.manifest_query(
+            id=id, user_id=user_id, url_prefix=url_prefix,
+            image_offset=image_offset, image_limit=image_limit, shuffle_seed=shuffle_seed,
+        )
+        rows = db.exec(statement).all()
+        if not rows:
+            return None
+        # A slideshow without images (or a window past its end) still yields one row, with NULL image columns
+        slideshow_obj, count = rows[0][0], rows[0][1]
+        return slideshow_obj, [SlideshowImage(url=url, info=info) for _, _, url, info in rows if url is not None], count
+
+    def manifest_query(
+        self,
+        *,
+        id: int,
+        user_id: int,
+        url_prefix: str,
+        image_offset: int = 0,
+        image_limit: Optional[int] = None,
+        shuffle_seed: Optional[int] = None,
+    ):
+        """The statement behind `get_manifest_for_user`: one row per image of the window, in playback order."""
+        images = image_window(image_offset, image_limit, shuffle_seed).lateral("image")
+        image_key = func.substr(images.c.url, len(url_prefix) + 1)
+        return (
+            select(Slideshow, image_count().label("image_count"), images.c.url, CatImage)
+            .join(Slideshow.cat)
+            .outerjoin(images, true())
+            .outerjoin(CatImage, (CatImage.key == image_key) & images.c.url.startswith(url_prefix, autoescape=True))
+            .where(Slideshow.id == id, Slideshow.user_id == user_id)
+            .options(contains_eager(Slideshow.cat), defer(Slideshow.image_urls))
+            .order_by(images.c.sort_key, images.c.position)
+        )
+
+    def get_by_cat(self, db: Session, *, cat_id: int, user_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, summary: bool = False, fields: Optional[Collection[str]] = None) -> List[Row]:
+        statement = self._select(summary, fields).where(Slideshow.cat_id == cat_id, Slideshow.user_id == user_id)
+        statement = self._paginate(statement, skip=skip, limit=limit, after_id=after_id)
         return db.exec(statement).all()
     
-    def search_by_title(self, db: Session, *, search_term: str, user_id: int, skip: int = 0, limit: int = 100) -> List[Slideshow]:
-        statement = select(Slideshow).where(Slideshow.title.contains(search_term), Slideshow.user_id == user_id).offset(skip).limit(limit)
-        return db.exec(statement).all()
+    def search(self, db: Session, *, search_term: str, user_id: int, skip: int = 0, limit: int = 100, summary: bool = False, fields: Optional[Collection[str]] = None) -> List[Row]:
+        """Full-text search over title and description, ranked by relevance."""
+        statement = apply_search(self._select(summary, fields).where(Slideshow.user_id == user_id), Slideshow, search_term)
+        return db.exec(statement.offset(skip).limit(limit)).all()
+
+    def _select(self, summary: bool, fields: Optional[Collection[str]] = None):
+        """Column-projected select of listing rows: summaries, or the `SlideshowRead` columns (`fields` of them, when given)."""
+        return select_rows(project(summary_columns(), fields)) if summary else self.select_read(fields)
+
+    def _bulk_row_errors(self, db: Session, rows: List[Dict[str, Any]], *, user_id: int) -> Dict[int, str]:
+        """Reject bulk rows that point at a cat the user does not own (one query for the batch)."""
+        cat_ids = {row["cat_id"] for row in rows if "cat_id" in row}
+        if not cat_ids:
+            return {}
+        owned = set(db.exec(select(Cat.id).where(Cat.id.in_(cat_ids), Cat.user_id == user_id)).all())
+        return {
+            position: "Cat not found"
+            for position, row in enumerate(rows)
+            if "cat_id" in row and row["cat_id"] not in owned
+        }
 
 
-# Create instance
-slideshow = SlideshowCRUD(Slideshow)
+# Create instances
+slideshow = SlideshowCRUD(Slideshow, read_model=SlideshowRead, on_write=response_cache.invalidate_user, tombstones=True)
+slideshow_async = AsyncCRUD(slideshow)
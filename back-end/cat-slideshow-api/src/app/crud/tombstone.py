@@ -0,0 +1,38 @@
+"""Tombstone CRUD operations for delta sync."""
+
+from datetime import datetime
+from typing import Dict, List
+from sqlmodel import Session, delete, select
+from ..models.base import change_horizon
+from ..models.sync import Tombstone
+from .base import AsyncCRUD, CRUDBase
+
+
+class TombstoneCRUD(CRUDBase[Tombstone, Tombstone, Tombstone]):
+    """Tombstone CRUD operations (tombstones are written by the deleting CRUD objects)."""
+    def horizon(self, db: Session) -> int:
+        """The current change horizon; read it before the changes it will be the next sync token for."""
+        return db.exec(select(change_horizon())).one()
+
+    def deleted_since(self, db: Session, *, user_id: int, since: int) -> Dict[str, List[int]]:
+        """IDs of the user's rows deleted at or after change sequence `since`, by table name."""
+        statement = (
+            select(Tombstone.entity, Tombstone.entity_id)
+            .where(Tombstone.user_id == user_id, Tombstone.change_seq >= since)
+            .order_by(Tombstone.entity_id)
+        )
+        deleted: Dict[str, List[int]] = {}
+        for entity, entity_id in db.exec(statement).all():
+            deleted.setdefault(entity, []).append(entity_id)
+        return deleted
+
+    def prune(self, db: Session, *, before: datetime) -> int:
+        """Drop tombstones of deletes before `before`; returns how many were dropped."""
+        pruned = db.exec(delete(Tombstone).where(Tombstone.deleted_at < before)).rowcount
+        db.commit()
+        return pruned
+
+
+# Create instances
+tombstone = TombstoneCRUD(Tombstone)
+tombstone_async = AsyncCRUD(tombstone)
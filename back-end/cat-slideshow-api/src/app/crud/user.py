@@ -1,9 +1,18 @@
 """User CRUD operations."""
 
 from typing import Optional
+from sqlalchemy import literal, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import Session, select
+from ..cache import LRUCache
+from ..models.base import utcnow
 from ..models.user import User, UserCreate, UserUpdate
-from .base import CRUDBase
+from ..settings import settings
+from .base import AsyncCRUD, CRUDBase
+
+# Cognito sub -> user.id, shared by every authenticated request
+user_id_cache: LRUCache[str, int] = LRUCache(settings.user_id_cache_max_entries, ttl=settings.user_id_cache_ttl)
 
 
 class UserCRUD(CRUDBase[User, UserCreate, UserUpdate]):
@@ -19,18 +28,59 @@ class UserCRUD(CRUDBase[User, UserCreate, UserUpdate]):
         statement = select(User).where(User.cognito_sub == cognito_sub)
         return db.exec(statement).first()
     
-    def upsert_by_email(self, db: Session, *, user_in: UserCreate) -> User:
-        """Upsert user by email (create if not exists, return existing otherwise)."""
-        existing_user = self.get_by_email(db, email=user_in.email)
+    def get_id_by_cognito_sub(self, db: Session, *, cognito_sub: str) -> Optional[int]:
+        """Get user ID by Cognito sub, served from the in-process cache when possible."""
+        user_id = user_id_cache.get(cognito_sub)
+        if user_id is None:
+            statement = select(User.id).where(User.cognito_sub == cognito_sub)
+            user_id = db.exec(statement).first()
+            if user_id is not None:
+                user_id_cache.set(cognito_sub, user_id)
+        return user_id
+    
+    def upsert_by_email(self, db: Session, *, user_in: UserCreate) -> int:
+        """
+        Upsert user by email and return the user's ID.
         
-        if existing_user:
-            # Update if needed
-            update_data = UserUpdate(**user_in.model_dump())
-            return self.update(db, db_obj=existing_user, obj_in=update_data)
+        Runs `INSERT ... ON CONFLICT (email) DO UPDATE ... WHERE <changed> RETURNING id`,
+        so an unchanged user is not rewritten. On Postgres the fallback lookup for that
+        case rides in the same statement; other dialects issue it separately.
+        """
+        values = self._insert_values(User(**user_in.model_dump()))
+        dialect = db.get_bind().dialect.name
+        insert_stmt = (pg_insert if dialect == "postgresql" else sqlite_insert)(User).values(**values)
+        excluded = insert_stmt.excluded
+        upsert = insert_stmt.on_conflict_do_update(
+            index_elements=[User.email],
+            set_={"cognito_sub": excluded.cognito_sub, "name": excluded.name, "updated_at": utcnow()},
+            where=or_(User.cognito_sub != excluded.cognito_sub, User.name != excluded.name),
+        ).returning(User.id)
+        
+        if dialect == "postgresql":
+            upserted = upsert.cte("upserted")
+            statement = (
+                select(upserted.c.id, literal(True).label("written"))
+                .union_all(select(User.id, literal(False)).where(User.email == user_in.email))
+                .limit(1)
+            )
+            row = db.exec(statement).first()
         else:
-            # Create new
-            return self.create(db, obj_in=user_in)
+            written_id = db.exec(upsert).scalar()
+            row = (written_id, True) if written_id is not None else None
+        if row is None:
+            # Nothing changed outside Postgres, or a concurrent login inserted the row
+            # after this statement's snapshot was taken
+            row = (db.exec(select(User.id).where(User.email == user_in.email)).one(), False)
+        db.commit()
+        
+        user_id, written = row
+        if written:
+            # The user's Cognito sub may have changed; drop any stale sub -> id mappings
+            user_id_cache.discard_value(user_id)
+        user_id_cache.set(user_in.cognito_sub, user_id)
+        return user_id
 
 
-# Create instance
+# Create instances
 user = UserCRUD(User)
+user_async = AsyncCRUD(user)
@@ -1,20 +1,99 @@
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Union
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from functools import lru_cache
 from .settings import settings
 
+# Either session flavour; CRUD calls go through AsyncCRUD, which accepts both
+DBSession = Union[Session, AsyncSession]
+
+
+class PoolStats:
+    """Counters for connection-pool checkouts and the time spent waiting for them."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "avg_wait_ms": 1000 * self.total_wait / self.checkouts if self.checkouts else 0.0,
+                "max_wait_ms": 1000 * self.max_wait,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class TimedCheckoutMixin:
+    """Pool mixin that records how long each checkout takes, including waits on a full pool."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            pool_stats.record_checkout(time.perf_counter() - start)
+
+
+class TimedQueuePool(TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_kwargs() -> Dict[str, Any]:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def _set_search_path(dbapi_conn, connection_record):
+    """Set the search_path to 'app' schema on each connection."""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("SET search_path TO app")
+    cursor.close()
+
+
 @lru_cache()
 def get_engine():
     """Get database engine."""
-    engine = create_engine(settings.runtime_db_url, pool_pre_ping=True)
-    
+    engine = create_engine(settings.runtime_db_url, poolclass=TimedQueuePool, **_pool_kwargs())
     # Set search_path to 'app' schema for all connections
-    @event.listens_for(engine, "connect")
-    def set_search_path(dbapi_conn, connection_record):
-        """Set the search_path to 'app' schema on each connection."""
-        with dbapi_conn.cursor() as cursor:
-            cursor.execute("SET search_path TO app")
-    
+    event.listen(engine, "connect", _set_search_path)
+    return engine
+
+
+@lru_cache()
+def get_async_engine():
+    """Get async database engine (psycopg 3 async driver)."""
+    url = make_url(settings.runtime_db_url)
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+psycopg")
+    engine = create_async_engine(url, poolclass=TimedAsyncAdaptedQueuePool, **_pool_kwargs())
+    event.listen(engine.sync_engine, "connect", _set_search_path)
     return engine
 
 # With Alembic in place, we do not create tables on startup.
@@ -23,7 +102,29 @@ def init_db() -> None:
     # Placeholder for future startup logic (e.g., seed data).
     return None
 
-def get_session() -> Session:
-    """Get database session."""
+def get_session() -> Iterator[Session]:
+    """Get a request-scoped database session, closed (and its connection returned) when the request ends."""
     engine = get_engine()
-    return Session(engine)
+    # Keep loaded attributes after commit so RETURNING results serialize without a reload
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """Get a request-scoped async database session."""
+    engine = get_async_engine()
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+
+# Session dependency for resource routes; DB_ASYNC switches engines for A/B comparison
+get_db = get_async_session if settings.db_async else get_session
+
+def get_pool_status() -> Dict[str, Any]:
+    """Current connection-pool occupancy plus cumulative checkout timings."""
+    pool = (get_async_engine() if settings.db_async else get_engine()).pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.db_max_overflow,
+        **pool_stats.snapshot(),
+    }
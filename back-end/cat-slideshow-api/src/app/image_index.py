@@ -0,0 +1,227 @@
+"""In-memory index of the cat images bucket with background refresh."""
+
+import asyncio
+import bisect
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .s3 import get_s3_client, object_url, s3_http_error
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ImageObject(NamedTuple):
+    """The parts of an S3 listing entry the index keeps."""
+    key: str
+    etag: str
+    last_modified: datetime
+    size: int
+
+
+class ImageIndexChange(NamedTuple):
+    """Keys added, modified (new ETag or LastModified) and removed by a refresh."""
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+class ImagePage(NamedTuple):
+    """A page of the listing: keys, their URLs, and the last key when more keys follow."""
+    keys: List[str]
+    urls: List[str]
+    last_key: Optional[str]
+
+
+class CatImageIndex:
+    """
+    In-memory listing of the cat images bucket, by key.
+
+    `GET /cat-images/` is served from memory; the bucket is only listed by
+    `run_refresh_loop` (started from the app lifespan) every `ttl` seconds, or on
+    first use. Listing runs in a worker thread on the shared S3 client, concurrent
+    refreshes share a single in-flight listing, and the last good listing keeps
+    being served while a refresh runs (or after one fails).
+
+    Refreshes diff the listing against the index by ETag and LastModified and only
+    rebuild the URL list when something changed; callbacks registered with
+    `on_change` receive the `ImageIndexChange`.
+
+    Keys under `hidden_prefix` (derived images) are indexed but not listed. Keys
+    under `ignored_prefix` (uploads not yet completed) are not indexed at all.
+    """
+
+    def __init__(self, *, bucket: str, ttl: float, hidden_prefix: Optional[str] = None, ignored_prefix: Optional[str] = None):
+        self.bucket = bucket
+        self.ttl = ttl
+        self.hidden_prefix = hidden_prefix
+        self.ignored_prefix = ignored_prefix
+        self._objects: Dict[str, ImageObject] = {}
+        # Sorted keys and their URLs, replaced (never mutated) on refresh so readers see a consistent snapshot
+        self._snapshot: Tuple[List[str], List[str]] = ([], [])
+        self._refreshed_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Objects registered while a listing is in flight, merged into that listing when it lands
+        self._registered: Dict[str, ImageObject] = {}
+        self._change_callbacks: List[Callable[[ImageIndexChange], None]] = []
+
+    def on_change(self, callback: Callable[[ImageIndexChange], None]) -> None:
+        """Register `callback` to run whenever a refresh changes the bucket contents."""
+        self._change_callbacks.append(callback)
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether at least one listing has succeeded."""
+        return self._refreshed_at is not None
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the index is missing or older than the TTL."""
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.ttl
+
+    def get(self, key: str) -> Optional[ImageObject]:
+        """The listing entry of `key` at the last refresh, if any."""
+        return self._objects.get(key)
+
+    def contains(self, key: str) -> bool:
+        """Whether `key` was in the bucket at the last refresh (hidden keys included)."""
+        return key in self._objects
+
+    async def urls(self) -> List[str]:
+        """Return the URL of every image, in key order."""
+        await self.ensure_fresh()
+        return self._snapshot[1]
+
+    async def ensure_fresh(self) -> None:
+        """Load the index on first use; afterwards only kick off a background refresh when stale."""
+        if not self.is_loaded:
+            await self.refresh()
+        elif self.is_stale:
+            # Stale-while-revalidate: answer now, refresh in the background.
+            self._start_refresh()
+
+    def page(
+        self, *, prefix: str = "", after_key: Optional[str] = None, limit: Optional[int] = None
+    ) -> ImagePage:
+        """
+        Return up to `limit` keys starting with `prefix`, after `after_key`.
+
+        The page's `last_key` is the position for the next page, or None on the
+        last page. Seeks by bisection, so cost is O(log n + limit).
+        """
+        keys, urls = self._snapshot
+        start = end = self._seek(keys, prefix, after_key)
+        stop = len(keys) if limit is None else min(len(keys), start + limit)
+        while end < stop and keys[end].startswith(prefix):
+            end += 1
+        has_more = end < len(keys) and keys[end].startswith(prefix)
+        return ImagePage(keys[start:end], urls[start:end], keys[end - 1] if has_more else None)
+
+    def iter_urls(self, *, prefix: str = "", after_key: Optional[str] = None) -> Iterator[str]:
+        """Lazily yield URLs of keys starting with `prefix`, after `after_key`, in key order."""
+        keys, urls = self._snapshot
+        for index in range(self._seek(keys, prefix, after_key), len(keys)):
+            if not keys[index].startswith(prefix):
+                return
+            yield urls[index]
+
+    @staticmethod
+    def _seek(keys: List[str], prefix: str, after_key: Optional[str]) -> int:
+        start = bisect.bisect_left(keys, prefix)
+        if after_key is not None:
+            start = max(start, bisect.bisect_right(keys, after_key))
+        return start
+
+    async def refresh(self) -> None:
+        """Refresh the index, joining the in-flight refresh if there is one."""
+        try:
+            await asyncio.shield(self._start_refresh())
+        except Exception as e:
+            if not self.is_loaded:
+                raise s3_http_error(e)
+
+    async def run_refresh_loop(self) -> None:
+        """Refresh the index every `ttl` seconds until cancelled."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                pass  # Already logged; retry on the next tick.
+            await asyncio.sleep(self.ttl)
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+            self._refresh_task.add_done_callback(self._log_refresh_failure)
+        return self._refresh_task
+
+    def register(self, obj: ImageObject) -> None:
+        """
+        Add or update a single object without re-listing the bucket (e.g. a completed upload).
+
+        A listing already in flight may have been taken before the object existed, so the
+        object is also kept aside and merged into that listing before it replaces the index.
+        """
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._registered[obj.key] = obj
+        listing = {**self._objects, obj.key: obj}
+        self._apply(listing, self._diff(listing))
+
+    async def _refresh(self) -> None:
+        self._registered = {}
+        listing = await asyncio.to_thread(self._list_objects)
+        for key, obj in self._registered.items():
+            if key not in listing or listing[key].last_modified < obj.last_modified:
+                listing[key] = obj
+        self._registered = {}
+        self._apply(listing, self._diff(listing))
+        self._refreshed_at = time.monotonic()
+
+    def _apply(self, listing: Dict[str, ImageObject], change: ImageIndexChange) -> None:
+        if not change:
+            return
+        keys = sorted(key for key in listing if not (self.hidden_prefix and key.startswith(self.hidden_prefix)))
+        self._objects = listing
+        self._snapshot = (keys, [object_url(key) for key in keys])
+        for callback in self._change_callbacks:
+            callback(change)
+
+    def _diff(self, listing: Dict[str, ImageObject]) -> ImageIndexChange:
+        added, changed = [], []
+        for key, obj in listing.items():
+            previous = self._objects.get(key)
+            if previous is None:
+                added.append(key)
+            elif (previous.etag, previous.last_modified) != (obj.etag, obj.last_modified):
+                changed.append(key)
+        removed = [key for key in self._objects if key not in listing]
+        return ImageIndexChange(added, changed, removed)
+
+    def _list_objects(self) -> Dict[str, ImageObject]:
+        paginator = get_s3_client().get_paginator("list_objects_v2")
+        listing = {}
+        for page in paginator.paginate(Bucket=self.bucket):
+            for obj in page.get("Contents", []):
+                if self.ignored_prefix and obj["Key"].startswith(self.ignored_prefix):
+                    continue
+                listing[obj["Key"]] = ImageObject(obj["Key"], obj["ETag"], obj["LastModified"], obj["Size"])
+        return listing
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Cat image index refresh failed: %s", task.exception())
+
+
+# Process-wide image index
+cat_image_index = CatImageIndex(
+    bucket=settings.cat_images_bucket_name,
+    ttl=settings.cat_image_index_ttl,
+    hidden_prefix=settings.rendition_prefix,
+    ignored_prefix=settings.upload_prefix,
+)
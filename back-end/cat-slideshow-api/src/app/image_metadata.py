@@ -0,0 +1,127 @@
+"""Background measurement of cat images into the `cat_image` table."""
+
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+from sqlmodel import Session
+
+from .crud.cat_image import cat_image as cat_image_crud
+from .db import get_engine
+from .image_index import CatImageIndex, ImageIndexChange, cat_image_index
+from .imaging import extract_metadata, get_process_pool, pillow_available
+from .s3 import get_s3_client
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Keys looked up per query when checking which images need (re-)measuring
+ETAG_BATCH_SIZE = 1000
+
+
+def _default_session() -> Session:
+    return Session(get_engine(), expire_on_commit=False)
+
+
+class ImageMetadataWorker:
+    """
+    Keeps the `cat_image` table in step with the image index.
+
+    New and changed objects whose stored ETag differs (checked in batches, so a
+    restart only re-measures what changed) are downloaded in a thread and measured
+    in the shared image process pool; rows of removed objects are deleted.
+    """
+
+    def __init__(
+        self,
+        *,
+        index: CatImageIndex,
+        bucket: str,
+        workers: Optional[int] = None,
+        session_factory: Callable[[], Session] = _default_session,
+    ):
+        self.index = index
+        self.bucket = bucket
+        self.workers = workers or 2
+        self.session_factory = session_factory
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: "set[asyncio.Task]" = set()
+
+    def handle_change(self, change: ImageIndexChange) -> None:
+        """Index change listener: queue stale originals, drop rows of removed ones."""
+        hidden = self.index.hidden_prefix
+        keys = [key for key in change.added + change.changed if not (hidden and key.startswith(hidden))]
+        if keys:
+            self._spawn(self._enqueue_stale(keys))
+        if change.removed:
+            self._spawn(asyncio.to_thread(self._delete, change.removed))
+
+    async def measure(self, key: str) -> None:
+        """Download `key`, measure it and store its metadata."""
+        obj = self.index.get(key)
+        if obj is None:
+            return  # Removed since it was queued
+        data = await asyncio.to_thread(self._read, key)
+        loop = asyncio.get_running_loop()
+        metadata = await loop.run_in_executor(get_process_pool(), extract_metadata, data)
+        await asyncio.to_thread(self._save, key, obj.etag, metadata)
+
+    async def run(self) -> None:
+        """Measure queued images with `workers` concurrent tasks until cancelled."""
+        if not pillow_available():
+            logger.warning("Image metadata enabled but Pillow is not installed; worker not started")
+            return
+        self.index.on_change(self.handle_change)
+        await asyncio.gather(*(self._work() for _ in range(self.workers)))
+
+    async def _enqueue_stale(self, keys: List[str]) -> None:
+        for start in range(0, len(keys), ETAG_BATCH_SIZE):
+            batch = keys[start:start + ETAG_BATCH_SIZE]
+            stored = await asyncio.to_thread(self._get_etags, batch)
+            for key in batch:
+                obj = self.index.get(key)
+                if obj is not None and stored.get(key) != obj.etag:
+                    self._queue.put_nowait(key)
+
+    async def _work(self) -> None:
+        while True:
+            key = await self._queue.get()
+            try:
+                await self.measure(key)
+            except Exception as e:
+                logger.warning("Measuring image %s failed: %s", key, e)
+            finally:
+                self._queue.task_done()
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Image metadata update failed: %s", task.exception())
+
+    def _read(self, key: str) -> bytes:
+        return get_s3_client().get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def _get_etags(self, keys: List[str]):
+        with self.session_factory() as db:
+            return cat_image_crud.get_etags(db, keys=keys)
+
+    def _save(self, key: str, etag: str, metadata) -> None:
+        with self.session_factory() as db:
+            cat_image_crud.save(db, key=key, etag=etag, metadata=metadata)
+
+    def _delete(self, keys: List[str]) -> None:
+        with self.session_factory() as db:
+            cat_image_crud.delete_keys(db, keys=keys)
+
+
+# Process-wide worker
+image_metadata_worker = ImageMetadataWorker(
+    index=cat_image_index,
+    bucket=settings.cat_images_bucket_name,
+    workers=settings.image_metadata_workers,
+)
@@ -0,0 +1,148 @@
+"""Image decoding helpers shared by the rendition and metadata workers (optional Pillow)."""
+
+import hashlib
+import io
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .settings import settings
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional: install the `images` extra to process images
+    Image = ImageOps = features = None
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def pillow_available() -> bool:
+    """Whether the optional Pillow dependency is installed."""
+    return Image is not None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for CPU-bound image work, created on first use.
+
+    Decoding and resizing hold the GIL, so they run in separate processes
+    (`RENDITION_WORKERS`, default the CPU count) rather than in threads.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.rendition_workers or os.cpu_count() or 1)
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the image worker processes."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def extract_metadata(data: bytes, components: Tuple[int, int] = (4, 3)) -> Dict[str, Any]:
+    """
+    Measure an encoded image: dimensions, byte size, MIME type, SHA-256, dominant color and blurhash.
+
+    CPU-bound; runs in the image process pool.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        content_type = Image.MIME.get(image.format, "application/octet-stream")
+        width, height = image.size
+        # EXIF orientations 5-8 are rotated by 90 degrees: the displayed image is height x width
+        if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            width, height = height, width
+        # Only a 32px thumbnail is needed, so let the JPEG decoder skip most of the pixels
+        image.draft("RGB", (64, 64))
+        thumbnail = ImageOps.exif_transpose(image).convert("RGB")
+        thumbnail.thumbnail((32, 32))
+    return {
+        "width": width,
+        "height": height,
+        "byte_size": len(data),
+        "content_type": content_type,
+        "content_hash": hashlib.sha256(data).hexdigest(),
+        "dominant_color": dominant_color(thumbnail),
+        "blurhash": blurhash_encode(thumbnail, *components),
+    }
+
+
+def dominant_color(image) -> str:
+    """Most common color of a small RGB image after reducing it to a few colors, as `#rrggbb`."""
+    quantized = image.quantize(colors=5)
+    palette = quantized.getpalette()
+    _, index = max(quantized.getcolors())
+    return "#{:02x}{:02x}{:02x}".format(*palette[index * 3:index * 3 + 3])
+
+
+def blurhash_encode(image, components_x: int = 4, components_y: int = 3) -> str:
+    """
+    Encode a small RGB image as a blurhash (https://blurha.sh).
+
+    Clients decode the ~20 character string into a blurred placeholder while the
+    real image loads. Cost is proportional to pixels x components, so pass a
+    thumbnail.
+    """
+    width, height = image.size
+    pixels = [_SRGB_TO_LINEAR[channel] for channel in image.tobytes()]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(components_x)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(components_y)]
+
+    factors: List[Tuple[float, float, float]] = []
+    for j in range(components_y):
+        for i in range(components_x):
+            normalisation = 1 if i == j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width * 3
+                for x in range(width):
+                    basis = cos_x[i][x] * cos_y[j][y]
+                    offset = row + x * 3
+                    r += basis * pixels[offset]
+                    g += basis * pixels[offset + 1]
+                    b += basis * pixels[offset + 2]
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((components_x - 1) + (components_y - 1) * 9, 1)
+    if ac:
+        quantised_max = max(0, min(82, int(max(abs(v) for factor in ac for v in factor) * 166 - 0.5)))
+        maximum = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        maximum = 1.0
+        result += _encode83(0, 1)
+    result += _encode83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (_quantise_ac(v / maximum) for v in factor)
+        result += _encode83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def _srgb_to_linear(value: int) -> float:
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+_SRGB_TO_LINEAR = [_srgb_to_linear(value) for value in range(256)]
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _quantise_ac(value: float) -> int:
+    return max(0, min(18, int(math.floor(math.copysign(abs(value) ** 0.5, value) * 9 + 9.5))))
+
+
+def _encode83(value: int, length: int) -> str:
+    return "".join(BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
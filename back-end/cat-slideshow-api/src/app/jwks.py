@@ -0,0 +1,149 @@
+"""Cognito JWKS key store with background refresh."""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from fastapi import HTTPException, status
+from jose import jwk
+from jose.backends.base import Key
+from jose.exceptions import JWKError
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_jwks_url() -> str:
+    """Construct the JWKs URL from Cognito settings."""
+    return f"https://cognito-idp.{settings.aws_region}.amazonaws.com/{settings.user_pool_id}/.well-known/jwks.json"
+
+
+class JWKSKeyStore:
+    """
+    In-memory index of the Cognito key set, by `kid`.
+
+    Each refresh parses the published JWKs into ready-to-use public key objects
+    once, so token verification never re-parses key material per request.
+
+    The key set is kept fresh by `run_refresh_loop`, started from the app lifespan.
+    Lookups never block the event loop: the HTTP fetch runs in a worker thread,
+    concurrent refreshes share a single in-flight fetch, and the last good key set
+    keeps being served while a refresh runs (or after one fails). An unknown `kid`
+    waits for the in-flight refresh, if any, or else triggers an immediate refetch,
+    throttled by `min_refetch_interval`.
+
+    Callbacks registered with `on_rotation` run whenever a refresh changes the keys.
+    """
+
+    def __init__(self, *, ttl: float, min_refetch_interval: float, fetch_timeout: float = 10):
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.fetch_timeout = fetch_timeout
+        self._jwks: Dict[str, Dict[str, Any]] = {}
+        self._keys: Dict[str, Key] = {}
+        self._fetched_at: Optional[float] = None
+        self._last_attempt: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._rotation_callbacks: List[Callable[[], None]] = []
+
+    def on_rotation(self, callback: Callable[[], None]) -> None:
+        """Register `callback` to run whenever the published key set changes."""
+        self._rotation_callbacks.append(callback)
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the key set is missing or older than the TTL."""
+        return self._fetched_at is None or time.monotonic() - self._fetched_at >= self.ttl
+
+    async def get_key(self, kid: str) -> Optional[Key]:
+        """Return the public key for `kid`, or None if Cognito does not publish it."""
+        key = self._keys.get(kid)
+        if key is not None:
+            if self.is_stale:
+                # Stale-while-revalidate: answer now, refresh in the background.
+                self._start_refresh()
+            return key
+
+        if self._refresh_task is not None and not self._refresh_task.done():
+            # A fetch is already running (e.g. the startup fetch): wait for its keys.
+            await self.refresh()
+        elif self._can_refetch():
+            await self.refresh()
+        elif not self._keys:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="JWKs unavailable: the last fetch failed"
+            )
+        return self._keys.get(kid)
+
+    async def refresh(self) -> None:
+        """Refresh the key set, joining the in-flight refresh if there is one."""
+        try:
+            await asyncio.shield(self._start_refresh())
+        except Exception as e:
+            if not self._keys:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=f"Failed to fetch JWKs: {str(e)}"
+                )
+
+    async def run_refresh_loop(self) -> None:
+        """Refresh the key set every `ttl` seconds until cancelled."""
+        while True:
+            try:
+                await self.refresh()
+            except HTTPException:
+                pass  # Already logged; retry on the next tick.
+            await asyncio.sleep(self.ttl)
+
+    def _can_refetch(self) -> bool:
+        if self._last_attempt is None:
+            return True
+        return time.monotonic() - self._last_attempt >= self.min_refetch_interval
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+            self._refresh_task.add_done_callback(self._log_refresh_failure)
+        return self._refresh_task
+
+    async def _refresh(self) -> None:
+        self._last_attempt = time.monotonic()
+        jwks = await asyncio.to_thread(self._fetch)
+        published = {key["kid"]: key for key in jwks.get("keys", []) if "kid" in key}
+        if published != self._jwks:
+            self._keys = await asyncio.to_thread(self._build_index, published)
+            self._jwks = published
+            for callback in self._rotation_callbacks:
+                callback()
+        self._fetched_at = time.monotonic()
+
+    def _fetch(self) -> Dict[str, Any]:
+        response = requests.get(get_jwks_url(), timeout=self.fetch_timeout)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _build_index(published: Dict[str, Dict[str, Any]]) -> Dict[str, Key]:
+        index = {}
+        for kid, key_data in published.items():
+            try:
+                index[kid] = jwk.construct(key_data, algorithm=key_data.get("alg", "RS256"))
+            except JWKError as e:
+                logger.warning("Skipping unusable JWK %s: %s", kid, e)
+        return index
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("JWKS refresh failed: %s", task.exception())
+
+
+# Process-wide key store
+jwks_store = JWKSKeyStore(
+    ttl=settings.jwks_cache_ttl,
+    min_refetch_interval=settings.jwks_refetch_min_interval,
+)
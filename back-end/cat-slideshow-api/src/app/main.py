@@ -1,22 +1,55 @@
-from contextlib import asynccontextmanager
+import asyncio
+import os
+from typing import Optional
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .db import init_db
-from .api import cats_router, slideshows_router, cat_images_router, auth_router
+from fastapi.staticfiles import StaticFiles
+from .db import init_db, get_async_engine, get_pool_status
+from .image_index import cat_image_index
+from .image_metadata import image_metadata_worker
+from .imaging import shutdown_process_pool
+from .jwks import jwks_store
+from .auth import verified_token_cache
+from .api import cats_router, slideshows_router, cat_images_router, auth_router, sync_router
+from .pagination import NEXT_CURSOR_HEADER
+from .preload import EarlyHintsMiddleware
+from .renditions import rendition_pipeline
+from .response_cache import response_cache
 from .settings import settings
+from .sync import run_prune_loop
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    background_tasks = [
+        asyncio.create_task(jwks_store.run_refresh_loop()),
+        asyncio.create_task(cat_image_index.run_refresh_loop()),
+        asyncio.create_task(run_prune_loop()),
+    ]
+    if settings.renditions_enabled:
+        background_tasks.append(asyncio.create_task(rendition_pipeline.run()))
+    if settings.image_metadata_enabled:
+        background_tasks.append(asyncio.create_task(image_metadata_worker.run()))
     yield
+    for task in background_tasks:
+        task.cancel()
+    for task in background_tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+    shutdown_process_pool()
+    if settings.db_async:
+        await get_async_engine().dispose()
 
-def create_app() -> FastAPI:
+def create_app(fast_json: Optional[bool] = None) -> FastAPI:
+    """Build the app; `fast_json` overrides the `FAST_JSON` setting (see `serialization.JSONRenderer`)."""
     app = FastAPI(
         title="Cat Slideshow API",
         description="A scalable API for managing cats and slideshows",
         version="1.0.0",
         lifespan=lifespan
     )
+    app.state.fast_json = settings.fast_json if fast_json is None else fast_json
     
     # Configure CORS
     app.add_middleware(
@@ -25,18 +58,42 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],  # Allow all HTTP methods
         allow_headers=["*"],  # Allow all headers
+        expose_headers=[NEXT_CURSOR_HEADER, "Link", "ETag"],
     )
+    if settings.early_hints_enabled:
+        app.add_middleware(EarlyHintsMiddleware)
     
     # Include all routers
     app.include_router(auth_router)
     app.include_router(cats_router)
     app.include_router(slideshows_router)
     app.include_router(cat_images_router)
+    app.include_router(sync_router)
+    
+    # Serve locally stored renditions (S3 renditions are served by the bucket)
+    if settings.rendition_store == "local":
+        app.mount(
+            settings.rendition_local_base_url,
+            StaticFiles(directory=os.path.join(settings.rendition_local_dir, settings.rendition_prefix), check_dir=False),
+            name="renditions",
+        )
 
     @app.get("/healthz")
     def healthz():
         return {"status": "ok"}
 
+    @app.get("/healthz/db-pool")
+    def db_pool_status():
+        return get_pool_status()
+
+    @app.get("/healthz/response-cache")
+    def response_cache_status():
+        return response_cache.stats()
+
+    @app.get("/healthz/token-cache")
+    def token_cache_status():
+        return verified_token_cache.stats()
+
     @app.get("/")
     def root():
         return {
@@ -1,20 +1,60 @@
 """Models package."""
 
 from .base import BaseModel
-from .cat import Cat, CatCreate, CatUpdate, CatRead
-from .slideshow import Slideshow, SlideshowCreate, SlideshowUpdate, SlideshowRead
+from .bulk import BulkItemError, BulkDelete, BulkDeleteResult
+from .cat import Cat, CatCreate, CatUpdate, CatRead, CatBulkCreate, CatBulkUpdate, CatBulkUpdateItem, CatBulkResult
+from .cat_image import CatImage, CatImageMetadata, CatImageRead, ImageRendition, SlideshowImage, CatImageUploadCreate, CatImageUpload, CatImageUploadComplete, CatImageUploadAbort, UploadedPart
+from .slideshow import (
+    Slideshow,
+    SlideshowCreate,
+    SlideshowUpdate,
+    SlideshowRead,
+    SlideshowSummary,
+    SlideshowManifest,
+    SlideshowBulkCreate,
+    SlideshowBulkUpdate,
+    SlideshowBulkUpdateItem,
+    SlideshowBulkResult,
+)
+from .sync import Tombstone, SyncDeleted, SyncChanges
 from .user import User, UserCreate, UserUpdate, UserRead
 
 __all__ = [
     "BaseModel",
+    "BulkItemError",
+    "BulkDelete",
+    "BulkDeleteResult",
     "Cat",
     "CatCreate",
     "CatUpdate", 
     "CatRead",
+    "CatBulkCreate",
+    "CatBulkUpdate",
+    "CatBulkUpdateItem",
+    "CatBulkResult",
+    "CatImage",
+    "CatImageMetadata",
+    "CatImageRead",
+    "ImageRendition",
+    "SlideshowImage",
+    "CatImageUploadCreate",
+    "CatImageUpload",
+    "CatImageUploadComplete",
+    "CatImageUploadAbort",
+    "UploadedPart",
     "Slideshow",
     "SlideshowCreate",
     "SlideshowUpdate",
     "SlideshowRead",
+    "SlideshowSummary",
+    "SlideshowManifest",
+    "SlideshowBulkCreate",
+    "SlideshowBulkUpdate",
+    "SlideshowBulkUpdateItem",
+    "SlideshowBulkResult",
+    "Tombstone",
+    "SyncDeleted",
+    "SyncChanges",
     "User",
     "UserCreate",
     "UserUpdate",
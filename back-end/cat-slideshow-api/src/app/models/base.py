@@ -2,18 +2,96 @@
 
 from datetime import datetime
 from typing import Optional
+from sqlalchemy import BigInteger, DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 from sqlmodel import SQLModel, Field
 
 
+class utcnow(FunctionElement):
+    """
+    Database-side current UTC time, matching the naive UTC values of `datetime.utcnow`.
+    
+    Every timestamp compared by conditional GETs and delta sync comes from this one
+    clock, never from the app servers' clocks.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow, "postgresql")
+def _pg_utcnow(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+@compiles(utcnow)
+def _default_utcnow(element, compiler, **kw):
+    # SQLite's 'now' is already UTC; keep milliseconds (CURRENT_TIMESTAMP drops them) so that
+    # updates within a second still move max(updated_at), which conditional GETs rely on
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+class next_change_seq(FunctionElement):
+    """
+    Database-side change sequence value for a row being written (see `change_horizon`).
+    
+    On Postgres this is the writing transaction's ID, which increases with every
+    transaction that writes; rows written by one transaction share it.
+    """
+    type = BigInteger()
+    inherit_cache = True
+
+
+class change_horizon(FunctionElement):
+    """
+    Lowest change sequence value a not-yet-visible write can still carry.
+    
+    Every row whose `change_seq` is below the horizon was committed (or rolled back)
+    before it was read, so a reader that fetches the rows with `change_seq >=` its
+    previous horizon never misses a write, at the cost of occasionally seeing a row
+    twice.
+    """
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(next_change_seq, "postgresql")
+def _pg_next_change_seq(element, compiler, **kw):
+    return "CAST(CAST(pg_current_xact_id() AS TEXT) AS BIGINT)"
+
+
+@compiles(change_horizon, "postgresql")
+def _pg_change_horizon(element, compiler, **kw):
+    # Transactions still running have IDs at or above the snapshot's xmin
+    return "CAST(CAST(pg_snapshot_xmin(pg_current_snapshot()) AS TEXT) AS BIGINT)"
+
+
+@compiles(next_change_seq)
+@compiles(change_horizon)
+def _default_change_seq(element, compiler, **kw):
+    # SQLite serializes writers, so the millisecond clock is a good enough sequence there
+    return "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+
 class BaseModel(SQLModel):
-    """Base model with common fields."""
+    """Base model with common fields; timestamps are set by the database on INSERT (and `updated_at` on every UPDATE)."""
     id: Optional[int] = Field(default=None, primary_key=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default=None, nullable=False, sa_column_kwargs={"default": utcnow()})
+    updated_at: datetime = Field(default=None, nullable=False, sa_column_kwargs={"default": utcnow(), "onupdate": utcnow()})
+
+
+class ChangeTrackingMixin(SQLModel):
+    """Mixin for rows served by delta sync: `change_seq` is set by the database on every INSERT and UPDATE."""
+    change_seq: Optional[int] = Field(
+        default=None,
+        sa_type=BigInteger,
+        nullable=False,
+        sa_column_kwargs={"default": next_change_seq(), "onupdate": next_change_seq()},
+    )
 
 
 class TimestampMixin(SQLModel):
-    """Mixin for timestamp fields."""
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    """Mixin for timestamp fields; set by the database on INSERT (and `updated_at` on every UPDATE)."""
+    created_at: datetime = Field(default=None, nullable=False, sa_column_kwargs={"default": utcnow()})
+    updated_at: datetime = Field(default=None, nullable=False, sa_column_kwargs={"default": utcnow(), "onupdate": utcnow()})
 
@@ -0,0 +1,25 @@
+"""Shared models for bulk endpoints."""
+
+from typing import List, Optional
+from sqlmodel import SQLModel, Field
+
+# Upper bound on items per bulk request
+MAX_BULK_ITEMS = 1000
+
+
+class BulkItemError(SQLModel):
+    """An item of a bulk request that was not applied."""
+    index: int
+    id: Optional[int] = None
+    detail: str
+
+
+class BulkDelete(SQLModel):
+    """Bulk delete request."""
+    ids: List[int] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class BulkDeleteResult(SQLModel):
+    """Bulk delete response."""
+    deleted: List[int]
+    errors: List[BulkItemError] = Field(default_factory=list)
@@ -3,7 +3,9 @@
 from datetime import datetime
 from typing import List, Optional, TYPE_CHECKING
 from sqlmodel import SQLModel, Field, Relationship
-from .base import BaseModel
+from sqlalchemy import Index
+from .base import BaseModel, ChangeTrackingMixin
+from .bulk import MAX_BULK_ITEMS, BulkItemError
 
 
 class CatBase(SQLModel):
@@ -15,9 +17,22 @@ class CatBase(SQLModel):
     description: Optional[str] = None
 
 
-class Cat(CatBase, BaseModel, table=True):
+class Cat(CatBase, BaseModel, ChangeTrackingMixin, table=True):
     """Cat database model."""
-    user_id: int = Field(foreign_key="user.id", index=True)
+    __table_args__ = (
+        # Keyset pagination: WHERE user_id = ? AND id > ? ORDER BY id
+        Index("ix_cat_user_id_id", "user_id", "id"),
+        # Filtered listings: equality filters keep ID order, so keyset pages stay one range scan
+        Index("ix_cat_user_id_breed_id", "user_id", "breed", "id"),
+        Index("ix_cat_user_id_color_id", "user_id", "color", "id"),
+        Index("ix_cat_user_id_age", "user_id", "age"),
+        # Conditional GET validators: count(*), max(updated_at) WHERE user_id = ?
+        Index("ix_cat_user_id_updated_at", "user_id", "updated_at"),
+        # Delta sync: WHERE user_id = ? AND change_seq >= ?
+        Index("ix_cat_user_id_change_seq", "user_id", "change_seq"),
+    )
+
+    user_id: int = Field(foreign_key="user.id")
     
     # Relationships
     slideshows: List["Slideshow"] = Relationship(back_populates="cat")
@@ -45,6 +60,27 @@ class CatRead(CatBase):
     updated_at: datetime
 
 
+class CatBulkCreate(SQLModel):
+    """Bulk cat creation request."""
+    items: List[CatCreate] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class CatBulkUpdateItem(CatUpdate):
+    """A single cat update within a bulk request."""
+    id: int
+
+
+class CatBulkUpdate(SQLModel):
+    """Bulk cat update request."""
+    items: List[CatBulkUpdateItem] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class CatBulkResult(SQLModel):
+    """Bulk cat create/update response: the applied cats plus the items that were rejected."""
+    items: List[CatRead]
+    errors: List[BulkItemError] = Field(default_factory=list)
+
+
 if TYPE_CHECKING:
     from .slideshow import Slideshow
 
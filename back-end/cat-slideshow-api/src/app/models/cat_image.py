@@ -0,0 +1,93 @@
+"""Cat image model definitions."""
+
+from typing import Dict, List, Optional
+from sqlmodel import SQLModel, Field
+from .base import TimestampMixin
+
+
+class CatImageMetadata(SQLModel):
+    """Intrinsic properties of an image, measured by the metadata worker."""
+    width: int
+    height: int
+    byte_size: int
+    content_type: str
+    content_hash: str  # SHA-256 of the object's bytes
+    dominant_color: str  # "#rrggbb"
+    blurhash: str  # https://blurha.sh placeholder
+
+
+class CatImage(CatImageMetadata, TimestampMixin, table=True):
+    """Cat image metadata database model, keyed by S3 key."""
+    __tablename__ = "cat_image"
+
+    key: str = Field(primary_key=True)
+    etag: str  # S3 ETag the metadata was measured from; a new ETag means re-measure
+
+
+class ImageRendition(SQLModel):
+    """A resized derivative of a cat image."""
+    url: str
+    width: int
+    format: str
+
+
+class CatImageRead(SQLModel):
+    """Cat image read model: the original plus its available renditions."""
+    key: str
+    url: str
+    renditions: List[ImageRendition] = []
+    srcset: Dict[str, str] = {}  # format -> "url 320w, url 640w, ..." for <picture><source srcset>
+    info: Optional[CatImageMetadata] = None  # absent until the metadata worker has measured the image
+
+
+class SlideshowImage(SQLModel):
+    """An image of a slideshow with its metadata, when known, and its available renditions."""
+    url: str
+    info: Optional[CatImageMetadata] = None
+    renditions: List[ImageRendition] = []
+    srcset: Dict[str, str] = {}  # format -> "url 320w, url 640w, ..." for <picture><source srcset>
+
+
+class CatImageUploadCreate(SQLModel):
+    """Request to upload a new cat image."""
+    filename: str
+    content_type: str
+    size: int = Field(gt=0)
+
+
+class CatImageUpload(SQLModel):
+    """
+    Where to upload a new cat image.
+    
+    Single uploads POST a multipart/form-data body to `url` with `fields`
+    followed by the file (as `file`); multipart uploads PUT consecutive
+    `part_size` chunks to `part_urls` and pass each response's ETag to the
+    completion endpoint.
+    """
+    key: str
+    method: str  # "post" or "multipart"
+    url: Optional[str] = None
+    fields: Dict[str, str] = {}  # form fields of a presigned POST
+    upload_id: Optional[str] = None
+    part_urls: List[str] = []
+    part_size: Optional[int] = None
+    expires_in: int
+
+
+class UploadedPart(SQLModel):
+    """A part of a multipart upload, as returned by S3."""
+    part_number: int = Field(ge=1)
+    etag: str
+
+
+class CatImageUploadComplete(SQLModel):
+    """Completion of an upload started with `POST /cat-images/uploads/`."""
+    key: str
+    upload_id: Optional[str] = None
+    parts: List[UploadedPart] = []
+
+
+class CatImageUploadAbort(SQLModel):
+    """An upload started with `POST /cat-images/uploads/` that will not be completed."""
+    key: str
+    upload_id: Optional[str] = None
@@ -3,8 +3,11 @@
 from datetime import datetime
 from typing import Optional, List, TYPE_CHECKING
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, ARRAY, String
-from .base import BaseModel
+from sqlalchemy import Column, ARRAY, Index, String
+from .base import BaseModel, ChangeTrackingMixin
+from .bulk import MAX_BULK_ITEMS, BulkItemError
+from .cat import CatRead
+from .cat_image import SlideshowImage
 
 if TYPE_CHECKING:
     from .cat import Cat
@@ -17,11 +20,21 @@ class SlideshowBase(SQLModel):
     image_urls: List[str] = Field(default_factory=list)
 
 
-class Slideshow(SlideshowBase, BaseModel, table=True):
+class Slideshow(SlideshowBase, BaseModel, ChangeTrackingMixin, table=True):
     """Slideshow database model."""
+    __table_args__ = (
+        # Keyset pagination: WHERE user_id = ? [AND cat_id = ?] AND id > ? ORDER BY id
+        Index("ix_slideshow_user_id_id", "user_id", "id"),
+        Index("ix_slideshow_user_id_cat_id_id", "user_id", "cat_id", "id"),
+        # Conditional GET validators: count(*), max(updated_at) WHERE user_id = ?
+        Index("ix_slideshow_user_id_updated_at", "user_id", "updated_at"),
+        # Delta sync: WHERE user_id = ? AND change_seq >= ?
+        Index("ix_slideshow_user_id_change_seq", "user_id", "change_seq"),
+    )
+
     image_urls: List[str] = Field(sa_column=Column(ARRAY(String)), default_factory=list)
     cat_id: int = Field(foreign_key="cat.id")
-    user_id: int = Field(foreign_key="user.id", index=True)
+    user_id: int = Field(foreign_key="user.id")
     
     # Relationships
     cat: "Cat" = Relationship(back_populates="slideshows")
@@ -47,3 +60,45 @@ class SlideshowRead(SlideshowBase):
     user_id: int
     created_at: datetime
     updated_at: datetime
+    images: Optional[List[SlideshowImage]] = None  # image_urls with metadata, when requested
+    image_count: Optional[int] = None  # total images, when image_urls may be a window of them
+
+
+class SlideshowSummary(SQLModel):
+    """Slideshow listing model: the image array reduced to its size and cover image."""
+    id: int
+    title: str
+    description: Optional[str] = None
+    cat_id: int
+    user_id: int
+    created_at: datetime
+    updated_at: datetime
+    image_count: int
+    cover_image_url: Optional[str] = None
+
+
+class SlideshowManifest(SlideshowRead):
+    """Everything needed to play a slideshow: the slideshow, its cat and its images in order."""
+    cat: CatRead
+    images: List[SlideshowImage] = []
+
+
+class SlideshowBulkCreate(SQLModel):
+    """Bulk slideshow creation request."""
+    items: List[SlideshowCreate] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class SlideshowBulkUpdateItem(SlideshowUpdate):
+    """A single slideshow update within a bulk request."""
+    id: int
+
+
+class SlideshowBulkUpdate(SQLModel):
+    """Bulk slideshow update request."""
+    items: List[SlideshowBulkUpdateItem] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class SlideshowBulkResult(SQLModel):
+    """Bulk slideshow create/update response: the applied slideshows plus the items that were rejected."""
+    items: List[SlideshowRead]
+    errors: List[BulkItemError] = Field(default_factory=list)
@@ -0,0 +1,44 @@
+"""Delta sync model definitions."""
+
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import BigInteger, Index
+from sqlmodel import SQLModel, Field
+from .base import next_change_seq, utcnow
+from .cat import CatRead
+from .slideshow import SlideshowRead
+
+
+class Tombstone(SQLModel, table=True):
+    """Record of a deleted row, kept so delta sync can tell clients to drop it."""
+    __table_args__ = (
+        # Delta sync: WHERE user_id = ? AND change_seq >= ?
+        Index("ix_tombstone_user_id_change_seq", "user_id", "change_seq"),
+        # Pruning: WHERE deleted_at < ?
+        Index("ix_tombstone_deleted_at", "deleted_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    entity: str  # table name of the deleted row
+    entity_id: int
+    user_id: int = Field(foreign_key="user.id")
+    change_seq: Optional[int] = Field(
+        default=None, sa_type=BigInteger, nullable=False, sa_column_kwargs={"default": next_change_seq()}
+    )
+    deleted_at: datetime = Field(default=None, nullable=False, sa_column_kwargs={"default": utcnow()})
+
+
+class SyncDeleted(SQLModel):
+    """IDs deleted since the sync token."""
+    cats: List[int] = Field(default_factory=list)
+    slideshows: List[int] = Field(default_factory=list)
+
+
+class SyncChanges(SQLModel):
+    """Delta sync response: what changed since the request's sync token, and the token for next time."""
+    cats: List[CatRead]  # created or updated cats
+    slideshows: List[SlideshowRead]  # created or updated slideshows, with every image URL
+    deleted: SyncDeleted
+    sync_token: str  # pass as `since` on the next sync (or for the next page, while `has_more`)
+    full: bool = False  # true when `since` was missing or expired: replace local state with these pages
+    has_more: bool = False  # more pages of this sync follow: call again with `sync_token` right away
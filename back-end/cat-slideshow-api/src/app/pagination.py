@@ -0,0 +1,77 @@
+"""Opaque cursors for paginating list endpoints."""
+
+import base64
+import json
+from typing import Any, List, NamedTuple, Optional, Sequence, Type, TypeVar
+
+from fastapi import HTTPException, Query, Response
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+T = TypeVar("T")
+
+
+class PageCursor(NamedTuple):
+    """Decoded cursor: a keyset position for ID-ordered lists, or an offset for ranked results."""
+    after_id: Optional[int] = None
+    offset: Optional[int] = None
+
+    def keyset(self) -> Optional[int]:
+        """ID to resume an ID-ordered list after; raises 400 for an offset cursor from a ranked list."""
+        if self.offset is not None:
+            raise HTTPException(status_code=400, detail="Invalid cursor: this cursor is for ranked search results")
+        return self.after_id
+
+    def ranked(self) -> int:
+        """Offset to resume ranked results from; raises 400 for an ID cursor from an ID-ordered list."""
+        if self.after_id is not None:
+            raise HTTPException(status_code=400, detail="Invalid cursor: this cursor is for ID-ordered lists")
+        return self.offset or 0
+
+
+def encode_cursor(value: Any, key: str = "id") -> str:
+    """Encode a page position (the last row ID by default) as an opaque cursor."""
+    payload = json.dumps({key: value}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, key: str = "id", value_type: Type = int) -> Any:
+    """Decode a cursor produced by `encode_cursor`; raises 400 if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded))[key]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(value, value_type) or (value_type is int and value < 0):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+
+def cursor_param(
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from a previous page's {NEXT_CURSOR_HEADER} header"),
+) -> PageCursor:
+    """FastAPI dependency resolving the `cursor` query parameter to a page position."""
+    if not cursor:
+        return PageCursor()
+    try:
+        return PageCursor(after_id=decode_cursor(cursor))
+    except HTTPException:
+        return PageCursor(offset=decode_cursor(cursor, key="offset"))
+
+
+def paginate(response: Response, rows: Sequence[T], limit: int, offset: Optional[int] = None) -> List[T]:
+    """
+    Trim a `limit + 1` row fetch to `limit` rows.
+    
+    The extra row only signals that another page exists; when present, the cursor
+    for that page is set on the response's `X-Next-Cursor` header. Pass the page's
+    `offset` for rank-ordered results, which have no ID keyset to resume from.
+    """
+    page = list(rows[:limit])
+    if len(rows) > limit:
+        if offset is None:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1].id)
+        else:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(offset + limit, key="offset")
+    return page
@@ -0,0 +1,45 @@
+"""Preload hints: `Link: rel=preload` headers and optional 103 Early Hints."""
+
+from typing import Awaitable, Callable, List
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# ASGI extension advertised by servers that can send 103 Early Hints (e.g. Hypercorn)
+EARLY_HINT_EXTENSION = "http.response.early_hint"
+
+
+def preload_link(url: str) -> str:
+    """`Link` header value asking the browser to fetch an image ahead of use."""
+    return f"<{url}>; rel=preload; as=image"
+
+
+class EarlyHintsMiddleware:
+    """
+    Let handlers send a 103 Early Hints response before their final response.
+
+    When the server supports the early hint extension, a `send_early_hints(links)`
+    coroutine is placed on `request.state`; see `send_early_hints`. Otherwise the
+    request passes through untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and EARLY_HINT_EXTENSION in scope.get("extensions", {}):
+            async def send_hints(links: List[str]) -> None:
+                message: Message = {"type": EARLY_HINT_EXTENSION, "links": [link.encode("latin-1") for link in links]}
+                await send(message)
+
+            scope.setdefault("state", {})["send_early_hints"] = send_hints
+        await self.app(scope, receive, send)
+
+
+async def send_early_hints(request: Request, links: List[str]) -> bool:
+    """Send `links` as a 103 Early Hints response if the middleware and server allow it."""
+    send_hints: Callable[[List[str]], Awaitable[None]] = getattr(request.state, "send_early_hints", None)
+    if send_hints is None or not links:
+        return False
+    await send_hints(links)
+    return True
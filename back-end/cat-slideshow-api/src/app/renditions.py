@@ -0,0 +1,272 @@
+"""Resized WebP/AVIF renditions of the cat images."""
+
+import asyncio
+import io
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Protocol, Sequence, Tuple
+
+from .image_index import CatImageIndex, ImageIndexChange, cat_image_index
+from .imaging import Image, ImageOps, features, get_process_pool, pillow_available, shutdown_process_pool
+from .models.cat_image import CatImageMetadata, CatImageRead, ImageRendition, SlideshowImage
+from .s3 import get_s3_client, key_from_url, object_url
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {"webp": "image/webp", "avif": "image/avif", "jpeg": "image/jpeg"}
+
+
+def rendition_key(key: str, width: int, fmt: str, prefix: Optional[str] = None) -> str:
+    """Key of the `width`-pixel `fmt` rendition of the image at `key`."""
+    prefix = settings.rendition_prefix if prefix is None else prefix
+    stem = key.rsplit(".", 1)[0] if "." in key.rsplit("/", 1)[-1] else key
+    return f"{prefix}{width}w/{stem}.{fmt}"
+
+
+def supported_formats(formats: Sequence[str]) -> List[str]:
+    """The subset of `formats` this Pillow build can encode (empty without Pillow)."""
+    if not pillow_available():
+        return []
+    return [fmt for fmt in formats if fmt not in ("webp", "avif") or features.check(fmt)]
+
+
+def render_renditions(data: bytes, widths: Sequence[int], formats: Sequence[str], quality: int) -> List[Tuple[int, str, bytes]]:
+    """
+    Resize an encoded image to each width narrower than the original and encode it in each format.
+
+    CPU-bound; runs in the rendition process pool. Returns (width, format, encoded bytes) tuples.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        # EXIF orientations 5-8 are rotated by 90 degrees: the displayed width is the stored height
+        displayed_width = image.height if image.getexif().get(0x0112, 1) in (5, 6, 7, 8) else image.width
+        widths = sorted((width for width in widths if width < displayed_width), reverse=True)
+        if not widths:
+            return []
+        # Let the JPEG decoder downscale by a power of two while staying at least as large as needed
+        image.draft("RGB", (widths[0], widths[0]))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        results = []
+        for width in widths:
+            # Each rendition is resized from the previous (larger) one, so each step stays cheap
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                buffer = io.BytesIO()
+                image.save(buffer, format=fmt.upper(), quality=quality)
+                results.append((width, fmt, buffer.getvalue()))
+        return results
+
+
+class RenditionStore(Protocol):
+    """Where originals are read from and renditions are written to."""
+
+    def read(self, key: str) -> bytes: ...
+
+    def write(self, key: str, data: bytes, content_type: str) -> None: ...
+
+    def delete(self, keys: Sequence[str]) -> None: ...
+
+    def url(self, key: str) -> str: ...
+
+    def exists(self, key: str) -> bool: ...
+
+
+class S3RenditionStore:
+    """Renditions stored next to the originals in the cat images bucket, looked up in its index."""
+
+    def __init__(self, bucket: str, index: CatImageIndex):
+        self.bucket = bucket
+        self.index = index
+
+    def read(self, key: str) -> bytes:
+        return get_s3_client().get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def write(self, key: str, data: bytes, content_type: str) -> None:
+        get_s3_client().put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl="public, max-age=31536000, immutable",
+        )
+
+    def delete(self, keys: Sequence[str]) -> None:
+        for start in range(0, len(keys), 1000):
+            objects = [{"Key": key} for key in keys[start:start + 1000]]
+            get_s3_client().delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+
+    def url(self, key: str) -> str:
+        return object_url(key)
+
+    def exists(self, key: str) -> bool:
+        return self.index.contains(key)
+
+
+class LocalRenditionStore:
+    """
+    Originals and renditions on the local filesystem (for tests and local development).
+
+    The `prefix` directory (the renditions) is served at `base_url`.
+    """
+
+    def __init__(self, root: str, base_url: str, prefix: str = ""):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+        self.prefix = prefix
+
+    def read(self, key: str) -> bytes:
+        return (self.root / key).read_bytes()
+
+    def write(self, key: str, data: bytes, content_type: str) -> None:
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def delete(self, keys: Sequence[str]) -> None:
+        for key in keys:
+            (self.root / key).unlink(missing_ok=True)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key.removeprefix(self.prefix)}"
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+
+class RenditionPipeline:
+    """
+    Background generator of image renditions.
+
+    Listens to the image index: new or changed images are queued, and renditions
+    of removed images are deleted. Worker tasks fetch each original in a thread,
+    resize and encode it in the shared image process pool (keeping CPU-bound work
+    off the event loop and the GIL), and write the results under `prefix`.
+    """
+
+    def __init__(
+        self,
+        *,
+        store: RenditionStore,
+        index: CatImageIndex,
+        widths: Sequence[int],
+        formats: Sequence[str],
+        quality: int,
+        prefix: str,
+        workers: Optional[int] = None,
+    ):
+        self.store = store
+        self.index = index
+        self.widths = list(widths)
+        self.formats = supported_formats(formats)
+        self.quality = quality
+        self.prefix = prefix
+        self.workers = workers or os.cpu_count() or 1
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+
+    def renditions(self, key: str) -> List[Tuple[int, str, str]]:
+        """(width, format, key) of every rendition `key` can have, narrowest first."""
+        return [
+            (width, fmt, rendition_key(key, width, fmt, self.prefix))
+            for width in self.widths
+            for fmt in self.formats
+        ]
+
+    def available(self, key: str) -> Tuple[List[ImageRendition], Dict[str, str]]:
+        """The renditions of `key` that exist in the store, and the `srcset` of each format."""
+        renditions = [
+            ImageRendition(url=self.store.url(rendition), width=width, format=fmt)
+            for width, fmt, rendition in self.renditions(key)
+            if self.store.exists(rendition)
+        ]
+        srcset: Dict[str, List[str]] = {}
+        for rendition in renditions:
+            srcset.setdefault(rendition.format, []).append(f"{rendition.url} {rendition.width}w")
+        return renditions, {fmt: ", ".join(candidates) for fmt, candidates in srcset.items()}
+
+    def describe(self, key: str, info: Optional[CatImageMetadata] = None) -> CatImageRead:
+        """Build the API view of an image with its available renditions."""
+        renditions, srcset = self.available(key)
+        return CatImageRead(key=key, url=object_url(key), renditions=renditions, srcset=srcset, info=info)
+
+    def with_renditions(self, image: SlideshowImage) -> SlideshowImage:
+        """`image` with the available renditions of its original, when it is in the images bucket."""
+        key = key_from_url(image.url)
+        if key is None:
+            return image
+        renditions, srcset = self.available(key)
+        return image.model_copy(update={"renditions": renditions, "srcset": srcset})
+
+    def handle_change(self, change: ImageIndexChange) -> None:
+        """Index change listener: queue new and changed originals, drop renditions of removed ones."""
+        for key in change.added + change.changed:
+            if key.startswith(self.prefix):
+                continue
+            # Renditions are written together, and widths above the original's are never written
+            if key in change.changed or not any(self.store.exists(r) for _, _, r in self.renditions(key)):
+                self._queue.put_nowait(key)
+        removed = [r for key in change.removed if not key.startswith(self.prefix) for _, _, r in self.renditions(key)]
+        if removed:
+            asyncio.get_running_loop().run_in_executor(None, self._delete, removed)
+
+    async def generate(self, key: str) -> int:
+        """Generate and store every rendition of `key`; returns how many were written."""
+        data = await asyncio.to_thread(self.store.read, key)
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            get_process_pool(), render_renditions, data, self.widths, self.formats, self.quality
+        )
+        for width, fmt, encoded in results:
+            await asyncio.to_thread(
+                self.store.write, rendition_key(key, width, fmt, self.prefix), encoded, CONTENT_TYPES.get(fmt, f"image/{fmt}")
+            )
+        return len(results)
+
+    async def run(self) -> None:
+        """Process queued images with `workers` concurrent tasks until cancelled."""
+        if not self.formats:
+            logger.warning("Renditions enabled but Pillow cannot encode %s; pipeline not started", settings.rendition_formats)
+            return
+        self.index.on_change(self.handle_change)
+        await asyncio.gather(*(self._work() for _ in range(self.workers)))
+
+    def shutdown(self) -> None:
+        """Stop the resize processes."""
+        shutdown_process_pool()
+
+    async def _work(self) -> None:
+        while True:
+            key = await self._queue.get()
+            try:
+                await self.generate(key)
+            except Exception as e:
+                logger.warning("Rendition generation failed for %s: %s", key, e)
+            finally:
+                self._queue.task_done()
+
+    def _delete(self, keys: List[str]) -> None:
+        try:
+            self.store.delete(keys)
+        except Exception as e:
+            logger.warning("Deleting %d stale renditions failed: %s", len(keys), e)
+
+
+def get_rendition_store() -> RenditionStore:
+    """The rendition store selected by `RENDITION_STORE`."""
+    if settings.rendition_store == "local":
+        return LocalRenditionStore(settings.rendition_local_dir, settings.rendition_local_base_url, settings.rendition_prefix)
+    return S3RenditionStore(settings.cat_images_bucket_name, cat_image_index)
+
+
+# Process-wide pipeline
+rendition_pipeline = RenditionPipeline(
+    store=get_rendition_store(),
+    index=cat_image_index,
+    widths=settings.rendition_widths_list,
+    formats=settings.rendition_formats_list,
+    quality=settings.rendition_quality,
+    prefix=settings.rendition_prefix,
+    workers=settings.rendition_workers,
+)
@@ -0,0 +1,371 @@
+"""Per-user cache of serialized, gzip-compressed list responses (in-process or Redis)."""
+
+import gzip
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Collection, Dict, NamedTuple, Optional, Protocol, Set, Tuple, Type
+
+from fastapi import Depends, Request, Response
+from pydantic import BaseModel
+
+from .conditional import is_not_modified
+from .serialization import JSONRenderer
+from .settings import settings
+
+try:
+    import redis
+    import redis.asyncio
+except ImportError:  # redis is optional: install the `cache` extra for RESPONSE_CACHE_BACKEND=redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Headers of a rendered response worth replaying from the cache
+CACHED_HEADERS = ("etag", "last-modified", "cache-control", "x-next-cursor")
+
+
+class CachedResponse(NamedTuple):
+    """A cached response: its replayed headers and gzip-compressed JSON body."""
+    headers: Dict[str, str]
+    body: bytes
+
+    def dumps(self) -> bytes:
+        """Serialize as one blob: a JSON line of headers, then the compressed body."""
+        return json.dumps(self.headers, separators=(",", ":")).encode() + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, payload: bytes) -> "CachedResponse":
+        headers, body = payload.split(b"\n", 1)
+        return cls(json.loads(headers), body)
+
+
+class ResponseCacheBackend(Protocol):
+    """
+    Storage for cached responses, grouped by user.
+
+    Every user has a version that `invalidate_user` bumps. `lookup` reports the
+    version it saw and `store` only stores when the version is still the same, so a
+    response built from rows read before a write never outlives that write.
+    """
+
+    async def lookup(self, user_id: int, variant: str) -> Tuple[Optional[bytes], int]: ...
+
+    async def store(self, user_id: int, variant: str, payload: bytes, version: int) -> bool: ...
+
+    async def invalidate_user(self, user_id: int) -> None: ...
+
+    def stats(self) -> Dict[str, Any]: ...
+
+
+class MemoryBackend:
+    """
+    In-process LRU bounded by the total size of the cached payloads.
+
+    Only for single-process deployments: another worker's writes cannot reach it.
+    Safe to share between the event loop and worker threads.
+
+    Versions come from one counter and are kept in an LRU of `max_versions` users.
+    Users without a kept version read the highest version evicted so far, so an
+    evicted version never reads as unchanged to a store that began before it.
+    """
+
+    def __init__(self, max_bytes: int, *, ttl: Optional[float] = None, max_versions: int = 10000):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_versions = max_versions
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._user_variants: Dict[int, Set[str]] = {}
+        self._versions: "OrderedDict[int, int]" = OrderedDict()
+        self._last_version = 0
+        self._evicted_version = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _version(self, user_id: int) -> int:
+        # Caller holds the lock
+        return self._versions.get(user_id, self._evicted_version)
+
+    async def lookup(self, user_id: int, variant: str) -> Tuple[Optional[bytes], int]:
+        key = (user_id, variant)
+        with self._lock:
+            version = self._version(user_id)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, version
+            payload, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                return None, version
+            self._entries.move_to_end(key)
+            return payload, version
+
+    async def store(self, user_id: int, variant: str, payload: bytes, version: int) -> bool:
+        if len(payload) > self.max_bytes:
+            return False
+        key = (user_id, variant)
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if self._version(user_id) != version:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (payload, expires_at)
+            self._user_variants.setdefault(user_id, set()).add(variant)
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+            return True
+
+    async def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._last_version += 1
+            self._versions[user_id] = self._last_version
+            self._versions.move_to_end(user_id)
+            while len(self._versions) > self.max_versions:
+                _, evicted = self._versions.popitem(last=False)
+                self._evicted_version = max(self._evicted_version, evicted)
+            for variant in self._user_variants.pop(user_id, ()):
+                self._remove((user_id, variant))
+
+    def _remove(self, key: Tuple[int, str]) -> None:
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry[0])
+        variants = self._user_variants.get(key[0])
+        if variants is not None:
+            variants.discard(key[1])
+            if not variants:
+                del self._user_variants[key[0]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "versions": len(self._versions),
+        }
+
+
+class RedisBackend:
+    """
+    Cache in any Redis-protocol server (Redis, Valkey, a local stand-in), shared by all workers.
+
+    A user's responses live in one hash, `{prefix}:{user_id}`, so invalidation is a
+    single DEL; the hash expires `ttl` seconds after its last store. Versions live in
+    `{prefix}:{user_id}:version` and stores are WATCHed on them.
+    """
+
+    def __init__(self, async_client: Any, *, ttl: Optional[int] = None, prefix: str = "response-cache"):
+        self.async_client = async_client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisBackend":
+        if redis is None:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the redis package (install the `cache` extra)")
+        return cls(redis.asyncio.Redis.from_url(url), **kwargs)
+
+    def _keys(self, user_id: int) -> Tuple[str, str]:
+        entries = f"{self.prefix}:{user_id}"
+        return entries, f"{entries}:version"
+
+    async def lookup(self, user_id: int, variant: str) -> Tuple[Optional[bytes], int]:
+        entries, version_key = self._keys(user_id)
+        async with self.async_client.pipeline(transaction=False) as pipe:
+            pipe.hget(entries, variant)
+            pipe.get(version_key)
+            payload, version = await pipe.execute()
+        return payload, int(version or 0)
+
+    async def store(self, user_id: int, variant: str, payload: bytes, version: int) -> bool:
+        entries, version_key = self._keys(user_id)
+        async with self.async_client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(version_key)
+                if int(await pipe.get(version_key) or 0) != version:
+                    return False
+                pipe.multi()
+                pipe.hset(entries, variant, payload)
+                if self.ttl is not None:
+                    pipe.expire(entries, self.ttl)
+                await pipe.execute()
+            except redis.WatchError:
+                return False
+        return True
+
+    async def invalidate_user(self, user_id: int) -> None:
+        entries, version_key = self._keys(user_id)
+        async with self.async_client.pipeline(transaction=True) as pipe:
+            pipe.incr(version_key)
+            pipe.delete(entries)
+            await pipe.execute()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis"}
+
+
+class ResponseCache:
+    """
+    The app's response cache: a backend (or None when disabled) plus hit/miss counters.
+
+    `invalidate_user` is handed to the cat and slideshow CRUD objects, which await it
+    after every committed write of a user's rows.
+    """
+
+    def __init__(self, backend: Optional[ResponseCacheBackend] = None):
+        self.backend = backend
+        self.hits = 0
+        self.not_modified = 0
+        self.misses = 0
+        self.stores = 0
+        self.stale_stores = 0
+        self.invalidations = 0
+        self.failed_invalidations = 0
+
+    @classmethod
+    def from_settings(cls) -> "ResponseCache":
+        kind = settings.response_cache_backend
+        if kind == "memory":
+            return cls(MemoryBackend(settings.response_cache_max_bytes, ttl=settings.response_cache_ttl))
+        if kind == "redis":
+            return cls(RedisBackend.from_url(settings.response_cache_redis_url, ttl=settings.response_cache_ttl))
+        if kind == "off":
+            return cls()
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {kind!r} (expected off, memory or redis)")
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def invalidate_user(self, user_id: int) -> None:
+        """
+        Drop every cached response of the user.
+        
+        Runs after the write committed, so backend errors are logged rather than raised:
+        failing here would report a successful write as failed. The user's entries then
+        live on until the TTL expires them.
+        """
+        if self.backend is None:
+            return
+        try:
+            await self.backend.invalidate_user(user_id)
+        except Exception as e:
+            self.failed_invalidations += 1
+            logger.warning("Response cache invalidation for user %s failed: %s", user_id, e)
+        else:
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and backend occupancy."""
+        lookups = self.hits + self.not_modified + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.not_modified) / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "stale_stores": self.stale_stores,
+            "invalidations": self.invalidations,
+            "failed_invalidations": self.failed_invalidations,
+            **(self.backend.stats() if self.backend is not None else {}),
+        }
+
+
+response_cache = ResponseCache.from_settings()
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an `Accept-Encoding` header allows gzip (explicitly, or via `*`) with a non-zero q-value."""
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+class CachedRoute:
+    """
+    Dependency serving a GET route from `response_cache`, keyed by user, path and query.
+
+    `await cached.lookup(user_id)` returns the cached response (or a 304 when the
+    request's validators match its ETag), or None on a miss; the handler then returns
+    `await cached.store(rows, Model, fields)`, which renders the rows like
+    `JSONRenderer` does. While the cache is enabled the body is always pre-encoded
+    (validated against `Model` when the fast JSON path is off) so it can be stored.
+    Bodies are kept gzip-compressed and sent as-is to clients accepting gzip.
+    """
+
+    def __init__(self, request: Request, render: JSONRenderer = Depends()):
+        self.request = request
+        self.render = render
+        self.user_id: Optional[int] = None
+        self.version = 0
+
+    @property
+    def variant(self) -> str:
+        url = self.request.url
+        return f"{url.path}?{url.query}"
+
+    def _accepts_gzip(self) -> bool:
+        return accepts_gzip(self.request.headers.get("accept-encoding", ""))
+
+    async def lookup(self, user_id: int) -> Optional[Response]:
+        backend = response_cache.backend
+        if backend is None:
+            return None
+        self.user_id = user_id
+        payload, self.version = await backend.lookup(user_id, self.variant)
+        if payload is None:
+            response_cache.misses += 1
+            return None
+        cached = CachedResponse.loads(payload)
+        etag = cached.headers.get("etag")
+        last_modified = cached.headers.get("last-modified")
+        if etag is not None and is_not_modified(
+            self.request, etag, parsedate_to_datetime(last_modified).replace(tzinfo=None) if last_modified else None
+        ):
+            response_cache.not_modified += 1
+            return Response(status_code=304, headers=cached.headers)
+        response_cache.hits += 1
+        return self._respond(cached)
+
+    async def store(self, content: Any, model: Type[BaseModel], fields: Optional[Collection[str]] = None) -> Any:
+        backend = response_cache.backend
+        if backend is None or self.user_id is None:
+            return self.render(content, model, fields)
+        rendered = self.render.encode(content, model, fields)
+        if rendered.status_code != 200:
+            return rendered
+        headers = {name: value for name, value in rendered.headers.items() if name in CACHED_HEADERS}
+        cached = CachedResponse(headers, gzip.compress(rendered.body, compresslevel=6, mtime=0))
+        if await backend.store(self.user_id, self.variant, cached.dumps(), self.version):
+            response_cache.stores += 1
+        else:
+            response_cache.stale_stores += 1
+        return self._respond(cached, rendered.body)
+
+    def _respond(self, cached: CachedResponse, body: Optional[bytes] = None) -> Response:
+        headers = {**cached.headers, "Vary": "Accept-Encoding"}
+        if self._accepts_gzip():
+            headers["Content-Encoding"] = "gzip"
+            return Response(cached.body, headers=headers, media_type="application/json")
+        return Response(body if body is not None else gzip.decompress(cached.body), headers=headers, media_type="application/json")
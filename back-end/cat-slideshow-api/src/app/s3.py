@@ -0,0 +1,57 @@
+"""Process-wide S3 client for the cat images bucket."""
+
+from functools import lru_cache
+from typing import Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from fastapi import HTTPException
+
+from .settings import settings
+
+
+@lru_cache
+def get_s3_client():
+    """
+    Create the shared S3 client once per process.
+
+    boto3 clients are thread-safe, so every request and worker thread reuses this
+    client and its pool of keep-alive connections instead of paying for client
+    construction and a TLS handshake on each call.
+    """
+    return boto3.client(
+        "s3",
+        aws_access_key_id=settings.cat_images_aws_access_key_id,
+        aws_secret_access_key=settings.cat_images_aws_secret_access_key,
+        endpoint_url=settings.s3_endpoint_url,
+        config=Config(
+            max_pool_connections=settings.s3_max_pool_connections,
+            connect_timeout=settings.s3_connect_timeout,
+            read_timeout=settings.s3_read_timeout,
+            retries={"max_attempts": 3, "mode": "standard"},
+            tcp_keepalive=True,
+        ),
+    )
+
+
+def object_url(key: str) -> str:
+    """Public URL of an object in the cat images bucket."""
+    return f"https://{settings.cat_images_bucket_name}.s3.amazonaws.com/{key}"
+
+
+def key_from_url(url: str) -> Optional[str]:
+    """Inverse of `object_url`: the key of a cat images bucket URL, or None for other URLs."""
+    base = object_url("")
+    return url[len(base):] if url.startswith(base) else None
+
+
+def s3_http_error(e: Exception) -> HTTPException:
+    """Translate an S3/boto error into the API's 500 response."""
+    if isinstance(e, ClientError):
+        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+        error_message = e.response.get('Error', {}).get('Message', str(e))
+        return HTTPException(status_code=500, detail=f"S3 error ({error_code}): {error_message}")
+    if isinstance(e, BotoCoreError):
+        return HTTPException(status_code=500, detail=f"AWS connection error: {str(e)}")
+    return HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
@@ -0,0 +1,154 @@
+"""Fast JSON rendering of trusted database rows (optional orjson)."""
+
+from typing import Any, Callable, Collection, Dict, FrozenSet, Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Query, Request, Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import Row
+
+try:
+    import orjson
+except ImportError:  # orjson is optional: install the `speedups` extra; pydantic-core's encoder is the fallback
+    orjson = None
+
+_NO_VALUES: Dict[str, Any] = {}
+
+_read_fields: Dict[Type[BaseModel], Tuple[Tuple[str, Any], ...]] = {}
+_absent_fields: Dict[Tuple[type, Type[BaseModel]], FrozenSet[str]] = {}
+_list_adapters: Dict[Type[BaseModel], TypeAdapter] = {}
+
+
+def _fields(model: Type[BaseModel]) -> Tuple[Tuple[str, Any], ...]:
+    """(name, default) of every field of `model`, computed once per model."""
+    fields = _read_fields.get(model)
+    if fields is None:
+        fields = tuple((name, field.get_default(call_default_factory=True)) for name, field in model.model_fields.items())
+        _read_fields[model] = fields
+    return fields
+
+
+def _absent(cls: type, model: Type[BaseModel]) -> FrozenSet[str]:
+    """Fields of `model` that instances of the pydantic/SQLModel class `cls` never have (e.g. `images` on `Slideshow`)."""
+    key = (cls, model)
+    absent = _absent_fields.get(key)
+    if absent is None:
+        known = getattr(cls, "model_fields", None)
+        absent = frozenset(
+            name for name, _ in _fields(model)
+            if known is not None and name not in known and not hasattr(cls, name)
+        )
+        _absent_fields[key] = absent
+    return absent
+
+
+def _default(obj: Any) -> Any:
+    # Nested values orjson cannot encode natively
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Row):
+        return obj._asdict()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(data: Any) -> bytes:
+    """Encode `data` to JSON bytes with orjson, or pydantic-core when orjson is not installed."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return to_json(data, fallback=_default)
+
+
+def fields_param(*models: Type[BaseModel]) -> Callable[..., Optional[FrozenSet[str]]]:
+    """
+    Dependency factory for a `fields=id,name,breed` sparse fieldset over `models`' fields.
+    
+    The dependency returns None when no fieldset is given, else the requested field
+    names plus `id` (pagination cursors need it); unknown names are rejected with 422.
+    """
+    known = {name for model in models for name in model.model_fields}
+
+    def dependency(
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return (`id` is always included)"),
+    ) -> Optional[FrozenSet[str]]:
+        if fields is None:
+            return None
+        names = {name.strip() for name in fields.split(",")} - {""}
+        unknown = sorted(names - known)
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+        return frozenset(names | {"id"})
+
+    return dependency
+
+
+def encode_rows(content: Any, model: Type[BaseModel], fields: Optional[Collection[str]] = None) -> bytes:
+    """
+    Encode a row, or a list of rows, as the JSON of `model` (only its `fields`, when given).
+    
+    Rows (ORM objects, `Row`s or model instances) come from our own queries, so
+    each is read attribute by attribute into `model`'s field names (missing
+    attributes take the field default) without being validated first.
+    """
+    fields = _fields(model) if fields is None else tuple(field for field in _fields(model) if field[0] in fields)
+
+    def shape(obj: Any) -> Dict[str, Any]:
+        # Loaded ORM attributes live in the instance dict; reading them there skips the
+        # instrumented descriptors, while unloaded ones still go through getattr (and load)
+        values = getattr(obj, "__dict__", _NO_VALUES)
+        absent = _absent(type(obj), model)
+        return {
+            name: default if name in absent else values[name] if name in values else getattr(obj, name, default)
+            for name, default in fields
+        }
+
+    if isinstance(content, Iterable) and not isinstance(content, (BaseModel, Row)):
+        return dumps([shape(obj) for obj in content])
+    return dumps(shape(content))
+
+
+def encode_validated(content: Any, model: Type[BaseModel]) -> bytes:
+    """Validate a row, or a list of rows, into `model` and encode it, as FastAPI's `response_model` path does."""
+    if isinstance(content, Iterable) and not isinstance(content, (BaseModel, Row)):
+        adapter = _list_adapters.get(model)
+        if adapter is None:
+            adapter = _list_adapters[model] = TypeAdapter(List[model])
+        return adapter.dump_json(adapter.validate_python(list(content), from_attributes=True))
+    return model.model_validate(content, from_attributes=True).model_dump_json().encode()
+
+
+class JSONRenderer:
+    """
+    Dependency returning trusted rows as a pre-encoded JSON response.
+    
+    With the app's fast JSON path enabled (`create_app(fast_json=...)`, default
+    `FAST_JSON`), `render(rows, Model)` skips FastAPI's validate-then-serialize
+    round trip through `response_model`. Otherwise it returns the rows unchanged for
+    the regular path, except for sparse fieldsets (`render(rows, Model, fields)`):
+    their rows lack required fields, so they are always encoded here. Headers and
+    status set on the injected `Response` (e.g. by `paginate`) are carried over.
+    """
+
+    def __init__(self, request: Request, response: Response):
+        self.request = request
+        self.response = response
+
+    @property
+    def fast(self) -> bool:
+        """Whether the app's fast JSON path is enabled."""
+        return getattr(self.request.app.state, "fast_json", False)
+
+    def __call__(self, content: Any, model: Type[BaseModel], fields: Optional[Collection[str]] = None) -> Any:
+        if fields is None and not self.fast:
+            return content
+        return self.encode(content, model, fields)
+
+    def encode(self, content: Any, model: Type[BaseModel], fields: Optional[Collection[str]] = None) -> Response:
+        """
+        Pre-encode `content` whatever the fast path setting (e.g. to cache the body).
+        
+        Without the fast path, rows are validated against `model` first, as on the regular path.
+        """
+        body = encode_rows(content, model, fields) if fields is not None or self.fast else encode_validated(content, model)
+        rendered = Response(body, status_code=self.response.status_code or 200, media_type="application/json")
+        rendered.raw_headers.extend(self.response.raw_headers)
+        return rendered
@@ -7,15 +7,75 @@ class Settings(BaseSettings):
     # - migrations_db_url: used only by Alembic migrations (optional for app boot, required for migrations)
     runtime_db_url: str
     migrations_db_url: Optional[str] = None
+    
+    # Encode list and detail responses straight from DB rows (orjson with the `speedups` extra);
+    # false keeps FastAPI's response_model validation and serialization
+    fast_json: bool = True
+    
+    # Use the async (psycopg 3) engine for resource routes; false falls back to the sync engine + threadpool
+    db_async: bool = True
+    
+    # Connection pool settings (runtime engine)
+    db_pool_size: int = 5  # persistent connections per worker
+    db_max_overflow: int = 10  # extra connections allowed under burst load
+    db_pool_timeout: int = 30  # seconds to wait for a free connection before failing
+    db_pool_recycle: int = 1800  # seconds before a connection is replaced; keeps ahead of server/proxy idle timeouts
+    db_pool_pre_ping: bool = False  # ping on every checkout; only needed if connections die before db_pool_recycle
+    
     cat_images_aws_access_key_id: str
     cat_images_aws_secret_access_key: str
     cat_images_bucket_name: str = "cat-slideshow-demo"
+    cat_image_index_ttl: int = 60  # seconds between background re-listings of the bucket
+    s3_endpoint_url: Optional[str] = None  # override for S3-compatible stand-ins (moto, MinIO); default is AWS
+    s3_max_pool_connections: int = 50  # keep-alive connections held by the shared S3 client
+    s3_connect_timeout: int = 5  # seconds
+    s3_read_timeout: int = 30  # seconds
+    
+    # Direct-to-S3 uploads (presigned URLs; the API never handles image bytes)
+    upload_prefix: str = "uploads/"  # uploads land under {prefix}{cognito sub}/, unindexed until completed
+    upload_image_prefix: str = "images/"  # completed uploads are moved to {prefix}{cognito sub}/
+    upload_max_bytes: int = 26214400  # 25 MiB
+    upload_multipart_threshold: int = 16777216  # 16 MiB; larger uploads use presigned multipart parts
+    upload_part_size: int = 8388608  # 8 MiB (S3 minimum is 5 MiB)
+    upload_url_ttl: int = 900  # seconds presigned URLs stay valid
+    
+    # Image renditions (resized derivatives of the cat images; requires the `images` extra)
+    renditions_enabled: bool = False  # generate missing renditions in the background as images are indexed
+    rendition_widths: str = "320,640,1280"  # comma-separated pixel widths; originals are never upscaled
+    rendition_formats: str = "webp,avif"  # comma-separated; formats Pillow cannot encode are skipped
+    rendition_quality: int = 75
+    rendition_prefix: str = "renditions/"  # key prefix for derivatives, excluded from image listings
+    rendition_store: str = "s3"  # s3 (the cat images bucket) or local
+    rendition_local_dir: str = "renditions"  # root directory of the local store
+    rendition_local_base_url: str = "/renditions"  # URL prefix under which the local store is served
+    rendition_workers: Optional[int] = None  # image processes (renditions and metadata); defaults to the CPU count
+    
+    # Image metadata (dimensions, dominant color, blurhash; requires the `images` extra)
+    image_metadata_enabled: bool = False  # measure new and changed images into the cat_image table
+    image_metadata_workers: int = 2  # images downloaded and measured concurrently
+    
+    # Slideshow playback manifests
+    manifest_preload_images: int = 3  # leading images announced in `Link: rel=preload` headers
+    early_hints_enabled: bool = False  # also send them as 103 Early Hints (needs server support, e.g. Hypercorn)
+    
+    # Per-user cache of list responses, invalidated by the user's writes
+    response_cache_backend: str = "off"  # off, memory (single-process deployments only) or redis (needs the `cache` extra)
+    response_cache_max_bytes: int = 67108864  # 64 MiB of compressed responses (memory backend)
+    response_cache_ttl: int = 300  # seconds a cached response lives at most
+    response_cache_redis_url: str = "redis://localhost:6379/0"  # any Redis-protocol server
+    
+    # Delta sync (GET /sync/)
+    sync_tombstone_retention_days: int = 30  # deletes are reported this long; older sync tokens get a full sync
     
     # AWS Cognito settings
     user_pool_id: str
     app_client_id: str
     aws_region: str = "us-east-1"
     jwks_cache_ttl: int = 3600  # 1 hour in seconds
+    jwks_refetch_min_interval: int = 30  # min seconds between refetches triggered by an unknown kid
+    token_cache_max_entries: int = 10000  # verified access tokens kept in memory
+    user_id_cache_max_entries: int = 10000  # Cognito sub -> user id mappings kept in memory
+    user_id_cache_ttl: int = 300  # seconds
     
     # Application settings
     app_env: str = "local"  # local vs production
@@ -29,6 +89,16 @@ class Settings(BaseSettings):
         """Parse comma-separated CORS origins into a list."""
         return [origin.strip() for origin in self.cors_origins.split(",") if origin.strip()]
 
+    @property
+    def rendition_widths_list(self) -> list[int]:
+        """Parse comma-separated rendition widths into a sorted list."""
+        return sorted(int(width) for width in self.rendition_widths.split(",") if width.strip())
+
+    @property
+    def rendition_formats_list(self) -> list[str]:
+        """Parse comma-separated rendition formats into a list."""
+        return [fmt.strip().lower() for fmt in self.rendition_formats.split(",") if fmt.strip()]
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_prefix="",
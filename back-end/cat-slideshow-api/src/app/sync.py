@@ -0,0 +1,74 @@
+"""Delta sync tokens and tombstone retention."""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from .crud.tombstone import tombstone as tombstone_crud
+from .db import get_engine
+from .pagination import decode_cursor, encode_cursor
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between tombstone pruning runs
+PRUNE_INTERVAL = 3600
+
+
+class SyncPage(NamedTuple):
+    """Where a sync with more pages left off."""
+    since: Optional[int]  # change sequence the sync reads from (None: a full sync)
+    after_cat_id: int
+    after_slideshow_id: int
+
+
+class SyncToken(NamedTuple):
+    """Decoded sync token: the change horizon it was issued at, when (Unix seconds), and for unfinished syncs, the next page."""
+    horizon: int
+    issued_at: int
+    page: Optional[SyncPage] = None
+
+    @property
+    def expired(self) -> bool:
+        """Whether deletes after this token may already have been pruned."""
+        return self.issued_at < time.time() - settings.sync_tombstone_retention_days * 86400
+
+
+def encode_sync_token(horizon: int, issued_at: Optional[float] = None, page: Optional[SyncPage] = None) -> str:
+    """Encode a change horizon (and, for an unfinished sync, its next page) as an opaque sync token."""
+    value = [horizon, int(time.time() if issued_at is None else issued_at)]
+    if page is not None:
+        value.extend(page)
+    return encode_cursor(value, key="sync")
+
+
+def decode_sync_token(token: str) -> SyncToken:
+    """Decode a token from `encode_sync_token`; raises 400 if it is malformed."""
+    value = decode_cursor(token, key="sync", value_type=list)
+    if len(value) not in (2, 5) or not all(
+        isinstance(part, int) or (position == 2 and part is None) for position, part in enumerate(value)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return SyncToken(value[0], value[1], SyncPage(*value[2:]) if len(value) == 5 else None)
+
+
+def prune_tombstones() -> int:
+    """Drop tombstones older than the retention period; returns how many were dropped."""
+    before = datetime.utcnow() - timedelta(days=settings.sync_tombstone_retention_days)
+    with Session(get_engine()) as db:
+        return tombstone_crud.prune(db, before=before)
+
+
+async def run_prune_loop() -> None:
+    """Prune expired tombstones every `PRUNE_INTERVAL` seconds until cancelled."""
+    while True:
+        try:
+            await asyncio.to_thread(prune_tombstones)
+        except Exception as e:
+            logger.warning("Pruning tombstones failed: %s", e)
+        await asyncio.sleep(PRUNE_INTERVAL)
@@ -0,0 +1,156 @@
+"""Presigned direct-to-S3 uploads of new cat images."""
+
+import math
+import re
+import uuid
+from pathlib import PurePosixPath
+
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+
+from .image_index import ImageObject
+from .models.cat_image import CatImageUpload, CatImageUploadAbort, CatImageUploadComplete, CatImageUploadCreate
+from .s3 import get_s3_client, s3_http_error
+from .settings import settings
+
+ALLOWED_CONTENT_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+    "image/gif": ".gif",
+}
+
+# S3 errors that mean the client's upload is missing or incomplete rather than an S3 failure
+CLIENT_UPLOAD_ERRORS = {"404", "NoSuchKey", "NoSuchUpload", "InvalidPart", "InvalidPartOrder", "EntityTooSmall"}
+
+
+def user_upload_prefix(cognito_sub: str) -> str:
+    """Key prefix that a user's uploads are confined to until completed."""
+    return f"{settings.upload_prefix}{cognito_sub}/"
+
+
+def user_image_prefix(cognito_sub: str) -> str:
+    """Key prefix that a user's completed uploads are moved to."""
+    return f"{settings.upload_image_prefix}{cognito_sub}/"
+
+
+def start_upload(cognito_sub: str, upload_in: CatImageUploadCreate) -> CatImageUpload:
+    """
+    Reserve a key under the user's upload prefix and presign the upload of `upload_in`.
+
+    Small files get a presigned POST whose policy pins the Content-Type and caps
+    the size at the declared one, so S3 itself rejects anything else. Files above
+    `upload_multipart_threshold` get a multipart upload with one presigned URL
+    per part; only the (bodiless) CreateMultipartUpload call is made by the API,
+    and the parts' sizes are checked before they are assembled.
+    """
+    extension = ALLOWED_CONTENT_TYPES.get(upload_in.content_type)
+    if extension is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported content type: {upload_in.content_type}")
+    if upload_in.size > settings.upload_max_bytes:
+        raise HTTPException(status_code=413, detail=f"Images are limited to {settings.upload_max_bytes} bytes")
+
+    stem = re.sub(r"[^A-Za-z0-9_-]+", "-", PurePosixPath(upload_in.filename).stem).strip("-")[:64] or "image"
+    key = f"{user_upload_prefix(cognito_sub)}{uuid.uuid4().hex}-{stem}{extension}"
+    bucket = settings.cat_images_bucket_name
+    s3 = get_s3_client()
+    try:
+        if upload_in.size <= settings.upload_multipart_threshold:
+            post = s3.generate_presigned_post(
+                Bucket=bucket,
+                Key=key,
+                Fields={"Content-Type": upload_in.content_type},
+                Conditions=[{"Content-Type": upload_in.content_type}, ["content-length-range", 1, upload_in.size]],
+                ExpiresIn=settings.upload_url_ttl,
+            )
+            return CatImageUpload(key=key, method="post", url=post["url"], fields=post["fields"], expires_in=settings.upload_url_ttl)
+
+        upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, ContentType=upload_in.content_type)["UploadId"]
+        part_urls = [
+            s3.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": bucket, "Key": key, "UploadId": upload_id, "PartNumber": part_number},
+                ExpiresIn=settings.upload_url_ttl,
+            )
+            for part_number in range(1, math.ceil(upload_in.size / settings.upload_part_size) + 1)
+        ]
+    except ClientError as e:
+        raise s3_http_error(e)
+    return CatImageUpload(
+        key=key,
+        method="multipart",
+        upload_id=upload_id,
+        part_urls=part_urls,
+        part_size=settings.upload_part_size,
+        expires_in=settings.upload_url_ttl,
+    )
+
+
+def _check_owner(cognito_sub: str, key: str) -> None:
+    if not key.startswith(user_upload_prefix(cognito_sub)):
+        raise HTTPException(status_code=403, detail="Upload key does not belong to the current user")
+
+
+def complete_upload(cognito_sub: str, completion: CatImageUploadComplete) -> ImageObject:
+    """
+    Finish an upload (assembling multipart parts), validate it and publish it.
+
+    Multipart uploads whose parts add up to more than `upload_max_bytes` are
+    aborted before assembly; objects that turn out too large or not an allowed
+    image type are deleted. Valid objects are copied (within S3) from the upload
+    prefix, which the image index ignores, to the user's image prefix.
+    """
+    _check_owner(cognito_sub, completion.key)
+    bucket = settings.cat_images_bucket_name
+    s3 = get_s3_client()
+    try:
+        if completion.upload_id is not None:
+            uploaded = s3.list_parts(Bucket=bucket, Key=completion.key, UploadId=completion.upload_id).get("Parts", [])
+            if sum(part["Size"] for part in uploaded) > settings.upload_max_bytes:
+                s3.abort_multipart_upload(Bucket=bucket, Key=completion.key, UploadId=completion.upload_id)
+                raise HTTPException(status_code=400, detail="Uploaded object is not an allowed image")
+            parts = sorted(completion.parts, key=lambda part: part.part_number)
+            s3.complete_multipart_upload(
+                Bucket=bucket,
+                Key=completion.key,
+                UploadId=completion.upload_id,
+                MultipartUpload={"Parts": [{"PartNumber": p.part_number, "ETag": p.etag} for p in parts]},
+            )
+        head = s3.head_object(Bucket=bucket, Key=completion.key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in CLIENT_UPLOAD_ERRORS:
+            raise HTTPException(status_code=400, detail="Upload not found or incomplete")
+        raise s3_http_error(e)
+
+    if head["ContentLength"] > settings.upload_max_bytes or head.get("ContentType") not in ALLOWED_CONTENT_TYPES:
+        try:
+            s3.delete_object(Bucket=bucket, Key=completion.key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in CLIENT_UPLOAD_ERRORS:
+                raise s3_http_error(e)
+        raise HTTPException(status_code=400, detail="Uploaded object is not an allowed image")
+
+    key = user_image_prefix(cognito_sub) + completion.key[len(user_upload_prefix(cognito_sub)):]
+    try:
+        s3.copy_object(Bucket=bucket, Key=key, CopySource={"Bucket": bucket, "Key": completion.key})
+        s3.delete_object(Bucket=bucket, Key=completion.key)
+        head = s3.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        raise s3_http_error(e)
+    return ImageObject(key, head["ETag"], head["LastModified"], head["ContentLength"])
+
+
+def abort_upload(cognito_sub: str, abort: CatImageUploadAbort) -> None:
+    """Discard an upload that will not be completed: abort its multipart upload, or delete what was posted."""
+    _check_owner(cognito_sub, abort.key)
+    bucket = settings.cat_images_bucket_name
+    s3 = get_s3_client()
+    try:
+        if abort.upload_id is not None:
+            s3.abort_multipart_upload(Bucket=bucket, Key=abort.key, UploadId=abort.upload_id)
+        else:
+            s3.delete_object(Bucket=bucket, Key=abort.key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in CLIENT_UPLOAD_ERRORS:
+            raise s3_http_error(e)
@@ -0,0 +1,236 @@
+"""Test JWT verification helpers."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine
+
+from app.cache import LRUCache
+from app.jwks import JWKSKeyStore
+from app.settings import settings
+
+
+PRIVATE_KEY_PEM = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+    serialization.Encoding.PEM,
+    serialization.PrivateFormat.PKCS8,
+    serialization.NoEncryption(),
+)
+JWK = {
+    **jwk.construct(PRIVATE_KEY_PEM, algorithm="RS256").public_key().to_dict(),
+    "kid": "key-1",
+    "use": "sig",
+}
+
+
+@pytest.fixture
+def key_store():
+    """Create a key store whose fetches are counted instead of hitting Cognito."""
+    store = JWKSKeyStore(ttl=3600, min_refetch_interval=30)
+    store.fetch_count = 0
+    store.release = threading.Event()
+    store.release.set()
+
+    def fake_fetch():
+        store.fetch_count += 1
+        store.release.wait(timeout=5)
+        return {"keys": [JWK]}
+
+    store._fetch = fake_fetch
+    return store
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_fetch(key_store: JWKSKeyStore):
+    """Test that a burst of lookups on a cold store triggers a single fetch."""
+    key_store.release.clear()
+    lookups = [asyncio.create_task(key_store.get_key("key-1")) for _ in range(20)]
+    await asyncio.sleep(0.05)
+    key_store.release.set()
+    keys = await asyncio.gather(*lookups)
+    assert keys[0].to_dict()["n"] == JWK["n"]
+    assert all(key is keys[0] for key in keys)
+    assert key_store.fetch_count == 1
+
+
+@pytest.mark.asyncio
+async def test_lookup_during_fetch_waits_for_it(key_store: JWKSKeyStore):
+    """Test that a lookup made while a fetch is blocked gets that fetch's keys, not None."""
+    key_store.release.clear()
+    startup = asyncio.create_task(key_store.refresh())
+    await asyncio.sleep(0.05)
+    lookup = asyncio.create_task(key_store.get_key("key-1"))
+    await asyncio.sleep(0.05)
+    assert not lookup.done()
+    key_store.release.set()
+    assert (await lookup).to_dict()["n"] == JWK["n"]
+    await startup
+    assert key_store.fetch_count == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_keys_served_while_refreshing(key_store: JWKSKeyStore):
+    """Test that a stale key set is returned immediately and refreshed in the background."""
+    await key_store.refresh()
+    key_store.ttl = 0
+    key_store.release.clear()
+    assert await key_store.get_key("key-1") is not None
+    key_store.release.set()
+    await key_store._refresh_task
+    assert key_store.fetch_count == 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refetch_is_throttled(key_store: JWKSKeyStore):
+    """Test that unknown kids refetch once, then wait for the throttle window."""
+    assert await key_store.get_key("rotated") is None
+    assert await key_store.get_key("rotated") is None
+    assert key_store.fetch_count == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_failure_without_keys_is_unavailable():
+    """Test that a failed fetch on a cold store surfaces as 503."""
+    store = JWKSKeyStore(ttl=3600, min_refetch_interval=30)
+
+    def failing_fetch():
+        raise RuntimeError("boom")
+
+    store._fetch = failing_fetch
+    for _ in range(2):  # the throttled retry is unavailable too, not an unknown key
+        with pytest.raises(HTTPException) as exc_info:
+            await store.get_key("key-1")
+        assert exc_info.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_verified_token_is_cached_until_rotation(monkeypatch, key_store: JWKSKeyStore):
+    """Test that repeat tokens skip signature checks until the JWKS rotates."""
+    from app import auth
+
+    decode_calls = []
+
+    def fake_decode(token, key, **kwargs):
+        decode_calls.append(token)
+        return {"sub": "user-1", "exp": time.time() + 60}
+
+    monkeypatch.setattr(auth.jwt, "get_unverified_header", lambda token: {"kid": "key-1"})
+    monkeypatch.setattr(auth.jwt, "decode", fake_decode)
+    monkeypatch.setattr(auth, "jwks_store", key_store)
+    monkeypatch.setattr(auth, "verified_token_cache", LRUCache(10))
+    key_store.on_rotation(auth.verified_token_cache.clear)
+
+    await auth.verify_token("token-a")
+    await auth.verify_token("token-a")
+    assert decode_calls == ["token-a"]
+    assert auth.verified_token_cache.hits == 1
+
+    key_store._jwks = {}
+    await key_store.refresh()
+    await auth.verify_token("token-a")
+    assert decode_calls == ["token-a", "token-a"]
+
+
+def test_token_cache_stats_endpoint(monkeypatch):
+    """Test that the verified token cache's counters are served next to the response cache's."""
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    cache = LRUCache(10)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    monkeypatch.setattr(main, "verified_token_cache", cache)
+    stats = TestClient(main.create_app()).get("/healthz/token-cache").json()
+    assert stats == {"entries": 1, "max_entries": 10, "hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+@pytest.mark.asyncio
+async def test_verify_token_with_indexed_key(monkeypatch, key_store: JWKSKeyStore):
+    """Test that a Cognito-style access token verifies against the prebuilt key index."""
+    from app import auth
+
+    monkeypatch.setattr(auth, "jwks_store", key_store)
+    monkeypatch.setattr(auth, "verified_token_cache", LRUCache(10))
+    now = int(time.time())
+    token = jwt.encode(
+        {
+            "sub": "user-1",
+            "aud": settings.app_client_id,
+            "iss": f"https://cognito-idp.{settings.aws_region}.amazonaws.com/{settings.user_pool_id}",
+            "iat": now,
+            "exp": now + 60,
+        },
+        PRIVATE_KEY_PEM,
+        algorithm="RS256",
+        headers={"kid": "key-1"},
+    )
+    claims = await auth.verify_token(token)
+    assert claims["sub"] == "user-1"
+
+
+def test_lru_cache_expiry_and_eviction():
+    """Test that the LRU cache drops expired and least recently used entries."""
+    cache = LRUCache(2)
+    cache.set("expired", 1, expires_at=time.time() - 1)
+    assert cache.get("expired") is None
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_user_id_lookup_is_cached_and_invalidated_on_upsert():
+    """Test that sub -> user id lookups hit the cache and upserts invalidate it."""
+    from app.crud.user import user as user_crud, user_id_cache
+    from app.models.user import User, UserCreate
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    User.__table__.create(engine)
+    user_id_cache.clear()
+    with Session(engine) as db:
+        user_crud.upsert_by_email(db, user_in=UserCreate(email="a@example.com", cognito_sub="sub-1", name="a"))
+        user_id = user_crud.get_id_by_cognito_sub(db, cognito_sub="sub-1")
+        assert user_crud.get_id_by_cognito_sub(db, cognito_sub="sub-1") == user_id
+        assert user_id_cache.get("sub-1") == user_id
+
+        user_crud.upsert_by_email(db, user_in=UserCreate(email="a@example.com", cognito_sub="sub-2", name="a"))
+        assert user_id_cache.get("sub-1") is None
+        assert user_crud.get_id_by_cognito_sub(db, cognito_sub="sub-1") is None
+        assert user_crud.get_id_by_cognito_sub(db, cognito_sub="sub-2") == user_id
+
+
+def test_upsert_by_email_skips_unchanged_rows():
+    """Test that re-upserting an unchanged user writes nothing and returns the same ID."""
+    from app.crud.user import user as user_crud
+    from app.models.user import User, UserCreate
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    User.__table__.create(engine)
+    user_in = UserCreate(email="a@example.com", cognito_sub="sub-1", name="a")
+    with Session(engine, expire_on_commit=False) as db:
+        user_id = user_crud.upsert_by_email(db, user_in=user_in)
+        first = user_crud.get(db, user_id)
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+        assert user_crud.upsert_by_email(db, user_in=user_in) == user_id
+        assert "WHERE user.cognito_sub != excluded.cognito_sub OR user.name != excluded.name" in statements[0]
+        assert not any(s.startswith("UPDATE") for s in statements)
+        db.expire_all()
+        assert user_crud.get(db, user_id).updated_at == first.updated_at
+
+        assert user_crud.upsert_by_email(db, user_in=UserCreate(email="a@example.com", cognito_sub="sub-1", name="b")) == user_id
+        db.expire_all()
+        assert user_crud.get(db, user_id).name == "b"
@@ -0,0 +1,322 @@
+"""Test the S3-backed cat image index against moto's in-memory S3."""
+
+import asyncio
+import base64
+import json
+import threading
+
+import pytest
+import requests
+from fastapi import HTTPException
+from moto import mock_aws
+
+from app.image_index import CatImageIndex, ImageObject
+from app.s3 import get_s3_client
+
+BUCKET = "test-cat-images"
+
+
+@pytest.fixture
+def s3():
+    """Yield the shared S3 client, backed by an empty moto bucket."""
+    with mock_aws():
+        get_s3_client.cache_clear()
+        client = get_s3_client()
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+    get_s3_client.cache_clear()
+
+
+def test_shared_client_is_reused(s3):
+    """Test that every caller gets the same pooled client."""
+    assert get_s3_client() is s3
+    assert s3.meta.config.max_pool_connections >= 10
+
+
+def test_index_serves_from_memory_until_refreshed(s3):
+    """Test that the index lists the bucket once and serves later calls from memory."""
+    s3.put_object(Bucket=BUCKET, Key="b.jpg", Body=b"b")
+    s3.put_object(Bucket=BUCKET, Key="a.jpg", Body=b"a")
+    index = CatImageIndex(bucket=BUCKET, ttl=60)
+    listings = []
+    list_objects = index._list_objects
+    index._list_objects = lambda: listings.append(1) or list_objects()
+
+    async def scenario():
+        first = await index.urls()
+        s3.put_object(Bucket=BUCKET, Key="c.jpg", Body=b"c")
+        second = await index.urls()
+        await index.refresh()
+        return first, second, await index.urls()
+
+    first, second, third = asyncio.run(scenario())
+    assert [url.rsplit("/", 1)[1] for url in first] == ["a.jpg", "b.jpg"]
+    assert second == first
+    assert [url.rsplit("/", 1)[1] for url in third] == ["a.jpg", "b.jpg", "c.jpg"]
+    assert len(listings) == 2
+
+
+def test_refresh_diffs_by_etag(s3):
+    """Test that refreshes report added, changed and removed keys and skip no-op listings."""
+    s3.put_object(Bucket=BUCKET, Key="a.jpg", Body=b"a")
+    s3.put_object(Bucket=BUCKET, Key="b.jpg", Body=b"b")
+    index = CatImageIndex(bucket=BUCKET, ttl=60)
+    changes = []
+    index.on_change(changes.append)
+
+    async def scenario():
+        await index.refresh()
+        await index.refresh()
+        s3.put_object(Bucket=BUCKET, Key="a.jpg", Body=b"new a")
+        s3.delete_object(Bucket=BUCKET, Key="b.jpg")
+        s3.put_object(Bucket=BUCKET, Key="c.jpg", Body=b"c")
+        await index.refresh()
+
+    asyncio.run(scenario())
+    assert len(changes) == 2
+    assert changes[0].added == ["a.jpg", "b.jpg"]
+    assert (changes[1].added, changes[1].changed, changes[1].removed) == (["c.jpg"], ["a.jpg"], ["b.jpg"])
+
+
+def test_registration_survives_an_in_flight_refresh(s3):
+    """Test that an object registered while a listing runs is not dropped when that listing lands."""
+    s3.put_object(Bucket=BUCKET, Key="a.jpg", Body=b"a")
+    index = CatImageIndex(bucket=BUCKET, ttl=60)
+    listed, release = threading.Event(), threading.Event()
+    list_objects = index._list_objects
+
+    def blocked_listing():
+        listing = list_objects()
+        listed.set()
+        release.wait(5)
+        return listing
+
+    async def scenario():
+        await index.refresh()
+        index._list_objects = blocked_listing
+        refresh = asyncio.create_task(index.refresh())
+        await asyncio.to_thread(listed.wait, 5)
+        s3.put_object(Bucket=BUCKET, Key="b.jpg", Body=b"b")
+        head = s3.head_object(Bucket=BUCKET, Key="b.jpg")
+        index.register(ImageObject("b.jpg", head["ETag"], head["LastModified"], head["ContentLength"]))
+        release.set()
+        await refresh
+
+    asyncio.run(scenario())
+    assert index.contains("b.jpg")
+    assert index.page().keys == ["a.jpg", "b.jpg"]
+
+
+def test_failed_first_listing_is_an_error(s3):
+    """Test that a missing bucket surfaces as a 500 until a listing has succeeded."""
+    index = CatImageIndex(bucket="no-such-bucket", ttl=60)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(index.urls())
+    assert exc_info.value.status_code == 500
+    assert "NoSuchBucket" in exc_info.value.detail
+
+
+def test_endpoint_pages_by_prefix_and_streams_ndjson(s3, monkeypatch):
+    """Test prefix filtering, cursor paging and NDJSON streaming of the listing endpoint."""
+    from fastapi.testclient import TestClient
+
+    from app import auth
+    from app.api import cat_images
+    from app.db import get_db
+    from app.main import create_app
+
+    for key in ["cats/a.jpg", "cats/b.jpg", "cats/c.jpg", "dogs/d.jpg"]:
+        s3.put_object(Bucket=BUCKET, Key=key, Body=b"x")
+    monkeypatch.setattr(cat_images, "cat_image_index", CatImageIndex(bucket=BUCKET, ttl=60))
+    app = create_app()
+    app.dependency_overrides[auth.get_current_user] = lambda: {"sub": "sub-1"}
+    app.dependency_overrides[get_db] = lambda: None  # only detail=true reads image metadata
+    client = TestClient(app)
+
+    response = client.get("/cat-images/", params={"prefix": "cats/", "limit": 2})
+    assert [url.rsplit("/", 1)[1] for url in response.json()] == ["a.jpg", "b.jpg"]
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get("/cat-images/", params={"prefix": "cats/", "limit": 2, "cursor": cursor})
+    assert [url.rsplit("/", 1)[1] for url in response.json()] == ["c.jpg"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/cat-images/", headers={"Accept": "application/x-ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [url.split(".com/", 1)[1] for url in lines] == ["cats/a.jpg", "cats/b.jpg", "cats/c.jpg", "dogs/d.jpg"]
+
+
+def test_endpoint_detail_lists_renditions(s3, monkeypatch):
+    """Test that renditions are hidden from the listing and returned as srcset and metadata with detail=true."""
+    pytest.importorskip("PIL")
+    from fastapi.testclient import TestClient
+    from sqlalchemy.pool import StaticPool
+    from sqlmodel import Session, create_engine
+
+    from app import auth
+    from app.api import cat_images
+    from app.crud.cat_image import cat_image
+    from app.db import get_db
+    from app.main import create_app
+    from app.models.cat_image import CatImage
+    from app.renditions import S3RenditionStore
+
+    s3.put_object(Bucket=BUCKET, Key="cats/a.jpg", Body=b"x")
+    s3.put_object(Bucket=BUCKET, Key="cats/b.jpg", Body=b"x")
+    s3.put_object(Bucket=BUCKET, Key="renditions/320w/cats/a.webp", Body=b"x")
+    index = CatImageIndex(bucket=BUCKET, ttl=60, hidden_prefix="renditions/")
+    monkeypatch.setattr(cat_images, "cat_image_index", index)
+    monkeypatch.setattr(cat_images.rendition_pipeline, "store", S3RenditionStore(BUCKET, index))
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    CatImage.__table__.create(engine)
+    metadata = {
+        "width": 640, "height": 480, "byte_size": 1, "content_type": "image/jpeg",
+        "content_hash": "0" * 64, "dominant_color": "#c87828", "blurhash": "LEHV6nWB2yk8pyo0adR*.7kCMdnj",
+    }
+    with Session(engine) as db:
+        cat_image.save(db, key="cats/a.jpg", etag="e", metadata=metadata)
+    app = create_app()
+    app.dependency_overrides[auth.get_current_user] = lambda: {"sub": "sub-1"}
+    app.dependency_overrides[get_db] = lambda: Session(engine)
+    client = TestClient(app)
+
+    assert [url.split(".com/", 1)[1] for url in client.get("/cat-images/").json()] == ["cats/a.jpg", "cats/b.jpg"]
+    image, unmeasured = client.get("/cat-images/", params={"detail": True}).json()
+    assert image["key"] == "cats/a.jpg"
+    assert [(r["width"], r["format"]) for r in image["renditions"]] == [(320, "webp")]
+    assert image["srcset"]["webp"].endswith("/renditions/320w/cats/a.webp 320w")
+    assert image["info"] == metadata
+    assert unmeasured["info"] is None
+
+
+@pytest.fixture
+def upload_client(s3, monkeypatch):
+    """A test client authenticated as sub-1, with a fresh image index over the moto bucket."""
+    from fastapi.testclient import TestClient
+
+    from app import auth
+    from app.api import cat_images
+    from app.main import create_app
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, "cat_images_bucket_name", BUCKET)
+    index = CatImageIndex(bucket=BUCKET, ttl=60, ignored_prefix=settings.upload_prefix)
+    monkeypatch.setattr(cat_images, "cat_image_index", index)
+    app = create_app()
+    app.dependency_overrides[auth.get_current_user] = lambda: {"sub": "sub-1"}
+    return TestClient(app), index
+
+
+def test_presigned_post_upload(upload_client, s3):
+    """Test that a presigned POST lands under the user's upload prefix and completion publishes it."""
+    client, index = upload_client
+    ticket = client.post("/cat-images/uploads/", json={"filename": "My Cat.JPG", "content_type": "image/jpeg", "size": 4}).json()
+    assert ticket["method"] == "post"
+    assert ticket["key"].startswith("uploads/sub-1/") and ticket["key"].endswith("-My-Cat.jpg")
+
+    files = {"file": ("cat.jpg", b"meow", "image/jpeg")}
+    assert requests.post(ticket["url"], data=ticket["fields"], files=files).status_code == 204
+    asyncio.run(index.refresh())
+    assert not index.contains(ticket["key"])  # not listed before completion
+
+    response = client.post("/cat-images/uploads/complete/", json={"key": ticket["key"]})
+    assert response.status_code == 200
+    key = response.json()["key"]
+    assert key == "images/sub-1/" + ticket["key"].removeprefix("uploads/sub-1/")
+    assert index.contains(key)
+    assert response.json()["url"].endswith(key)
+    assert [obj["Key"] for obj in s3.list_objects_v2(Bucket=BUCKET)["Contents"]] == [key]
+
+
+def test_presigned_post_policy_limits_size_and_type(upload_client):
+    """Test that the POST policy pins the declared size and Content-Type."""
+    client, _ = upload_client
+    ticket = client.post("/cat-images/uploads/", json={"filename": "a.jpg", "content_type": "image/jpeg", "size": 4}).json()
+    conditions = json.loads(base64.b64decode(ticket["fields"]["policy"]))["conditions"]
+    assert ["content-length-range", 1, 4] in conditions
+    assert {"Content-Type": "image/jpeg"} in conditions
+    assert ticket["fields"]["Content-Type"] == "image/jpeg"
+
+
+def test_presigned_multipart_upload(upload_client, monkeypatch):
+    """Test that large files get per-part URLs that complete into one object."""
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, "upload_multipart_threshold", 1)
+    client, index = upload_client
+    size = settings.upload_part_size + 10
+    ticket = client.post("/cat-images/uploads/", json={"filename": "big.png", "content_type": "image/png", "size": size}).json()
+    assert ticket["method"] == "multipart"
+    assert len(ticket["part_urls"]) == 2
+
+    body = b"x" * size
+    parts = []
+    for number, url in enumerate(ticket["part_urls"], start=1):
+        chunk = body[(number - 1) * ticket["part_size"]:number * ticket["part_size"]]
+        parts.append({"part_number": number, "etag": requests.put(url, data=chunk).headers["ETag"]})
+    response = client.post(
+        "/cat-images/uploads/complete/",
+        json={"key": ticket["key"], "upload_id": ticket["upload_id"], "parts": parts},
+    )
+    assert response.status_code == 200
+    assert index.contains(response.json()["key"])
+
+
+def test_oversized_multipart_upload_is_aborted(upload_client, s3, monkeypatch):
+    """Test that parts adding up to more than the limit are aborted instead of assembled."""
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, "upload_multipart_threshold", 1)
+    client, _ = upload_client
+    ticket = client.post("/cat-images/uploads/", json={"filename": "big.png", "content_type": "image/png", "size": 10}).json()
+    monkeypatch.setattr(settings, "upload_max_bytes", 5)
+    etag = requests.put(ticket["part_urls"][0], data=b"x" * 10).headers["ETag"]
+    completion = {"key": ticket["key"], "upload_id": ticket["upload_id"], "parts": [{"part_number": 1, "etag": etag}]}
+    assert client.post("/cat-images/uploads/complete/", json=completion).status_code == 400
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+
+
+def test_abandoned_uploads_can_be_aborted(upload_client, s3, monkeypatch):
+    """Test that the abort endpoint frees multipart uploads and posted objects of the caller only."""
+    from app.settings import settings
+
+    client, _ = upload_client
+    ticket = client.post("/cat-images/uploads/", json={"filename": "a.jpg", "content_type": "image/jpeg", "size": 4}).json()
+    requests.post(ticket["url"], data=ticket["fields"], files={"file": ("a.jpg", b"meow", "image/jpeg")})
+    assert client.post("/cat-images/uploads/abort/", json={"key": ticket["key"]}).status_code == 204
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+
+    monkeypatch.setattr(settings, "upload_multipart_threshold", 1)
+    ticket = client.post("/cat-images/uploads/", json={"filename": "b.png", "content_type": "image/png", "size": 10}).json()
+    abort = {"key": ticket["key"], "upload_id": ticket["upload_id"]}
+    assert client.post("/cat-images/uploads/abort/", json=abort).status_code == 204
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+    assert client.post("/cat-images/uploads/abort/", json={"key": "uploads/sub-2/x.jpg"}).status_code == 403
+
+
+def test_rejected_upload_cleanup_errors(upload_client, s3, monkeypatch):
+    """Test that a rejected upload is still a 400 when its object is already gone, and S3 failures are reported."""
+    from botocore.exceptions import ClientError
+
+    client, _ = upload_client
+    s3.put_object(Bucket=BUCKET, Key="uploads/sub-1/a.jpg", Body=b"text", ContentType="text/plain")
+    errors = iter(["NoSuchKey", "SlowDown"])
+
+    def failing_delete(**kwargs):
+        raise ClientError({"Error": {"Code": next(errors), "Message": "delete failed"}}, "DeleteObject")
+
+    monkeypatch.setattr(s3, "delete_object", failing_delete)
+    assert client.post("/cat-images/uploads/complete/", json={"key": "uploads/sub-1/a.jpg"}).status_code == 400
+    response = client.post("/cat-images/uploads/complete/", json={"key": "uploads/sub-1/a.jpg"})
+    assert response.status_code == 500
+    assert "SlowDown" in response.json()["detail"]
+
+
+def test_upload_rejections(upload_client):
+    """Test content-type, size and ownership checks."""
+    client, _ = upload_client
+    assert client.post("/cat-images/uploads/", json={"filename": "a.exe", "content_type": "application/x-msdownload", "size": 4}).status_code == 400
+    assert client.post("/cat-images/uploads/", json={"filename": "a.jpg", "content_type": "image/jpeg", "size": 10**10}).status_code == 413
+    assert client.post("/cat-images/uploads/complete/", json={"key": "uploads/sub-2/x.jpg"}).status_code == 403
+    assert client.post("/cat-images/uploads/complete/", json={"key": "uploads/sub-1/missing.jpg"}).status_code == 400
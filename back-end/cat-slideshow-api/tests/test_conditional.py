@@ -0,0 +1,126 @@
+"""Test conditional GETs with ETag/Last-Modified validators."""
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine, update
+
+from app import auth
+from app.crud.cat import cat
+from app.db import get_db
+from app.main import create_app
+from app.models.cat import Cat, CatCreate
+from app.models.sync import Tombstone
+from app.models.user import User
+
+
+@pytest.fixture
+def engine():
+    """Create an in-memory engine with a user owning two cats."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    User.__table__.create(engine)
+    Cat.__table__.create(engine)
+    Tombstone.__table__.create(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, email="a@example.com", cognito_sub="sub-1", name="a"))
+        db.commit()
+        for name in ["Tom", "Luna"]:
+            cat.create_for_user(db, obj_in=CatCreate(name=name), user_id=1)
+    return engine
+
+
+@pytest.fixture
+def client(engine):
+    app = create_app()
+
+    def get_session():
+        with Session(engine, expire_on_commit=False) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_session
+    app.dependency_overrides[auth.get_current_user_id] = lambda: 1
+    return TestClient(app)
+
+
+def test_unchanged_collection_is_304_without_loading_rows(engine, client):
+    """Test that a matching If-None-Match answers 304 after only the validator query."""
+    first = client.get("/cats/")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    second = client.get("/cats/", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+    assert len(statements) == 1 and "count(*)" in statements[0]
+
+    assert client.get("/cats/", params={"limit": 1}, headers={"If-None-Match": etag}).status_code == 200
+
+
+@pytest.mark.parametrize("change", ["update", "delete"])
+def test_writes_change_the_etag(client, change):
+    """Test that updates and deletes invalidate both collection and item ETags."""
+    list_etag = client.get("/cats/").headers["ETag"]
+    item_etag = client.get("/cats/1/").headers["ETag"]
+    if change == "update":
+        client.patch("/cats/1/", json={"age": 4})
+        assert client.get("/cats/1/", headers={"If-None-Match": item_etag}).status_code == 200
+    else:
+        client.delete("/cats/2/")
+        assert client.get("/cats/1/", headers={"If-None-Match": item_etag}).status_code == 304
+    assert client.get("/cats/", headers={"If-None-Match": list_etag}).status_code == 200
+
+
+def test_if_modified_since(client):
+    """Test Last-Modified round trips and that If-None-Match takes precedence."""
+    last_modified = client.get("/cats/1/").headers["Last-Modified"]
+    assert client.get("/cats/1/", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/cats/1/", headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}).status_code == 200
+    headers = {"If-Modified-Since": last_modified, "If-None-Match": 'W/"stale"'}
+    assert client.get("/cats/1/", headers=headers).status_code == 200
+
+
+def test_deletes_move_collection_last_modified(engine, client):
+    """Test that a client validating only with If-Modified-Since sees deletes."""
+    with Session(engine) as db:
+        db.exec(update(Cat).values(updated_at=datetime(2020, 1, 1)))
+        db.commit()
+    last_modified = client.get("/cats/").headers["Last-Modified"]
+    assert last_modified == "Wed, 01 Jan 2020 00:00:00 GMT"
+    assert client.get("/cats/", headers={"If-Modified-Since": last_modified}).status_code == 304
+    client.delete("/cats/2/")
+    response = client.get("/cats/", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert response.headers["Last-Modified"] != last_modified
+
+
+def test_inserts_use_the_database_clock(engine):
+    """Test that INSERTs leave the timestamps to the database, like UPDATEs do."""
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    with Session(engine) as db:
+        cat.create_for_user(db, obj_in=CatCreate(name="Ginger"), user_id=1)
+    assert "STRFTIME('%Y-%m-%d %H:%M:%f', 'now'), STRFTIME('%Y-%m-%d %H:%M:%f', 'now')" in statements[0]
+
+
+def test_missing_item_is_404_even_with_wildcard(client):
+    """Test that If-None-Match: * never turns a missing cat into a 304."""
+    assert client.get("/cats/99/", headers={"If-None-Match": "*"}).status_code == 404
+
+
+def test_orm_updates_refresh_updated_at(engine):
+    """Test that updated_at is maintained on ORM flushes, not just by the CRUD UPDATE statements."""
+    with Session(engine) as db:
+        tom = db.get(Cat, 1)
+        before = tom.updated_at
+        tom.age = 9
+        db.add(tom)
+        db.commit()
+        db.refresh(tom)
+        assert tom.updated_at != before
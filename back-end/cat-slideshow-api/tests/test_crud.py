@@ -0,0 +1,239 @@
+"""Test CRUD operations against an in-memory database."""
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud.base import AsyncCRUD
+from app.crud.cat import cat
+from app.crud.search import apply_search, prefix_tsquery
+from app.models.cat import Cat, CatBulkUpdateItem, CatCreate, CatUpdate
+from app.models.sync import Tombstone
+from app.models.user import User
+from app.pagination import PageCursor, cursor_param, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def engine():
+    """Create an in-memory engine with the user and cat tables."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    User.__table__.create(engine)
+    Cat.__table__.create(engine)
+    Tombstone.__table__.create(engine)
+    with Session(engine) as session:
+        session.add(User(id=1, email="a@example.com", cognito_sub="sub-1", name="a"))
+        session.add(User(id=2, email="b@example.com", cognito_sub="sub-2", name="b"))
+        session.commit()
+    return engine
+
+
+@pytest.fixture
+def db_session(engine):
+    """Create a session that records the SQL statements it issues."""
+    with Session(engine, expire_on_commit=False) as session:
+        session.statements = []
+        event.listen(
+            engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: session.statements.append(statement),
+        )
+        yield session
+
+
+def test_update_for_user_is_one_statement(db_session: Session):
+    """Test that an owned update is a single UPDATE ... RETURNING."""
+    whiskers = cat.create_for_user(db_session, obj_in=CatCreate(name="Whiskers"), user_id=1)
+    db_session.statements.clear()
+
+    updated = cat.update_for_user(db_session, id=whiskers.id, user_id=1, obj_in=CatUpdate(age=4))
+    assert updated.age == 4
+    assert updated.name == "Whiskers"
+    assert len(db_session.statements) == 1
+    assert db_session.statements[0].startswith("UPDATE")
+
+
+def test_update_for_user_other_owner(db_session: Session):
+    """Test that updating another user's cat affects nothing."""
+    whiskers = cat.create_for_user(db_session, obj_in=CatCreate(name="Whiskers"), user_id=1)
+    assert cat.update_for_user(db_session, id=whiskers.id, user_id=2, obj_in=CatUpdate(age=4)) is None
+    assert cat.get(db_session, whiskers.id).age is None
+
+
+def test_delete_for_user(db_session: Session):
+    """Test that deletes only remove the caller's cat and report misses."""
+    whiskers = cat.create_for_user(db_session, obj_in=CatCreate(name="Whiskers"), user_id=1)
+    assert cat.delete_for_user(db_session, id=whiskers.id, user_id=2) is False
+    assert cat.delete_for_user(db_session, id=whiskers.id, user_id=1) is True
+    assert cat.delete_for_user(db_session, id=whiskers.id, user_id=1) is False
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_async_engine", [True, False])
+async def test_async_crud_runs_on_either_engine(engine, use_async_engine: bool):
+    """Test that AsyncCRUD awaits CRUD methods on an AsyncSession and on a sync Session."""
+    if use_async_engine:
+        async_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with async_engine.begin() as conn:
+            await conn.run_sync(User.__table__.create)
+            await conn.run_sync(Cat.__table__.create)
+        session = AsyncSession(async_engine, expire_on_commit=False)
+    else:
+        session = Session(engine, expire_on_commit=False)
+
+    cat_crud = AsyncCRUD(cat)
+    try:
+        created = await cat_crud.create_for_user(session, obj_in=CatCreate(name="Whiskers"), user_id=1)
+        cats = await cat_crud.get_multi_for_user(db=session, user_id=1)
+        assert [c.id for c in cats] == [created.id]
+    finally:
+        if use_async_engine:
+            await session.close()
+        else:
+            session.close()
+
+
+def test_keyset_pagination_walks_every_row_once(db_session: Session):
+    """Test that following after_id pages returns each of the user's cats exactly once, in ID order."""
+    for i in range(7):
+        cat.create_for_user(db_session, obj_in=CatCreate(name=f"Cat {i}"), user_id=1 if i % 3 else 2)
+
+    seen, after_id = [], None
+    while True:
+        page = cat.get_multi_for_user(db_session, user_id=1, limit=2, after_id=after_id)
+        if not page:
+            break
+        seen.extend(c.id for c in page)
+        after_id = page[-1].id
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen)) == 4
+
+
+def test_cursor_round_trip():
+    """Test that cursors decode to the encoded ID and malformed cursors are rejected."""
+    assert decode_cursor(encode_cursor(42)) == 42
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("not-a-cursor")
+    assert exc_info.value.status_code == 400
+
+
+def test_offset_cursor_resolves_to_offset():
+    """Test that cursor_param tells ID cursors from the offset cursors of ranked results."""
+    assert cursor_param(encode_cursor(42)) == PageCursor(after_id=42)
+    assert cursor_param(encode_cursor(200, key="offset")) == PageCursor(offset=200)
+    assert cursor_param(None) == PageCursor()
+
+
+def test_wrong_cursor_kind_is_rejected():
+    """Test that ID-ordered lists reject offset cursors and ranked results reject ID cursors."""
+    assert cursor_param(encode_cursor(42)).keyset() == 42
+    assert cursor_param(encode_cursor(200, key="offset")).ranked() == 200
+    assert PageCursor().keyset() is None and PageCursor().ranked() == 0
+    for cursor, resume in [(encode_cursor(200, key="offset"), PageCursor.keyset), (encode_cursor(42), PageCursor.ranked)]:
+        with pytest.raises(HTTPException) as exc_info:
+            resume(cursor_param(cursor))
+        assert exc_info.value.status_code == 400
+
+
+def test_prefix_tsquery():
+    """Test that user input becomes an all-words prefix query with tsquery operators stripped."""
+    assert prefix_tsquery("Fluffy whi") == "fluffy:* & whi:*"
+    assert prefix_tsquery("tabby & !(orange):*") == "tabby:* & orange:*"
+    assert prefix_tsquery("  !? ") is None
+
+
+def test_apply_search_uses_ranked_tsvector_match():
+    """Test that search compiles to an indexed @@ match ordered by rank, then ID."""
+    statement = apply_search(select(Cat).where(Cat.user_id == 1), Cat, "tabby")
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert '"cat".search_vector @@ to_tsquery(' in sql
+    assert "ORDER BY ts_rank_cd(\"cat\".search_vector, to_tsquery(" in sql
+    assert sql.rstrip().endswith("DESC, cat.id")
+
+
+def test_filters_combine(db_session: Session):
+    """Test that breed, color and one-sided age bounds apply together."""
+    for name, breed, color, age in [
+        ("Tom", "Tabby", "orange", 2),
+        ("Ginger", "Tabby", "orange", 7),
+        ("Smokey", "Tabby", "grey", 3),
+        ("Luna", "Siamese", "orange", 1),
+    ]:
+        cat.create_for_user(db_session, obj_in=CatCreate(name=name, breed=breed, color=color, age=age), user_id=1)
+
+    cats = cat.filter_for_user(db_session, user_id=1, breed="Tabby", color="orange", max_age=5)
+    assert [c.name for c in cats] == ["Tom"]
+    cats = cat.filter_for_user(db_session, user_id=1, min_age=3)
+    assert [c.name for c in cats] == ["Ginger", "Smokey"]
+    assert cat.filter_for_user(db_session, user_id=2, breed="Tabby") == []
+
+
+def test_bulk_create_returns_cats_without_refreshes(db_session: Session):
+    """Test that a bulk create only issues INSERTs and returns the cats in request order.
+
+    Postgres batches the rows into multi-row INSERTs; SQLite cannot order RETURNING rows,
+    so SQLAlchemy sends it one INSERT per row.
+    """
+    created, errors = cat.bulk_create_for_user(
+        db_session, objs_in=[CatCreate(name=f"Cat {i}") for i in range(5)], user_id=1
+    )
+    assert [c.name for c in created] == [f"Cat {i}" for i in range(5)]
+    assert all(c.user_id == 1 and c.id for c in created)
+    assert errors == []
+    assert {s.split()[0] for s in db_session.statements} == {"INSERT"}
+
+
+def test_bulk_update_and_delete_report_unowned_items(db_session: Session):
+    """Test that bulk updates and deletes apply owned items and report the rest by index."""
+    mine = cat.create_for_user(db_session, obj_in=CatCreate(name="Mine"), user_id=1)
+    theirs = cat.create_for_user(db_session, obj_in=CatCreate(name="Theirs"), user_id=2)
+
+    updated, errors = cat.bulk_update_for_user(
+        db_session,
+        objs_in=[CatBulkUpdateItem(id=theirs.id, age=1), CatBulkUpdateItem(id=mine.id, age=3)],
+        user_id=1,
+    )
+    assert [(c.id, c.age, c.name) for c in updated] == [(mine.id, 3, "Mine")]
+    assert [(e.index, e.id) for e in errors] == [(0, theirs.id)]
+    assert cat.get(db_session, theirs.id).age is None
+
+    deleted, errors = cat.bulk_delete_for_user(db_session, ids=[mine.id, theirs.id], user_id=1)
+    assert deleted == [mine.id]
+    assert [(e.index, e.id) for e in errors] == [(1, theirs.id)]
+
+
+def test_create_and_update_use_returning(db_session: Session):
+    """Test that create and update are one statement each and only changed columns are written."""
+    whiskers = cat.create_for_user(db_session, obj_in=CatCreate(name="Whiskers", age=2), user_id=1)
+    assert [s.split()[0] for s in db_session.statements] == ["INSERT"]
+    db_session.statements.clear()
+
+    updated = cat.update(db_session, db_obj=whiskers, obj_in=CatUpdate(name="Whiskers", age=3))
+    assert updated.age == 3
+    assert len(db_session.statements) == 1
+    set_clause = db_session.statements[0].split(" WHERE ")[0]
+    assert set_clause.startswith("UPDATE cat SET change_seq=")
+    assert set_clause.endswith("updated_at=STRFTIME('%Y-%m-%d %H:%M:%f', 'now'), age=?")
+    db_session.statements.clear()
+
+    assert cat.update(db_session, db_obj=updated, obj_in={"age": 3}) is updated
+    assert db_session.statements == []
+
+
+def test_read_queries_select_only_read_columns(db_session: Session):
+    """Test that listings select the CatRead columns as rows, and only the requested ones with a fieldset."""
+    cat.create_for_user(db_session, obj_in=CatCreate(name="Tom", breed="Tabby", description="Naps"), user_id=1)
+    db_session.statements.clear()
+
+    rows = cat.get_multi_for_user(db_session, user_id=1, fields={"name", "breed"})
+    assert [row._asdict() for row in rows] == [{"id": 1, "name": "Tom", "breed": "Tabby"}]
+    columns = db_session.statements[0].split("FROM")[0]
+    assert "description" not in columns and "created_at" not in columns
+
+    only_id = cat.read_for_user(db_session, id=1, user_id=1, fields=set())
+    assert only_id._asdict() == {"id": 1}
+    assert cat.read_for_user(db_session, id=1, user_id=2) is None
@@ -0,0 +1,142 @@
+"""Test image metadata extraction and the worker that stores it in the cat_image table."""
+
+import asyncio
+import io
+
+import pytest
+from moto import mock_aws
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine
+
+Image = pytest.importorskip("PIL.Image")
+
+from app.crud.cat_image import cat_image
+from app.image_index import CatImageIndex
+from app.image_metadata import ImageMetadataWorker
+from app.imaging import blurhash_encode, extract_metadata, shutdown_process_pool
+from app.models.cat_image import CatImage
+from app.s3 import get_s3_client
+
+BUCKET = "test-cat-images"
+
+
+def jpeg_bytes(width: int, height: int, color=(200, 120, 40), orientation: int = 1) -> bytes:
+    image = Image.new("RGB", (width, height), color)
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def engine():
+    """Create an in-memory engine with the cat_image table."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    CatImage.__table__.create(engine)
+    return engine
+
+
+def test_extract_metadata():
+    """Test dimensions, hash, dominant color and placeholder of a solid-color JPEG."""
+    data = jpeg_bytes(400, 200)
+    metadata = extract_metadata(data)
+    assert (metadata["width"], metadata["height"]) == (400, 200)
+    assert metadata["byte_size"] == len(data)
+    assert metadata["content_type"] == "image/jpeg"
+    assert len(metadata["content_hash"]) == 64
+    red, green, blue = (int(metadata["dominant_color"][i:i + 2], 16) for i in (1, 3, 5))
+    assert abs(red - 200) < 8 and abs(green - 120) < 8 and abs(blue - 40) < 8
+    # 4x3 components: size flag, maximum, DC (4 chars) and 11 AC components (2 chars each)
+    assert len(metadata["blurhash"]) == 28
+
+
+def test_extract_metadata_applies_exif_orientation():
+    """Test that a 90-degree EXIF rotation reports the displayed (swapped) dimensions."""
+    metadata = extract_metadata(jpeg_bytes(400, 200, orientation=6))
+    assert (metadata["width"], metadata["height"]) == (200, 400)
+
+
+def test_blurhash_matches_reference_encoder():
+    """Test a solid image against the reference implementation's output."""
+    assert blurhash_encode(Image.new("RGB", (8, 8), (255, 255, 255)), 1, 1) == "00TSUA"
+
+
+def test_save_replaces_metadata_and_keeps_created_at(engine):
+    """Test that re-measuring a key updates its row rather than adding one."""
+    first = extract_metadata(jpeg_bytes(40, 20))
+    second = extract_metadata(jpeg_bytes(80, 20))
+    with Session(engine, expire_on_commit=False) as db:
+        created_at = cat_image.save(db, key="a.jpg", etag="e1", metadata=first).created_at
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    with Session(engine, expire_on_commit=False) as db:
+        # A second worker writes in one statement instead of reading first and racing on the key
+        saved = cat_image.save(db, key="a.jpg", etag="e2", metadata=second)
+    event.remove(engine, "before_cursor_execute", record)
+    assert len(statements) == 1 and "ON CONFLICT" in statements[0]
+    assert (saved.etag, saved.width, saved.created_at) == ("e2", 80, created_at)
+    with Session(engine, expire_on_commit=False) as db:
+        assert cat_image.get_etags(db, keys=["a.jpg", "b.jpg"]) == {"a.jpg": "e2"}
+        assert cat_image.get_many(db, keys=["a.jpg"])["a.jpg"].width == 80
+        assert cat_image.delete_keys(db, keys=["a.jpg"]) == 1
+        assert cat_image.get_many(db, keys=["a.jpg"]) == {}
+
+
+def test_worker_measures_only_new_and_changed_images(engine):
+    """Test that the worker follows index changes by ETag and drops rows of removed images."""
+    measured = []
+
+    def start_worker():
+        index = CatImageIndex(bucket=BUCKET, ttl=60, hidden_prefix="renditions/")
+        worker = ImageMetadataWorker(
+            index=index,
+            bucket=BUCKET,
+            workers=1,
+            session_factory=lambda: Session(engine, expire_on_commit=False),
+        )
+        index.on_change(worker.handle_change)
+        return index, worker
+
+    async def scenario(s3):
+        async def settle():
+            while worker._tasks:
+                await asyncio.gather(*worker._tasks)
+            while not worker._queue.empty():
+                key = worker._queue.get_nowait()
+                measured.append(key)
+                await worker.measure(key)
+
+        index, worker = start_worker()
+        await index.refresh()
+        await settle()
+        # After a restart every key is reported as added, but the stored ETags still match
+        index, worker = start_worker()
+        await index.refresh()
+        await settle()
+        s3.put_object(Bucket=BUCKET, Key="a.jpg", Body=jpeg_bytes(80, 20))
+        s3.delete_object(Bucket=BUCKET, Key="b.jpg")
+        await index.refresh()
+        await settle()
+
+    with mock_aws():
+        get_s3_client.cache_clear()
+        s3 = get_s3_client()
+        s3.create_bucket(Bucket=BUCKET)
+        s3.put_object(Bucket=BUCKET, Key="a.jpg", Body=jpeg_bytes(40, 20))
+        s3.put_object(Bucket=BUCKET, Key="b.jpg", Body=jpeg_bytes(20, 40))
+        s3.put_object(Bucket=BUCKET, Key="renditions/320w/a.webp", Body=b"x")
+        try:
+            asyncio.run(scenario(s3))
+        finally:
+            shutdown_process_pool()
+    get_s3_client.cache_clear()
+
+    assert sorted(measured[:2]) == ["a.jpg", "b.jpg"]
+    assert measured[2:] == ["a.jpg"]
+    with Session(engine) as db:
+        rows = cat_image.get_many(db, keys=["a.jpg", "b.jpg"])
+    assert list(rows) == ["a.jpg"]
+    assert (rows["a.jpg"].width, rows["a.jpg"].height) == (80, 20)
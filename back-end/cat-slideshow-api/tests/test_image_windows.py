@@ -0,0 +1,110 @@
+"""Test windowed slideshow images and summary listings."""
+
+import re
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+
+from app import auth
+from app.api import slideshows
+from app.crud.slideshow import slideshow, summary_columns, windowed_image_urls
+from app.db import get_db
+from app.main import create_app
+from app.models.slideshow import Slideshow
+
+
+def compile_pg(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_window_is_an_array_slice():
+    """Test that an unshuffled window is a plain 1-based slice of the array."""
+    sql = compile_pg(select(windowed_image_urls(image_offset=10, image_limit=5)))
+    assert "slideshow.image_urls[11:15]" in sql
+    sql = compile_pg(select(windowed_image_urls(image_offset=10)))
+    assert "slideshow.image_urls[11:coalesce(array_length(slideshow.image_urls, 1), 0)]" in sql
+
+
+def test_shuffled_window_orders_by_seeded_hash():
+    """Test that a shuffled window is cut from a seed-determined order inside the database."""
+    sql = compile_pg(select(windowed_image_urls(image_offset=10, image_limit=5, shuffle_seed=42)))
+    assert "array_agg(picked.url ORDER BY picked.sort_key, picked.position)" in sql
+    assert "md5(concat('42', ':', u.position))" in sql
+    assert "LIMIT 5 OFFSET 10" in sql
+
+
+def test_summary_columns_skip_the_image_array():
+    """Test that listings select the image count and cover image, not the array."""
+    sql = compile_pg(select(*summary_columns()))
+    columns = sql.split("FROM", 1)[0]
+    assert "coalesce(array_length(slideshow.image_urls, 1), 0) AS image_count" in columns
+    assert "slideshow.image_urls[1] AS cover_image_url" in columns
+    assert not re.search(r"(SELECT|,) slideshow\.image_urls\b(?!\[)", columns)
+
+
+def test_get_window_for_user_statement():
+    """Test the detail query returns the window under the `image_urls` name plus the total count."""
+    class RecordingSession:
+        def exec(self, statement):
+            self.sql = compile_pg(statement)
+            return SimpleNamespace(first=lambda: None)
+
+    db = RecordingSession()
+    assert slideshow.get_window_for_user(db, id=1, user_id=2, image_offset=0, image_limit=3) is None
+    assert "slideshow.image_urls[1:3], CAST('{}' AS VARCHAR[])) AS image_urls" in db.sql
+    assert "AS image_count" in db.sql
+
+    slideshow.get_window_for_user(db, id=1, user_id=2, image_limit=3, fields=frozenset({"id", "title"}))
+    columns = db.sql.split("FROM", 1)[0]
+    assert "image_urls" not in columns and "image_count" not in columns
+    assert "slideshow.title" in columns and "slideshow.description" not in columns
+
+
+class StubSlideshowCRUD:
+    """Records list calls and answers them with one summary or full slideshow."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def validators_for_user(self, db, *, user_id, id=None):
+        return 1, None
+
+    async def get_multi_for_user(self, db, *, user_id, skip, limit, after_id, summary, fields=None):
+        self.calls.append(summary)
+        now = datetime(2026, 1, 1)
+        row = dict(id=1, title="Naps", description=None, cat_id=7, user_id=1, created_at=now, updated_at=now)
+        if summary:
+            return [SimpleNamespace(**row, image_count=2000, cover_image_url="https://x/0.jpg")]
+        return [Slideshow(**row, image_urls=[f"https://x/{i}.jpg" for i in range(2000)])]
+
+
+def test_listing_returns_summaries_by_default(monkeypatch):
+    """Test that listings ship summaries unless full image arrays are requested."""
+    crud = StubSlideshowCRUD()
+    monkeypatch.setattr(slideshows, "slideshow_crud", crud)
+    app = create_app()
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[auth.get_current_user_id] = lambda: 1
+    client = TestClient(app)
+
+    [summary] = client.get("/slideshows/").json()
+    assert summary["image_count"] == 2000
+    assert summary["cover_image_url"] == "https://x/0.jpg"
+    assert "image_urls" not in summary
+
+    [full] = client.get("/slideshows/", params={"include_images": True}).json()
+    assert len(full["image_urls"]) == 2000
+    assert crud.calls == [True, False]
+
+
+def test_image_window_limit_is_bounded():
+    """Test that one request cannot ask for an unbounded window."""
+    app = create_app()
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[auth.get_current_user_id] = lambda: 1
+    client = TestClient(app)
+    assert client.get("/slideshows/1/", params={"image_limit": slideshows.MAX_IMAGE_LIMIT + 1}).status_code == 422
+    assert client.get("/slideshows/1/", params={"image_offset": -1}).status_code == 422
@@ -0,0 +1,115 @@
+"""Test the slideshow playback manifest and its preload hints."""
+
+import asyncio
+import re
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from app import auth
+from app.api import slideshows
+from app.crud.slideshow import slideshow
+from app.db import get_db
+from app.main import create_app
+from app.models.cat import Cat
+from app.models.cat_image import CatImageMetadata, SlideshowImage
+from app.models.slideshow import Slideshow
+from app.preload import EarlyHintsMiddleware, preload_link
+from app.settings import settings
+
+BASE = "https://bucket.s3.amazonaws.com/"
+INFO = CatImageMetadata(
+    width=640, height=480, byte_size=1, content_type="image/jpeg",
+    content_hash="0" * 64, dominant_color="#c87828", blurhash="00TSUA",
+)
+
+
+class StubSlideshowCRUD:
+    """Serves one manifest for slideshow 1 of user 1."""
+
+    async def get_manifest_for_user(self, db, *, id, user_id, url_prefix, image_offset=0, image_limit=None, shuffle_seed=None):
+        if (id, user_id) != (1, 1):
+            return None
+        now = datetime.utcnow()
+        cat = Cat(id=7, name="Tom", user_id=1, created_at=now, updated_at=now)
+        slideshow_obj = Slideshow(
+            id=1, title="Naps", cat_id=7, user_id=1, image_urls=[f"{BASE}{i}.jpg" for i in range(5)],
+            created_at=now, updated_at=now,
+        )
+        slideshow_obj.cat = cat
+        images = [SlideshowImage(url=url, info=INFO if i == 0 else None) for i, url in enumerate(slideshow_obj.image_urls)]
+        return slideshow_obj, images, len(images)
+
+
+def client_for(monkeypatch, app=None) -> TestClient:
+    monkeypatch.setattr(slideshows, "slideshow_crud", StubSlideshowCRUD())
+    app = app or create_app()
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[auth.get_current_user_id] = lambda: 1
+    return TestClient(app)
+
+
+def test_manifest_query_is_one_statement():
+    """Test that the slideshow, cat and ordered images come from a single join."""
+    statement = slideshow.manifest_query(id=1, user_id=1, url_prefix=BASE)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "JOIN cat ON cat.id = slideshow.cat_id" in sql
+    assert "LEFT OUTER JOIN LATERAL (SELECT u.url AS url, u.position AS sort_key, u.position AS position" in sql
+    assert "FROM unnest(slideshow.image_urls) WITH ORDINALITY AS u(url, position)" in sql
+    assert "LEFT OUTER JOIN cat_image ON cat_image.key = substr(image.url" in sql
+    assert sql.rstrip().endswith("ORDER BY image.sort_key, image.position")
+    # The full array is only read inside the database, never selected
+    assert not re.search(r"(SELECT|,) slideshow\.image_urls\b(?!\[)", sql.split("FROM", 1)[0])
+
+
+def test_manifest_includes_cat_images_and_preload_links(monkeypatch):
+    """Test the manifest body and that only the first `preload` images are announced."""
+    client = client_for(monkeypatch)
+    response = client.get("/slideshows/1/manifest/", params={"preload": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["cat"]["name"] == "Tom"
+    assert [image["url"] for image in body["images"]] == [f"{BASE}{i}.jpg" for i in range(5)]
+    assert body["images"][0]["info"]["blurhash"] == "00TSUA"
+    assert body["image_count"] == 5
+    assert response.headers["Link"] == f"{preload_link(BASE + '0.jpg')}, {preload_link(BASE + '1.jpg')}"
+
+    assert "Link" not in client.get("/slideshows/1/manifest/", params={"preload": 0}).headers
+    assert client.get("/slideshows/2/manifest/").status_code == 404
+
+
+def test_manifest_images_list_renditions(monkeypatch):
+    """Test that manifest images carry the renditions and srcset available for their originals."""
+    pipeline = slideshows.rendition_pipeline
+    monkeypatch.setattr(settings, "cat_images_bucket_name", "bucket")
+    monkeypatch.setattr(pipeline, "widths", [320, 640])
+    monkeypatch.setattr(pipeline, "formats", ["webp"])
+    monkeypatch.setattr(pipeline.store, "exists", lambda key: key == "renditions/320w/0.webp")
+    image = client_for(monkeypatch).get("/slideshows/1/manifest/").json()["images"][0]
+    assert [(r["width"], r["format"]) for r in image["renditions"]] == [(320, "webp")]
+    assert image["srcset"]["webp"].endswith("320w/0.webp 320w")
+
+
+def test_early_hints_sent_when_server_supports_them(monkeypatch):
+    """Test that the middleware sends a 103 before the response when the extension is advertised."""
+    client = client_for(monkeypatch)
+    app = EarlyHintsMiddleware(client.app)
+    messages = []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/slideshows/1/manifest/", "raw_path": b"/slideshows/1/manifest/", "root_path": "",
+        "query_string": b"preload=1", "headers": [], "server": ("test", 80), "client": ("test", 1),
+        "extensions": {"http.response.early_hint": {}},
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    assert messages[0] == {"type": "http.response.early_hint", "links": [preload_link(BASE + "0.jpg").encode()]}
+    assert messages[1]["type"] == "http.response.start"
+    assert messages[1]["status"] == 200
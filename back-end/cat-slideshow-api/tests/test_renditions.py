@@ -0,0 +1,96 @@
+"""Test the image rendition pipeline with the local filesystem store."""
+
+import asyncio
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from app.image_index import CatImageIndex, ImageIndexChange
+from app.models.cat_image import SlideshowImage
+from app.renditions import LocalRenditionStore, RenditionPipeline, render_renditions, rendition_key
+from app.s3 import object_url
+
+
+def jpeg_bytes(width: int, height: int, orientation: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    image = Image.new("RGB", (width, height), (200, 120, 40))
+    exif = image.getexif()
+    exif[0x0112] = orientation
+    image.save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    """A single-process pipeline over a local store with one 2000x1000 original."""
+    store = LocalRenditionStore(str(tmp_path), "/renditions", "renditions/")
+    store.write("cats/tom.jpg", jpeg_bytes(2000, 1000), "image/jpeg")
+    pipeline = RenditionPipeline(
+        store=store,
+        index=CatImageIndex(bucket="unused", ttl=60, hidden_prefix="renditions/"),
+        widths=[320, 640, 4000],
+        formats=["webp"],
+        quality=75,
+        prefix="renditions/",
+        workers=1,
+    )
+    yield pipeline
+    pipeline.shutdown()
+
+
+def test_render_renditions_never_upscales():
+    """Test that only widths narrower than the original are produced, keeping the aspect ratio."""
+    results = render_renditions(jpeg_bytes(1000, 500), [320, 640, 1280], ["webp"], 75)
+    assert [(width, fmt) for width, fmt, _ in results] == [(640, "webp"), (320, "webp")]
+    with Image.open(io.BytesIO(results[1][2])) as image:
+        assert (image.format, image.size) == ("WEBP", (320, 160))
+
+
+def test_pipeline_writes_renditions_and_srcset(pipeline):
+    """Test that generation writes under the derived prefix and describe() builds the srcset."""
+    assert asyncio.run(pipeline.generate("cats/tom.jpg")) == 2
+    assert rendition_key("cats/tom.jpg", 320, "webp", "renditions/") == "renditions/320w/cats/tom.webp"
+
+    image = pipeline.describe("cats/tom.jpg")
+    assert [(r.width, r.format) for r in image.renditions] == [(320, "webp"), (640, "webp")]
+    assert image.srcset == {"webp": "/renditions/320w/cats/tom.webp 320w, /renditions/640w/cats/tom.webp 640w"}
+
+    slide = pipeline.with_renditions(SlideshowImage(url=object_url("cats/tom.jpg")))
+    assert slide.srcset == image.srcset
+    assert pipeline.with_renditions(SlideshowImage(url="https://example.com/tom.jpg")).renditions == []
+
+
+def test_render_renditions_uses_the_displayed_width():
+    """Test that widths are compared with the width after EXIF rotation."""
+    # Stored 1000x500 but rotated by 90 degrees: displayed 500 wide
+    results = render_renditions(jpeg_bytes(1000, 500, orientation=6), [320, 640], ["webp"], 75)
+    assert [width for width, _, _ in results] == [320]
+    with Image.open(io.BytesIO(results[0][2])) as image:
+        assert image.size == (320, 640)
+
+
+def test_existing_renditions_are_not_regenerated(pipeline):
+    """Test that the index listener checks the rendition store, not the bucket index."""
+    change = ImageIndexChange(added=["cats/tom.jpg"], changed=[], removed=[])
+
+    async def queued_after(generate: bool) -> int:
+        if generate:
+            await pipeline.generate("cats/tom.jpg")
+        pipeline.handle_change(change)
+        return pipeline._queue.qsize()
+
+    assert asyncio.run(queued_after(False)) == 1
+    pipeline._queue = asyncio.Queue()
+    assert asyncio.run(queued_after(True)) == 0
+
+
+def test_pipeline_queues_originals_only(pipeline):
+    """Test that index changes queue new originals but never the renditions themselves."""
+    async def scenario():
+        change = ImageIndexChange(added=["cats/tom.jpg", "renditions/320w/cats/tom.webp"], changed=[], removed=[])
+        pipeline.handle_change(change)
+        return pipeline._queue.qsize(), pipeline._queue.get_nowait()
+
+    assert asyncio.run(scenario()) == (1, "cats/tom.jpg")
@@ -0,0 +1,183 @@
+"""Test the per-user response cache and its write-through invalidation."""
+
+import gzip
+
+import fakeredis.aioredis
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine
+
+from app import auth
+from app.crud.cat import cat
+from app.db import get_db
+from app.main import create_app
+from app.models.cat import Cat, CatCreate
+from app.models.sync import Tombstone
+from app.models.user import User
+from app.response_cache import CachedResponse, MemoryBackend, RedisBackend, accepts_gzip, response_cache
+
+
+@pytest.fixture
+def engine():
+    """Create an in-memory engine with two users."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    User.__table__.create(engine)
+    Cat.__table__.create(engine)
+    Tombstone.__table__.create(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, email="a@example.com", cognito_sub="sub-1", name="a"))
+        db.add(User(id=2, email="b@example.com", cognito_sub="sub-2", name="b"))
+        db.commit()
+    return engine
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, monkeypatch):
+    """Install a fresh memory or (fake) Redis backend with zeroed counters."""
+    if request.param == "memory":
+        backend = MemoryBackend(1 << 20, ttl=60)
+    else:
+        backend = RedisBackend(fakeredis.aioredis.FakeRedis(), ttl=60)
+    monkeypatch.setattr(response_cache, "backend", backend)
+    for counter in ["hits", "not_modified", "misses", "stores", "stale_stores", "invalidations", "failed_invalidations"]:
+        monkeypatch.setattr(response_cache, counter, 0)
+    return backend
+
+
+def client_for(engine, user_id: int, fast_json: bool = True) -> TestClient:
+    app = create_app(fast_json=fast_json)
+
+    def get_session():
+        with Session(engine, expire_on_commit=False) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_session
+    app.dependency_overrides[auth.get_current_user_id] = lambda: user_id
+    return TestClient(app)
+
+
+def test_hits_skip_the_database_and_writes_invalidate(engine, backend):
+    """Test that repeat listings come from the cache until the user writes."""
+    client = client_for(engine, user_id=1)
+    client.post("/cats/", json={"name": "Tom"})
+    first = client.get("/cats/")
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    second = client.get("/cats/")
+    assert statements == []
+    assert second.json() == first.json() == [first.json()[0]]
+    assert second.headers["etag"] == first.headers["etag"]
+    assert client.get("/cats/", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    assert client.get("/cats/", headers={"Accept-Encoding": "identity"}).json() == first.json()
+
+    client.patch(f"/cats/{first.json()[0]['id']}/", json={"age": 3})
+    assert client.get("/cats/").json()[0]["age"] == 3
+    assert response_cache.stats()["hits"] == 2
+    assert response_cache.stats()["not_modified"] == 1
+    assert response_cache.stats()["misses"] == 2
+    assert response_cache.stats()["invalidations"] == 2  # the create and the update
+
+
+def test_invalidation_is_per_user(engine, backend):
+    """Test that one user's write leaves other users' cached responses in place."""
+    mine, theirs = client_for(engine, user_id=1), client_for(engine, user_id=2)
+    mine.get("/cats/")
+    theirs.get("/cats/")
+    theirs.post("/cats/", json={"name": "Luna"})
+
+    assert response_cache.misses == 2
+    mine.get("/cats/")
+    assert response_cache.hits == 1
+    assert [c["name"] for c in theirs.get("/cats/").json()] == ["Luna"]
+    assert response_cache.misses == 3
+
+
+def test_regular_json_path_is_cached_too(engine, backend):
+    """Test that responses are cached with the fast JSON path off, with the same body and headers."""
+    with Session(engine) as db:
+        cat.create_for_user(db, obj_in=CatCreate(name="Tom"), user_id=1)
+    client = client_for(engine, user_id=1, fast_json=False)
+    first = client.get("/cats/", params={"limit": 1})
+    assert first.headers["content-encoding"] == "gzip"
+    second = client.get("/cats/", params={"limit": 1})
+    assert response_cache.stats()["hits"] == 1
+    assert second.json() == first.json() == client_for(engine, user_id=1).get("/cats/", params={"limit": 1}).json()
+    assert second.headers["etag"] == first.headers["etag"]
+
+
+def test_gzip_needs_a_non_zero_q_value(engine, backend):
+    """Test that gzip;q=0 (or a lone identity) gets the plain body."""
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, *;q=0.5")
+    assert not accepts_gzip("gzip;q=0, *")
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip("gzip;q=0.000")
+    client = client_for(engine, user_id=1)
+    client.get("/cats/")
+    response = client.get("/cats/", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == []
+
+
+def test_failed_invalidation_does_not_fail_the_write(engine, backend, monkeypatch):
+    """Test that a write still succeeds, and is counted, when the backend cannot be reached."""
+    async def unreachable(user_id):
+        raise ConnectionError("cache backend down")
+
+    monkeypatch.setattr(backend, "invalidate_user", unreachable)
+    client = client_for(engine, user_id=1)
+    assert client.post("/cats/", json={"name": "Tom"}).status_code == 201
+    assert client.patch("/cats/1/", json={"age": 3}).status_code == 200
+    assert client.delete("/cats/1/").status_code == 204
+    assert response_cache.stats()["failed_invalidations"] == 3
+    assert response_cache.stats()["invalidations"] == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_versions_are_bounded():
+    """Test that only `max_versions` users keep a version and eviction never revives a stale store."""
+    backend = MemoryBackend(1 << 20, max_versions=2)
+    _, version = await backend.lookup(1, "/cats/?")
+    for user_id in [1, 2, 3]:
+        await backend.invalidate_user(user_id)
+    assert backend.stats()["versions"] == 2
+    assert await backend.store(1, "/cats/?", b"{}\nstale", version) is False
+    _, version = await backend.lookup(1, "/cats/?")
+    assert await backend.store(1, "/cats/?", b"{}\nfresh", version) is True
+
+
+@pytest.mark.asyncio
+async def test_store_after_invalidation_is_dropped(backend):
+    """Test that a response built before a write is not stored after it."""
+    payload, version = await backend.lookup(1, "/cats/?")
+    assert payload is None
+    await backend.invalidate_user(1)
+    assert await backend.store(1, "/cats/?", b"{}\nstale", version) is False
+    assert (await backend.lookup(1, "/cats/?"))[0] is None
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_is_bounded_by_bytes():
+    """Test that the least recently used entries are evicted to stay under the byte limit."""
+    backend = MemoryBackend(250)
+    for i in range(3):
+        assert await backend.store(1, f"/cats/?page={i}", bytes(100), 0)
+    assert backend.stats()["bytes"] == 200
+    assert (await backend.lookup(1, "/cats/?page=0"))[0] is None
+    assert (await backend.lookup(1, "/cats/?page=2"))[0] == bytes(100)
+    assert await backend.store(1, "/cats/?huge", bytes(300), 0) is False
+
+
+@pytest.mark.asyncio
+async def test_cached_body_is_the_served_json_gzipped(engine, backend):
+    """Test that entries hold the served body gzip-compressed, with the headers to replay."""
+    client_for(engine, user_id=1).get("/cats/", params={"limit": 5})
+    payload, _ = await backend.lookup(1, "/cats/?limit=5")
+    cached = CachedResponse.loads(payload)
+    assert gzip.decompress(cached.body) == b"[]"
+    assert set(cached.headers) == {"etag", "cache-control"}
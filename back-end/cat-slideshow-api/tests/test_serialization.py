@@ -0,0 +1,96 @@
+"""Test that the fast JSON path renders exactly what the response_model path does."""
+
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine
+
+from app import auth, serialization
+from app.crud.cat import cat
+from app.db import get_db
+from app.main import create_app
+from app.models.cat import Cat, CatCreate
+from app.models.cat_image import CatImageMetadata, SlideshowImage
+from app.models.slideshow import Slideshow, SlideshowRead
+from app.models.sync import Tombstone
+from app.models.user import User
+from app.serialization import encode_rows
+
+
+@pytest.fixture
+def engine():
+    """Create an in-memory engine with a user owning a few cats."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    User.__table__.create(engine)
+    Cat.__table__.create(engine)
+    Tombstone.__table__.create(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, email="a@example.com", cognito_sub="sub-1", name="a"))
+        db.commit()
+        for name in ["Tom", "Luna", "Ginger"]:
+            cat.create_for_user(db, obj_in=CatCreate(name=name, breed="Tabby", age=2), user_id=1)
+    return engine
+
+
+def client_for(engine, fast_json: bool) -> TestClient:
+    app = create_app(fast_json=fast_json)
+
+    def get_session():
+        with Session(engine, expire_on_commit=False) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_session
+    app.dependency_overrides[auth.get_current_user_id] = lambda: 1
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/cats/", {"limit": 2}),
+    ("/cats/", {"breed": "Tabby"}),
+    ("/cats/1/", {}),
+])
+def test_fast_path_matches_response_model_path(engine, path, params):
+    """Test that bodies and pagination headers are identical with the fast path on and off."""
+    regular = client_for(engine, fast_json=False).get(path, params=params)
+    fast = client_for(engine, fast_json=True).get(path, params=params)
+    assert fast.status_code == regular.status_code == 200
+    assert fast.json() == regular.json()
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.headers.get("X-Next-Cursor") == regular.headers.get("X-Next-Cursor")
+
+
+def test_fast_path_keeps_errors(engine):
+    """Test that a missing row still raises the regular 404."""
+    assert client_for(engine, fast_json=True).get("/cats/99/").status_code == 404
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_encode_rows_fills_defaults_and_nested_models(monkeypatch, use_orjson):
+    """Test that fields missing on the ORM object take their defaults and nested models use their own fields."""
+    if not use_orjson:
+        monkeypatch.setattr(serialization, "orjson", None)
+    now = datetime(2026, 1, 2, 3, 4, 5, 678)
+    slideshow_obj = Slideshow(id=1, title="Naps", cat_id=7, user_id=1, image_urls=["a.jpg"], created_at=now, updated_at=now)
+    info = CatImageMetadata(
+        width=1, height=2, byte_size=3, content_type="image/jpeg",
+        content_hash="h", dominant_color="#000000", blurhash="00TSUA",
+    )
+    with_images = SlideshowRead.model_validate(slideshow_obj, update={"images": [SlideshowImage(url="a.jpg", info=info)]})
+
+    for row in [slideshow_obj, with_images]:
+        expected = SlideshowRead.model_validate(row).model_dump(mode="json")
+        assert json.loads(encode_rows([row], SlideshowRead)) == [expected]
+
+
+@pytest.mark.parametrize("fast_json", [True, False])
+def test_sparse_fieldset(engine, fast_json):
+    """Test that `fields` trims list and detail responses (keeping `id`) and rejects unknown names."""
+    client = client_for(engine, fast_json=fast_json)
+    response = client.get("/cats/", params={"fields": "name,breed", "limit": 2})
+    assert response.json() == [{"id": 1, "name": "Tom", "breed": "Tabby"}, {"id": 2, "name": "Luna", "breed": "Tabby"}]
+    assert response.headers["X-Next-Cursor"]
+    assert client.get("/cats/3/", params={"fields": "name"}).json() == {"id": 3, "name": "Ginger"}
+    assert client.get("/cats/", params={"fields": "name,owner"}).status_code == 422
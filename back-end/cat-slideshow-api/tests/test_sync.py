@@ -0,0 +1,169 @@
+"""Test delta sync: change sequences, tombstones and sync tokens."""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import JSON
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine, insert, select
+
+from app import auth
+from app.crud.cat import cat
+from app.crud.slideshow import slideshow
+from app.crud.tombstone import tombstone
+from app.db import get_db
+from app.main import create_app
+from app.models.base import change_horizon
+from app.models.cat import Cat, CatCreate
+from app.models.slideshow import Slideshow, SlideshowCreate, SlideshowUpdate
+from app.models.sync import Tombstone
+from app.models.user import User
+from app.sync import encode_sync_token
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """Create an in-memory engine with two users and the cat, slideshow and tombstone tables."""
+    # SQLite has no arrays: store slideshow image URLs as a JSON list for these tests only
+    monkeypatch.setattr(Slideshow.__table__.c.image_urls, "type", JSON())
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    User.__table__.create(engine)
+    Cat.__table__.create(engine)
+    Slideshow.__table__.create(engine)
+    Tombstone.__table__.create(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, email="a@example.com", cognito_sub="sub-1", name="a"))
+        db.add(User(id=2, email="b@example.com", cognito_sub="sub-2", name="b"))
+        db.commit()
+    return engine
+
+
+@pytest.fixture
+def client(engine):
+    app = create_app()
+
+    def get_session():
+        with Session(engine, expire_on_commit=False) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_session
+    app.dependency_overrides[auth.get_current_user_id] = lambda: 1
+    return TestClient(app)
+
+
+def settle():
+    # The SQLite change sequence is a millisecond clock
+    time.sleep(0.01)
+
+
+def test_delta_sync_reports_only_changes(engine, client):
+    """Test that a sync since a token returns the writes and deletes after it, and nothing else."""
+    with Session(engine, expire_on_commit=False) as db:
+        tom, luna, ginger = (cat.create_for_user(db, obj_in=CatCreate(name=name), user_id=1) for name in ["Tom", "Luna", "Ginger"])
+        cat.create_for_user(db, obj_in=CatCreate(name="Theirs"), user_id=2)
+    settle()
+
+    first = client.get("/sync/").json()
+    assert first["full"] is True
+    assert [c["name"] for c in first["cats"]] == ["Tom", "Luna", "Ginger"]
+    assert first["deleted"] == {"cats": [], "slideshows": []}
+    settle()
+
+    client.patch(f"/cats/{luna.id}/", json={"age": 2})
+    client.delete(f"/cats/{ginger.id}/")
+    new = client.post("/cats/", json={"name": "Smokey"}).json()
+    with Session(engine) as db:
+        cat.bulk_delete_for_user(db, ids=[tom.id], user_id=2)  # not theirs: no tombstone
+
+    delta = client.get("/sync/", params={"since": first["sync_token"]}).json()
+    assert delta["full"] is False
+    assert [(c["id"], c["age"]) for c in delta["cats"]] == [(luna.id, 2), (new["id"], None)]
+    assert delta["deleted"] == {"cats": [ginger.id], "slideshows": []}
+    settle()
+
+    assert client.get("/sync/", params={"since": delta["sync_token"]}).json()["cats"] == []
+
+
+def test_slideshow_changes_and_deletes(engine, client):
+    """Test that slideshow writes and deletes (single and bulk) reach the delta with their image URLs."""
+    with Session(engine, expire_on_commit=False) as db:
+        tom = cat.create_for_user(db, obj_in=CatCreate(name="Tom"), user_id=1)
+        naps, play, food = (
+            slideshow.create_for_user(db, obj_in=SlideshowCreate(title=title, cat_id=tom.id, image_urls=[f"{title}.jpg"]), user_id=1)
+            for title in ["Naps", "Play", "Food"]
+        )
+    settle()
+    first = client.get("/sync/").json()
+    assert [(s["title"], s["image_urls"]) for s in first["slideshows"]] == [("Naps", ["Naps.jpg"]), ("Play", ["Play.jpg"]), ("Food", ["Food.jpg"])]
+    settle()
+
+    with Session(engine) as db:
+        slideshow.update_for_user(db, id=naps.id, user_id=1, obj_in=SlideshowUpdate(image_urls=["a.jpg", "b.jpg"]))
+        slideshow.delete_for_user(db, id=play.id, user_id=1)
+        slideshow.bulk_delete_for_user(db, ids=[food.id], user_id=1)
+
+    delta = client.get("/sync/", params={"since": first["sync_token"]}).json()
+    assert [(s["id"], s["image_urls"]) for s in delta["slideshows"]] == [(naps.id, ["a.jpg", "b.jpg"])]
+    assert delta["cats"] == []
+    assert delta["deleted"] == {"cats": [], "slideshows": [play.id, food.id]}
+
+
+def test_full_sync_is_paged(engine, client):
+    """Test that large syncs come in pages whose last token continues from where the first began."""
+    with Session(engine) as db:
+        for name in ["Tom", "Luna", "Ginger", "Smokey", "Milo"]:
+            cat.create_for_user(db, obj_in=CatCreate(name=name), user_id=1)
+    settle()
+
+    names, token, pages = [], None, 0
+    while True:
+        page = client.get("/sync/", params={"limit": 2, **({"since": token} if token else {})}).json()
+        assert page["full"] is True
+        names += [c["name"] for c in page["cats"]]
+        token, pages = page["sync_token"], pages + 1
+        if not page["has_more"]:
+            break
+    assert names == ["Tom", "Luna", "Ginger", "Smokey", "Milo"]
+    assert pages == 3
+    settle()
+
+    client.patch("/cats/2/", json={"age": 3})
+    delta = client.get("/sync/", params={"since": token, "limit": 2}).json()
+    assert (delta["full"], delta["has_more"]) == (False, False)
+    assert [c["name"] for c in delta["cats"]] == ["Luna"]
+
+
+def test_expired_or_invalid_tokens(engine, client):
+    """Test that tokens older than the tombstone retention get a full sync and malformed ones a 400."""
+    with Session(engine) as db:
+        cat.create_for_user(db, obj_in=CatCreate(name="Tom"), user_id=1)
+    expired = encode_sync_token(10 ** 15, issued_at=time.time() - 365 * 86400)
+    response = client.get("/sync/", params={"since": expired}).json()
+    assert response["full"] is True
+    assert [c["name"] for c in response["cats"]] == ["Tom"]
+    assert client.get("/sync/", params={"since": "garbage"}).status_code == 400
+
+
+def test_prune_drops_old_tombstones(engine):
+    """Test that pruning keeps tombstones inside the retention period."""
+    now = datetime.utcnow()
+    with Session(engine) as db:
+        db.exec(insert(Tombstone), params=[
+            {"entity": "cat", "entity_id": 1, "user_id": 1, "deleted_at": now - timedelta(days=40)},
+            {"entity": "cat", "entity_id": 2, "user_id": 1, "deleted_at": now},
+        ])
+        db.commit()
+        assert tombstone.prune(db, before=now - timedelta(days=30)) == 1
+        assert db.exec(select(Tombstone.entity_id)).all() == [2]
+
+
+def test_postgres_change_sequence_is_the_transaction_id():
+    """Test that Postgres stamps writes with the transaction ID and reads the horizon from the snapshot."""
+    dialect = postgresql.dialect()
+    sql = str(insert(Cat).values(name="Tom", user_id=1).compile(dialect=dialect))
+    assert "CAST(CAST(pg_current_xact_id() AS TEXT) AS BIGINT)" in sql
+    sql = str(select(change_horizon()).compile(dialect=dialect))
+    assert "pg_snapshot_xmin(pg_current_snapshot())" in sql
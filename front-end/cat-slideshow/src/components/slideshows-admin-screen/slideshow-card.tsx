@@ -1,9 +1,9 @@
 import { IonCard, IonCardContent, IonButton, IonIcon } from '@ionic/react'
 import { createOutline, trashOutline } from 'ionicons/icons'
-import type { Slideshow } from '../../rtk/slideshows/slideshow-model'
+import type { SlideshowSummary } from '../../rtk/slideshows/slideshow-model'
 
 interface SlideshowCardProps {
-    slideshow: Slideshow
+    slideshow: SlideshowSummary
     onEdit: () => void
     onDelete: () => void
 }
@@ -1,9 +1,9 @@
 import { IonCard, IonCardContent, IonIcon } from '@ionic/react'
 import { chevronForward } from 'ionicons/icons'
-import type { Slideshow } from '../../rtk/slideshows/slideshow-model'
+import type { SlideshowSummary } from '../../rtk/slideshows/slideshow-model'
 
 interface SlideshowCardProps {
-    slideshow: Slideshow
+    slideshow: SlideshowSummary
     onClick: () => void
 }
 
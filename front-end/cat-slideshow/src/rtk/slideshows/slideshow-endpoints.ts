@@ -1,6 +1,7 @@
 import type { EndpointBuilder } from '@reduxjs/toolkit/query/react'
 import type {
     Slideshow,
+    SlideshowSummary,
     SlideshowCreate,
     SlideshowUpdate,
     SlideshowsQueryParams,
@@ -10,12 +11,12 @@ import type {
 
 // Slideshow-specific endpoint definitions
 export const getSlideshowEndpoints = (builder: EndpointBuilder<any, any, any>) => ({
-    getSlideshows: builder.query<Slideshow[], SlideshowsQueryParams>({
+    getSlideshows: builder.query<SlideshowSummary[], SlideshowsQueryParams>({
         query: (params: SlideshowsQueryParams) => ({
             url: 'slideshows/',
             params,
         }),
-        providesTags: (result: Slideshow[] | undefined) =>
+        providesTags: (result: SlideshowSummary[] | undefined) =>
             result
                 ? [
                     ...result.map(({ id }) => ({ type: 'Slideshow' as const, id })),
@@ -67,12 +68,12 @@ export const getSlideshowEndpoints = (builder: EndpointBuilder<any, any, any>) =
         },
     }),
 
-    getSlideshowsByCat: builder.query<Slideshow[], SlideshowsByCatParams>({
+    getSlideshowsByCat: builder.query<SlideshowSummary[], SlideshowsByCatParams>({
         query: ({ cat_id, ...params }: SlideshowsByCatParams) => ({
             url: `slideshows/cat/${cat_id}/`,
             params,
         }),
-        providesTags: (result: Slideshow[] | undefined, error: any, { cat_id }: SlideshowsByCatParams) => {
+        providesTags: (result: SlideshowSummary[] | undefined, error: any, { cat_id }: SlideshowsByCatParams) => {
             void result; void error
             return [
                 { type: 'Slideshow', id: `BY_CAT_${cat_id}` },
@@ -80,12 +81,12 @@ export const getSlideshowEndpoints = (builder: EndpointBuilder<any, any, any>) =
         },
     }),
 
-    searchSlideshows: builder.query<Slideshow[], SearchSlideshowsParams>({
+    searchSlideshows: builder.query<SlideshowSummary[], SearchSlideshowsParams>({
         query: ({ search_term, ...params }: SearchSlideshowsParams) => ({
             url: `slideshows/search/${search_term}/`,
             params,
         }),
-        providesTags: (result: Slideshow[] | undefined, error: any, { search_term }: SearchSlideshowsParams) => {
+        providesTags: (result: SlideshowSummary[] | undefined, error: any, { search_term }: SearchSlideshowsParams) => {
             void result; void error
             return [
                 { type: 'Slideshow', id: `SEARCH_${search_term}` },
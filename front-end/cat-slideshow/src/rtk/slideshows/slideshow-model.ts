@@ -10,6 +10,18 @@ export interface Slideshow {
     updated_at: string
 }
 
+// Listing entry: the image array reduced to its size and cover image
+export interface SlideshowSummary {
+    id: number
+    title: string
+    description?: string
+    cat_id: number
+    image_count: number
+    cover_image_url?: string
+    created_at: string
+    updated_at: string
+}
+
 export interface SlideshowCreate {
     title: string
     description?: string
@@ -1,11 +1,11 @@
 import { createSlice } from '@reduxjs/toolkit'
-import type { Slideshow } from './slideshow-model'
+import type { Slideshow, SlideshowSummary } from './slideshow-model'
 import { catSlideshowApi } from '../cat-slideshow-api'
 
 // Slideshow slice state interface - only data, no UI state
 export interface SlideshowState {
-    // Normalized slideshow data by ID
-    slideshowsById: Record<number, Slideshow>
+    // Normalized slideshow data by ID (summaries from listings, full slideshows from detail calls)
+    slideshowsById: Record<number, Slideshow | SlideshowSummary>
 }
 
 // Initial state